@@ -0,0 +1,122 @@
+"""
+Parallel backfill throughput by worker count
+
+Writes D days of synthetic Bronze partitions, then rebuilds Silver, Gold and
+the time series from them with 1, 2, 4, ... workers up to the core count,
+reporting rows/s and speedup over one worker. Checks that every worker count
+gives the same Gold partials and dedup index, and that both match what the
+daily pipeline produces when fed the same days one at a time.
+
+    python -m benchmarks.bench_backfill --days 90 --rows-per-day 50000
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_silver import make_bronze
+from src.transformations.backfill import backfill
+from src.transformations.bronze_layer import BRONZE_ROOT
+from src.transformations.dedup_index import DEDUP_INDEX_PATH
+from src.transformations.gold_layer import gold_layer_aggregation, save_gold_data
+from src.transformations.gold_partials import GOLD_PARTIALS_ROOT
+from src.transformations.lake import partition_files, write_shard
+from src.transformations.silver_layer import commit_silver_batch, save_silver_data, silver_layer_transformation
+
+
+def write_bronze(days: int, rows_per_day: int) -> None:
+    """Daily Bronze partitions where most listings carry over and some change price"""
+    base = make_bronze(rows_per_day, distinct=5000)
+    # Listing links are on their city's subdomain
+    base["link"] = "https://" + base["city"] + ".example.org/" + base["link"].str.rsplit("/", n=1).str[-1]
+    rng = np.random.default_rng(1)
+    for date_str in pd.date_range("2024-01-01", periods=days).strftime("%Y-%m-%d"):
+        df = base.copy()
+        # A tenth of listings are replaced each day and a twentieth are re-priced
+        replaced = rng.random(len(df)) < 0.1
+        df.loc[replaced, "link"] = [f"https://{city}.example.org/{date_str}/{j}.html"
+                                    for j, city in enumerate(df.loc[replaced, "city"])]
+        repriced = rng.random(len(df)) < 0.05
+        df.loc[repriced, "price"] = [f"${p:,}" for p in rng.integers(1000, 60_000, repriced.sum())]
+        base = df
+        df = df.assign(data_date=pd.Timestamp(date_str).date(), scrape_date=date_str)
+        write_shard(df, BRONZE_ROOT, date_str, "part-bench.parquet")
+
+
+def gold_snapshot() -> pd.DataFrame:
+    gold = pd.concat([pd.read_parquet(f) for f in partition_files(GOLD_PARTIALS_ROOT)], ignore_index=True)
+    gold['date'] = gold['date'].astype(str)
+    gold['city'] = gold['city'].astype(str)
+    return gold.sort_values(['date', 'city'], ignore_index=True)
+
+
+def same_gold(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    if len(a) != len(b) or not a[['date', 'city', 'listing_count']].equals(b[['date', 'city', 'listing_count']]):
+        return False
+    return all(np.array_equal(x, y) for x, y in zip(a['price_keys'], b['price_keys'])) and \
+        all(np.array_equal(x, y) for x, y in zip(a['price_counts'], b['price_counts']))
+
+
+def daily_pipeline() -> None:
+    """The incremental ops over each Bronze day in turn, as the scheduled pipeline would run them"""
+    for path in sorted(os.listdir(BRONZE_ROOT)):
+        bronze = pd.read_parquet(os.path.join(BRONZE_ROOT, path))
+        silver, cross_post_batch = silver_layer_transformation(bronze)
+        save_silver_data(silver)
+        save_gold_data(gold_layer_aggregation(silver))
+        commit_silver_batch(silver, cross_post_batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--rows-per-day", type=int, default=50_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--check-days", type=int, default=5, help="Days to compare against the daily pipeline")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as lake:
+        os.chdir(lake)
+        try:
+            write_bronze(args.check_days, 2000)
+            daily_pipeline()
+            expected_gold, expected_index = gold_snapshot(), pd.read_parquet(DEDUP_INDEX_PATH)
+            backfill(workers=2, city_shards=3)
+            match = same_gold(gold_snapshot(), expected_gold) and \
+                pd.read_parquet(DEDUP_INDEX_PATH).equals(expected_index)
+            print(f"backfill matches the daily pipeline over {args.check_days} days: {match}")
+        finally:
+            os.chdir(cwd)
+
+    with tempfile.TemporaryDirectory() as lake:
+        os.chdir(lake)
+        try:
+            write_bronze(args.days, args.rows_per_day)
+            counts = [1]
+            while counts[-1] * 2 <= args.max_workers:
+                counts.append(counts[-1] * 2)
+
+            baseline, reference, deterministic = None, None, True
+            for workers in counts:
+                stats = backfill(workers=workers)
+                baseline = baseline or stats["rows_per_second"]
+                print(f"{workers:3d} workers: {stats['rows']:>12,} rows in {stats['seconds']:7.2f}s  "
+                      f"{stats['rows_per_second']:>10,.0f} rows/s  speedup {stats['rows_per_second'] / baseline:5.2f}x  "
+                      f"(clean {stats['clean_seconds']:.2f}s, aggregate {stats['aggregate_seconds']:.2f}s, "
+                      f"merge {stats['merge_seconds']:.2f}s)")
+                gold = gold_snapshot()
+                if reference is None:
+                    reference = gold
+                deterministic = deterministic and same_gold(gold, reference)
+            print(f"same Gold for every worker count: {deterministic}")
+        finally:
+            os.chdir(cwd)
+    if not (match and deterministic):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
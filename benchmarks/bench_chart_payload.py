@@ -0,0 +1,60 @@
+"""
+Plotly payload size: raw-row charts vs charts from pre-aggregated Gold tables
+
+For growing row counts, builds the price histogram and make pie both from
+raw Silver rows (the original charts) and from the Gold chart tables, and
+reports the figure JSON size and build time. The Gold-based payload should
+not grow with rows.
+
+    python -m benchmarks.bench_chart_payload --rows 10000 100000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from benchmarks.bench_gold_partials import make_silver_day
+from src.transformations.gold_partials import PRICE_BIN_WIDTH, build_make_counts, build_price_histogram
+
+
+def raw_figures(silver: pd.DataFrame):
+    make_counts = silver["make"].value_counts().head(10)
+    return [
+        px.histogram(silver, x="price_numeric", nbins=50, title="Car Price Distribution"),
+        px.pie(values=make_counts.values, names=make_counts.index, title="Car Listings by Make"),
+    ]
+
+
+def gold_figures(silver: pd.DataFrame):
+    hist = build_price_histogram(silver).groupby("bin_start", as_index=False, observed=True)["count"].sum()
+    makes = build_make_counts(silver).groupby("make", as_index=False, observed=True)["count"].sum().nlargest(10, "count")
+    fig = px.bar(hist, x="bin_start", y="count", title="Car Price Distribution")
+    fig.update_traces(width=PRICE_BIN_WIDTH, offset=0)
+    return [fig, px.pie(values=makes["count"], names=makes["make"], title="Car Listings by Make")]
+
+
+def measure(build, silver: pd.DataFrame):
+    start = time.perf_counter()
+    payload = sum(len(fig.to_json()) for fig in build(silver))
+    return payload, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for rows in args.rows:
+        silver = make_silver_day(rng, "2024-01-01", rows)
+        raw_bytes, raw_time = measure(raw_figures, silver)
+        # Aggregation runs once in the pipeline; only rendering is on the page path
+        gold_bytes, gold_time = measure(gold_figures, silver)
+        print(f"{rows:>10,} rows: raw {raw_bytes / 1024:10,.1f} KB {raw_time:6.2f}s   "
+              f"gold {gold_bytes / 1024:6,.1f} KB {gold_time:6.2f}s (incl. aggregation)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Lake size and scan speed before and after compaction
+
+Writes D days of Silver data as R small shards per day (one per pipeline
+run), compacts them, and reports file count, bytes, full-scan time and the
+time for a DuckDB query filtered on one city, which benefits from the
+sorted row groups' min/max statistics.
+
+    python -m benchmarks.bench_compaction --days 30 --runs-per-day 12 --rows-per-run 10000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_gold_partials import make_silver_day
+from src.transformations.compaction import compact_table, scan_seconds
+from src.transformations.lake import partition_files, write_shard
+from src.transformations.silver_layer import SILVER_ROOT
+
+
+def city_query_seconds(repeat: int = 3) -> float:
+    con = duckdb.connect()
+    sql = (f"SELECT count(*), avg(price_numeric) FROM read_parquet('{SILVER_ROOT}/date=*/*.parquet', "
+           "hive_partitioning = true, union_by_name = true) WHERE city = 'chicago'")
+    start = time.perf_counter()
+    for _ in range(repeat):
+        con.execute(sql).fetchall()
+    return (time.perf_counter() - start) / repeat
+
+
+def report(label: str) -> None:
+    files = partition_files(SILVER_ROOT)
+    size = sum(os.path.getsize(f) for f in files)
+    print(f"{label:8s} {len(files):6d} files  {size / 1024 ** 2:8.1f} MB  "
+          f"full scan {scan_seconds(files):6.2f}s  city query {city_query_seconds() * 1000:7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--runs-per-day", type=int, default=12)
+    parser.add_argument("--rows-per-run", type=int, default=10_000)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as lake:
+        os.chdir(lake)
+        try:
+            rng = np.random.default_rng(0)
+            for date_str in pd.date_range("2024-01-01", periods=args.days).strftime("%Y-%m-%d"):
+                for run in range(args.runs_per_day):
+                    df = make_silver_day(rng, date_str, args.rows_per_run)
+                    df["link"] = [f"https://example.org/{date_str}/{run}/{i}.html" for i in range(len(df))]
+                    write_shard(df, SILVER_ROOT, date_str, f"part-{run:03d}.parquet")
+
+            report("before")
+            start = time.perf_counter()
+            compact_table(SILVER_ROOT, ["city", "make"])
+            print(f"compaction took {time.perf_counter() - start:.2f}s")
+            report("after")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
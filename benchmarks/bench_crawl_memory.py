@@ -0,0 +1,71 @@
+"""
+Peak memory of a multi-page crawl at increasing depth: in-memory list against ListingBuffer chunks
+
+Crawls every target city through the local stand-in, in a fresh interpreter
+per run, both ways: the original scraper's, which keeps every listing in a
+list and writes the CSV at the end, and the shipped one, scrape_run into
+ListingBuffer parquet chunks and publish_run streaming them into Bronze.
+Both crawl through crawl_cities, so only how listings are held differs.
+Reports wall time and peak RSS; the shipped peak should stay flat as
+`pages` grows, the list's grows with it.
+
+    python -m benchmarks.bench_crawl_memory --pages 1 10 50
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.local_server import serve_search_pages
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUN_CRAWL = """
+import resource, sys, time
+sys.path.insert(0, {root!r})
+from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES, crawl_cities, publish_run, scrape_run
+from src.pipelines.cars.cars.fetcher import ConcurrentFetcher
+from src.pipelines.cars.cars.run_manifest import RunManifest
+mode, url_template, max_pages = sys.argv[1], sys.argv[2], int(sys.argv[3])
+start = time.perf_counter()
+with ConcurrentFetcher(max_concurrency=8, per_host_interval=0) as fetcher:
+    if mode == "list":
+        from benchmarks.legacy import save_listings_csv
+        listings = []
+        for page in crawl_cities(TARGET_CITIES, fetcher, "2024-01-01", url_template, max_pages):
+            listings.extend(page.listings)
+        save_listings_csv(listings, "car_listings.csv")
+        rows = len(listings)
+    else:
+        manifest = RunManifest.load_or_create("2024-01-01", TARGET_CITIES)
+        scrape_run(manifest, fetcher, max_pages, url_template=url_template)
+        publish_run(manifest)
+        rows = manifest.summary()["listings"]
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, rows)
+"""
+
+
+def run_crawl(mode: str, url_template: str, max_pages: int):
+    with tempfile.TemporaryDirectory() as workdir:
+        output = subprocess.run([sys.executable, "-c", RUN_CRAWL.format(root=ROOT), mode, url_template,
+                                 str(max_pages)], cwd=workdir, check=True, capture_output=True, text=True).stdout
+    seconds, peak_mb, rows = output.strip().splitlines()[-1].split()
+    return float(seconds), float(peak_mb), int(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20])
+    args = parser.parse_args()
+
+    for pages in args.pages:
+        with serve_search_pages(latency=0, pages_per_city=pages, cache_pages=False) as server:
+            for mode, label in (("list", "in-memory list"), ("chunks", "ListingBuffer chunks")):
+                seconds, peak_mb, rows = run_crawl(mode, server.url_template, pages + 1)
+                print(f"pages/city={pages:4d}  {label:20s}  listings={rows:8d}  time={seconds:7.2f}s  "
+                      f"peak RSS={peak_mb:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
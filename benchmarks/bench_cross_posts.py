@@ -0,0 +1,146 @@
+"""
+Cross-posted listing detection: accuracy, throughput and scaling of the MinHash/LSH index
+
+Generates --days days of Silver-shaped listings, --rows in all. A share of
+cars is cross-posted to 1-4 other cities, the same day or a few days later,
+with the edits dealers make: title case, a dropped or added phrase, a price
+nudged by up to 3%. Each day is matched against the index and added to it,
+as a pipeline run does. Reports per-day time, how many injected copies
+were flagged (recall) and how many flags fell on a car's extra rows
+rather than on a car's only row (precision), and the listing count Gold would report with and without the
+flag. A sample is also compared all-pairs to show what the index saves.
+
+Titles come from a small generator, so at millions of rows some distinct
+cars get the same title, year and mileage at a close price. They are
+flagged, and count against precision, though no detector could tell them
+apart.
+
+    python -m benchmarks.bench_cross_posts --rows 2000000
+"""
+import argparse
+import random
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import title_pool
+from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES
+from src.transformations.cross_posts import CrossPostIndex, Fingerprints, confirmed
+from src.transformations.silver_layer import MILEAGE_PATTERN, extract_number
+
+PHRASES = [" - call now", " financing available", " CLEAN CARFAX", " must see"]
+
+
+def edit_title(title: str, rng: random.Random) -> str:
+    choice = rng.random()
+    if choice < 0.5:
+        return title
+    if choice < 0.65:
+        return title.upper()
+    if choice < 0.8:
+        return title.lower()
+    if choice < 0.9 and " " in title:
+        return title.rsplit(" ", 1)[0]
+    return title + rng.choice(PHRASES)
+
+
+def make_days(rows: int, days: int, share: float, seed: int = 0):
+    """Per-day listing frames, and for each row the car it shows (copies share their original's car id)"""
+    rng = np.random.default_rng(seed)
+    edits = random.Random(seed)
+    cities = np.array(list(TARGET_CITIES.values()), dtype=object)
+
+    cars = int(rows / (1 + share * 2.5))
+    # Year and mileage as Silver parses them out of the title
+    pool = title_pool(cars, seed)
+    titles = pool['title'].to_numpy(dtype=object)
+    parsed_year = pd.to_numeric(pool['year'], errors='coerce').to_numpy()
+    year = np.where(np.isnan(parsed_year), rng.integers(1995, 2025, cars), parsed_year).astype(np.int16)
+    price = rng.integers(500, 65_000, cars).astype(np.int32)
+    mileage = extract_number(pool['mileage'], MILEAGE_PATTERN).astype(np.float32)
+    day = rng.integers(0, days, cars)
+    city = rng.integers(0, len(cities), cars)
+
+    copied = np.flatnonzero(rng.random(cars) < share)
+    copy_car = np.repeat(copied, rng.integers(1, 5, len(copied)))
+    copy_car = copy_car[:rows - cars]
+    copy_day = np.minimum(day[copy_car] + rng.choice([0, 0, 0, 1, 2], len(copy_car)), days - 1)
+    copy_price = (price[copy_car] * np.where(rng.random(len(copy_car)) < 0.8, 1,
+                                             rng.uniform(0.97, 1.03, len(copy_car)))).astype(np.int32)
+
+    df = pd.DataFrame({
+        'car': np.concatenate([np.arange(cars), copy_car]),
+        'copy': np.concatenate([np.zeros(cars, bool), np.ones(len(copy_car), bool)]),
+        'title': np.concatenate([titles, [edit_title(t, edits) for t in titles[copy_car]]]),
+        'year': np.concatenate([year, year[copy_car]]),
+        'price_numeric': np.concatenate([price, copy_price]),
+        'mileage_numeric': np.concatenate([mileage, mileage[copy_car]]),
+        'city': cities[np.concatenate([city, rng.integers(0, len(cities), len(copy_car))])],
+        'day': np.concatenate([day, copy_day]),
+    })
+    df['link'] = "https://x.craigslist.org/ctd/d/" + pd.Series(np.arange(len(df))).astype(str) + ".html"
+    df['data_date'] = (pd.Timestamp("2024-01-01") + pd.to_timedelta(df['day'], unit='D')).dt.strftime('%Y-%m-%d')
+    # Within a day, originals come before their copies, as they are posted first
+    df = df.sort_values(['day', 'copy'], kind='stable').reset_index(drop=True)
+    return [part.reset_index(drop=True) for _, part in df.groupby('day')]
+
+
+def all_pairs_seconds(batch: Fingerprints, sample: int) -> float:
+    """Seconds to confirm every pair among `sample` rows, as a matcher without an index would"""
+    sample = batch.take(np.arange(min(sample, len(batch))))
+    start = time.perf_counter()
+    for i in range(1, len(sample)):
+        confirmed(sample, np.full(i, i), sample, np.arange(i))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--share", type=float, default=0.1, help="Share of cars cross-posted")
+    parser.add_argument("--sample", type=int, default=5_000, help="Rows compared all-pairs for the estimate")
+    args = parser.parse_args()
+
+    frames = make_days(args.rows, args.days, args.share)
+    flagged, elapsed = [], 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        index = CrossPostIndex.load(f"{tmp}/index.parquet")
+        for number, df in enumerate(frames):
+            start = time.perf_counter()
+            batch = Fingerprints.of(df)
+            fingerprint_seconds = time.perf_counter() - start
+            cluster = index.match(batch)
+            index.add(batch, cluster)
+            seconds = time.perf_counter() - start
+            elapsed += seconds
+            flagged.append(cluster != batch.link_hash)
+            print(f"day {number + 1:>2}  {len(df):>9,} rows  index {len(index) - len(df):>10,}  "
+                  f"{seconds:6.2f}s (fingerprints {fingerprint_seconds:5.2f}s)  "
+                  f"{len(df) / seconds:>9,.0f} rows/s  {flagged[-1].sum():>7,} cross-posts")
+        start = time.perf_counter()
+        index.save()
+        save_seconds = time.perf_counter() - start
+
+    df = pd.concat(frames, ignore_index=True)
+    flag = np.concatenate(flagged)
+    # Which copy of a car goes unflagged does not matter, only how many of its rows are flagged
+    per_car = pd.DataFrame({'car': df['car'], 'flag': flag}).groupby('car')['flag'].agg(['size', 'sum'])
+    copies = per_car['size'] - 1
+    hits = np.minimum(per_car['sum'], copies).sum()
+    print(f"\n{len(df):,} rows in {elapsed:.1f}s ({len(df) / elapsed:,.0f} rows/s), index saved in {save_seconds:.1f}s")
+    print(f"injected copies {copies.sum():,}, flagged {flag.sum():,}: "
+          f"recall {hits / max(copies.sum(), 1):.1%}, precision {hits / max(flag.sum(), 1):.1%}")
+    print(f"Gold listing count: {len(df):,} without the flag, {(~flag).sum():,} with it, "
+          f"{df['car'].nunique():,} distinct cars")
+
+    sample_seconds = all_pairs_seconds(Fingerprints.of(frames[0]), args.sample)
+    pairs = args.sample * (args.sample - 1) / 2
+    print(f"all-pairs: {pairs:,.0f} pairs of {args.sample:,} rows in {sample_seconds:.1f}s; "
+          f"all pairs of {len(df):,} rows would take ~{sample_seconds / pairs * len(df) ** 2 / 2 / 60:,.0f} min")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Dashboard data loading as Silver history grows
+
+Writes D days of synthetic Silver shards into a temporary lake and times one
+dashboard render's worth of data access: cold, warm, and after one more day
+lands. The warm render should stay flat as D grows; the original
+glob-and-concat loading is timed alongside for reference.
+
+    python -m benchmarks.bench_dashboard_data --days 30 90 --rows-per-day 50000
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_gold_partials import make_silver_day
+from src.analytics import data_access, metrics
+from src.transformations.lake import write_shard
+
+
+def add_day(rng: np.random.Generator, date_str: str, rows: int) -> None:
+    df = make_silver_day(rng, date_str, rows)
+    df["title"] = "2015 Toyota Camry"
+    df["link"] = [f"https://example.org/{date_str}/{i}.html" for i in range(rows)]
+    write_shard(df, data_access.SILVER_ROOT, date_str)
+
+
+def render() -> None:
+    metrics.get_market_summary()
+    metrics.get_make_stats()
+    data_access.load_silver(["price_numeric"])
+    data_access.load_silver(["make"])
+
+
+def legacy_render() -> None:
+    # Every dashboard function used to glob and read all columns of every shard
+    for _ in range(4):
+        pd.concat([pd.read_parquet(f) for f in glob.glob(f"{data_access.SILVER_ROOT}/**/*.parquet", recursive=True)])
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[10, 30])
+    parser.add_argument("--rows-per-day", type=int, default=50_000)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    for days in args.days:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                rng = np.random.default_rng(0)
+                dates = [str(d.date()) for d in pd.date_range("2024-01-01", periods=days + 1)]
+                for date_str in dates[:-1]:
+                    add_day(rng, date_str, args.rows_per_day)
+                data_access.clear_cache()
+
+                cold, warm = timed(render), timed(render)
+                add_day(rng, dates[-1], args.rows_per_day)
+                new_day = timed(render)
+                legacy = timed(legacy_render)
+                print(f"{days:4d} days: cold {cold:6.2f}s  warm {warm * 1000:7.1f}ms  "
+                      f"after new day {new_day:6.2f}s  legacy {legacy:6.2f}s")
+            finally:
+                os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
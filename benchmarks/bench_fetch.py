@@ -0,0 +1,58 @@
+"""
+Wall-clock benchmark: serial scrape loop vs ConcurrentFetcher
+
+Runs both against the local stand-in server, so no Craigslist traffic.
+
+    python -m benchmarks.bench_fetch --latency 0.2 --slow-city chicago=3
+"""
+import argparse
+import time
+
+import requests
+
+from benchmarks.local_server import serve_search_pages
+from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES, crawl_cities, parse_search_page
+from src.pipelines.cars.cars.fetcher import DEFAULT_HEADERS, ConcurrentFetcher
+
+
+def serial_scrape(url_template: str, sleep: float) -> int:
+    """The original loop: one bare requests.get per city plus a fixed sleep"""
+    count = 0
+    for city_code, city_name in TARGET_CITIES.items():
+        response = requests.get(url_template.format(city_code=city_code), headers=DEFAULT_HEADERS)
+        count += len(parse_search_page(response.content, city_code, city_name, "2024-01-01"))
+        time.sleep(sleep)
+    return count
+
+
+def concurrent_scrape(url_template: str, max_concurrency: int, interval: float) -> int:
+    with ConcurrentFetcher(max_concurrency=max_concurrency, per_host_interval=interval) as fetcher:
+        pages = crawl_cities(TARGET_CITIES, fetcher, "2024-01-01", url_template, max_pages=1)
+        return sum(len(page.listings) for page in pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="Server response delay per request (s)")
+    parser.add_argument("--slow-city", action="append", default=[], help="city=seconds override, repeatable")
+    parser.add_argument("--sleep", type=float, default=1.0, help="Serial loop sleep between cities (s)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    slow = {k: float(v) for k, v in (item.split("=") for item in args.slow_city)}
+    with serve_search_pages(latency=args.latency, slow_cities=slow, listings_per_page=100) as server:
+        start = time.perf_counter()
+        serial_count = serial_scrape(server.url_template, args.sleep)
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent_count = concurrent_scrape(server.url_template, args.concurrency, 1.0)
+        concurrent_time = time.perf_counter() - start
+
+    print(f"serial:     {serial_time:7.2f}s  {serial_count} listings")
+    print(f"concurrent: {concurrent_time:7.2f}s  {concurrent_count} listings  "
+          f"(concurrency={args.concurrency}, {serial_time / concurrent_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
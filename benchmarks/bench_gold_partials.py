@@ -0,0 +1,91 @@
+"""
+Accuracy and cost of Gold rollups merged from daily partials
+
+Builds per-(city, date) partials for D synthetic days of Silver rows, then
+compares the all-time city rollup against exact pandas aggregates over the
+same rows: counts and means must match, and each median must be within the
+sketch's relative accuracy of the exact lower median. Also times the merge
+against recomputing from every row.
+
+    python -m benchmarks.bench_gold_partials --days 30 --rows-per-day 200000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.transformations.gold_partials import build_partials, city_stats
+from src.transformations.sketches import QuantileSketch
+
+CITIES = ["newyork", "losangeles", "chicago", "houston", "phoenix", "philadelphia", "sanantonio", "sandiego"]
+MODELS = ["Civic", "Camry", "F-150", "Model 3", "Accord", "Corolla", "Altima", "Wrangler"]
+MAKES = ["Toyota", "Honda", "Ford", "Chevrolet", "BMW", "Tesla", "Nissan", "Kia", "Audi", "Jeep", "Mazda", "Subaru"]
+
+
+def make_silver_day(rng: np.random.Generator, date_str: str, rows: int) -> pd.DataFrame:
+    city = rng.choice(CITIES, rows)
+    # Skewed, city-dependent prices, like the real distribution
+    scale = 1 + np.array([CITIES.index(c) for c in city]) / 10
+    return pd.DataFrame({
+        "city": pd.Categorical(city),
+        "make": pd.Categorical(rng.choice(MAKES, rows)),
+        "model": pd.Categorical(rng.choice(MODELS, rows)),
+        "data_date": pd.Timestamp(date_str).date(),
+        "price_numeric": (rng.lognormal(9.8, 0.6, rows) * scale).clip(501, 2**31 - 1).astype(np.int32),
+        "mileage_numeric": np.where(rng.random(rows) < 0.2, np.nan, rng.integers(0, 250_000, rows)).astype(np.float32),
+        "year": rng.integers(1995, 2025, rows).astype(np.int16),
+    })
+
+
+def check(rollup: pd.DataFrame, exact: pd.DataFrame, accuracy: float) -> int:
+    failures = 0
+    merged = rollup.set_index("city").join(exact.set_index("city"), rsuffix="_exact")
+    for city, row in merged.iterrows():
+        median_error = abs(row["median_price"] - row["lower_median"]) / row["lower_median"]
+        ok = (row["listing_count"] == row["listing_count_exact"]
+              and abs(row["avg_price"] - row["avg_price_exact"]) < 0.01
+              and median_error <= accuracy)
+        failures += not ok
+        print(f"{city:14s} n={int(row['listing_count']):>9,}  avg {row['avg_price']:>10,.2f} vs {row['avg_price_exact']:>10,.2f}"
+              f"  median {row['median_price']:>9,.0f} vs {row['median_price_exact']:>9,.0f}"
+              f" (err {median_error:.3%})  {'ok' if ok else 'FAIL'}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rows-per-day", type=int, default=200_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    dates = [str(d.date()) for d in pd.date_range("2024-01-01", periods=args.days)]
+    days = [make_silver_day(rng, d, args.rows_per_day) for d in dates]
+
+    start = time.perf_counter()
+    partials = pd.concat([build_partials(day) for day in days], ignore_index=True)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rollup = city_stats(partials)
+    merge_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    silver = pd.concat(days, ignore_index=True)
+    exact = silver.groupby("city", observed=True)["price_numeric"].agg(
+        listing_count="size", avg_price="mean", median_price="median",
+        lower_median=lambda p: np.quantile(p, 0.5, method="lower"),
+    ).reset_index()
+    exact_time = time.perf_counter() - start
+
+    failures = check(rollup, exact, QuantileSketch().relative_accuracy)
+    print(f"partials: {len(partials)} rows for {len(silver):,} listings, built in {build_time:.2f}s "
+          f"({build_time / args.days:.3f}s per day)")
+    print(f"all-time rollup from partials: {merge_time:.3f}s; exact recompute from rows: {exact_time:.2f}s")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+HTML extraction backends on saved search page fixtures
+
+Checks every backend produces the same CarListings as bs4 on each page in
+fixtures/pages, then reports pages/sec and peak allocated bytes per listing.
+
+    python -m benchmarks.bench_html_extract --repeat 50
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+from src.pipelines.cars.cars.comprehensive_scraping import parse_search_page
+from src.pipelines.cars.cars.html_extract import EXTRACTORS
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+
+
+def load_pages():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(PAGES_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            pages[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return pages
+
+
+def check_parity(pages) -> int:
+    mismatches = 0
+    for name, content in pages.items():
+        city_code = name.split("_")[0]
+        expected = parse_search_page(content, city_code, city_code, "2024-01-01", backend="bs4")
+        for backend in EXTRACTORS:
+            actual = parse_search_page(content, city_code, city_code, "2024-01-01", backend=backend)
+            if actual != expected:
+                mismatches += 1
+                print(f"MISMATCH {backend} on {name}: {len(actual)} vs {len(expected)} listings")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the fixture pages per backend")
+    args = parser.parse_args()
+
+    pages = load_pages()
+    if check_parity(pages):
+        raise SystemExit(1)
+    print(f"parity: {len(pages)} fixture pages identical across {', '.join(EXTRACTORS)}")
+
+    for backend, extract in EXTRACTORS.items():
+        n_pages = n_listings = 0
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for content in pages.values():
+                n_listings += len(extract(content))
+                n_pages += 1
+        elapsed = time.perf_counter() - start
+
+        peak_per_listing = []
+        for content in pages.values():
+            tracemalloc.start()
+            count = len(extract(content))
+            peak_per_listing.append(tracemalloc.get_traced_memory()[1] / max(count, 1))
+            tracemalloc.stop()
+
+        print(f"{backend:5s} {n_pages / elapsed:8.1f} pages/s  {n_listings / elapsed:10,.0f} listings/s  "
+              f"peak alloc {sum(peak_per_listing) / len(peak_per_listing) / 1024:6.1f} KB/listing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Cold, revalidated and fresh crawls through the on-disk HTTP cache
+
+Crawls the local stand-in three times into a temporary cache: cold, then
+with TTL 0 (every page revalidated, unchanged pages answer 304), then within
+the TTL (no requests at all).
+
+    python -m benchmarks.bench_http_cache --pages 3
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks.local_server import serve_search_pages
+from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES, crawl_cities
+from src.pipelines.cars.cars.fetcher import ConcurrentFetcher
+from src.pipelines.cars.cars.http_cache import HTTPCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=3, help="Result pages served per city")
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with serve_search_pages(latency=args.latency, pages_per_city=args.pages) as server, \
+            tempfile.TemporaryDirectory() as cache_dir:
+        for label, ttl in [("cold", 3600), ("revalidate", 0), ("fresh", 3600)]:
+            cache = HTTPCache(root=cache_dir, ttl=ttl)
+            requests_before, bytes_before = server.request_count, server.bytes_sent
+            start = time.perf_counter()
+            with ConcurrentFetcher(max_concurrency=8, per_host_interval=0, cache=cache) as fetcher:
+                pages = crawl_cities(TARGET_CITIES, fetcher, "2024-01-01", server.url_template, args.pages + 1)
+                listings = sum(len(page.listings) for page in pages)
+            elapsed = time.perf_counter() - start
+            print(f"{label:10s} {elapsed:6.2f}s  listings={listings}  "
+                  f"requests={server.request_count - requests_before}  "
+                  f"body bytes={server.bytes_sent - bytes_before:,}  {cache.stats.as_dict()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Op handoff cost: pickling filesystem IO manager against the Arrow IO manager
+
+Stores a Bronze-shaped frame of N rows through each IO manager, then loads
+it in a fresh interpreter and runs the Silver cleaning step on it, as the
+downstream op would. Reports store time, file size, load time, the
+cleaning step's time on the loaded frame and the resident memory the
+load added, split into private (anonymous) and mapped file pages.
+
+    python -m benchmarks.bench_io_manager --rows 2000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from dagster import (
+    FilesystemIOManager, PythonObjectDagsterType, build_init_resource_context, build_input_context, build_output_context,
+)
+
+from benchmarks.bench_silver import make_bronze
+from src.transformations.arrow_io import ArrowIOManager
+
+FRAME = PythonObjectDagsterType(pd.DataFrame)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOAD = """
+import sys, time
+sys.path.insert(0, {root!r})
+from benchmarks.bench_io_manager import FRAME, FilesystemIOManager, ArrowIOManager, build_init_resource_context, \
+    build_input_context, build_output_context, rss_mb
+from src.transformations.silver_layer import clean_listings
+manager = {manager}(base_dir={base_dir!r}).create_io_manager(build_init_resource_context())
+output = build_output_context(step_key="bronze", name="result", run_id="bench", dagster_type=FRAME)
+context = build_input_context(upstream_output=output, dagster_type=output.dagster_type)
+before = rss_mb()
+start = time.perf_counter()
+df = manager.load_input(context)
+loaded = time.perf_counter()
+after = rss_mb()
+clean_listings(df)
+print(loaded - start, time.perf_counter() - loaded, after[0] - before[0], after[1] - before[1])
+"""
+
+
+def rss_mb():
+    """Current (anonymous, file-backed) resident memory in MB
+
+    ru_maxrss would carry over the parent's peak into the child, so this
+    reads the current split instead; mapped file pages are page cache the
+    kernel can drop, anonymous pages are the process's own.
+    """
+    with open("/proc/self/status") as f:
+        status = dict(line.split(":", 1) for line in f)
+    return tuple(int(status[key].split()[0]) / 1024 for key in ("RssAnon", "RssFile"))
+
+
+def bronze_frame(rows: int) -> pd.DataFrame:
+    df = make_bronze(rows, distinct=50_000)
+    df["title"] = df["year"].astype("Int64").astype(str) + " " + df["make"].astype(str) + " " + df["model"].astype(str)
+    df["scrape_date"] = "2024-01-01 02:00:00"
+    df["ingestion_timestamp"] = pd.Timestamp.now()
+    df["data_date"] = pd.Timestamp("2024-01-01").date()
+    df["source_file"] = "car_listings_20240101_020000.csv"
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    df = bronze_frame(args.rows)
+    print(f"Bronze frame: {args.rows:,} rows, {df.memory_usage(deep=True).sum() / 1024 ** 2:,.0f} MB in memory")
+    with tempfile.TemporaryDirectory() as base_dir:
+        for manager in (FilesystemIOManager, ArrowIOManager):
+            directory = os.path.join(base_dir, manager.__name__)
+            # FilesystemIOManager is a factory for the pickling manager; ArrowIOManager returns itself
+            io_manager = manager(base_dir=directory).create_io_manager(build_init_resource_context())
+            start = time.perf_counter()
+            io_manager.handle_output(build_output_context(step_key="bronze", name="result", run_id="bench",
+                                                          dagster_type=FRAME), df)
+            stored = time.perf_counter() - start
+            size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(directory) for f in files)
+
+            code = LOAD.format(root=ROOT, manager=manager.__name__, base_dir=directory)
+            output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+            loaded, cleaned, anon_mb, file_mb = map(float, output.strip().splitlines()[-1].split())
+            print(f"{manager.__name__:20s} store {stored:5.2f}s {size / 1024 ** 2:6,.0f} MB  load {loaded:5.2f}s  "
+                  f"RSS +{anon_mb:5,.0f} MB anon +{file_mb:5,.0f} MB mapped  clean_listings {cleaned:5.2f}s")
+
+
+if __name__ == "__main__":
+    main()
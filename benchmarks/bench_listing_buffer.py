@@ -0,0 +1,90 @@
+"""
+Bytes per listing: a list of CarListing tuples against a ListingBuffer
+
+Crawls every target city through the local stand-in and keeps the parsed
+listings once as a list of CarListing tuples and once in a ListingBuffer,
+reporting traced memory retained per listing. Then times getting each into
+an Arrow table: through a CSV file and the Bronze CSV reader for the list,
+straight from the buffers for the ListingBuffer, and checks both tables hold
+the same values.
+
+    python -m benchmarks.bench_listing_buffer --pages 20
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pyarrow as pa
+
+from benchmarks.legacy import save_listings_csv
+from benchmarks.local_server import serve_search_pages
+from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES, crawl_cities
+from src.pipelines.cars.cars.fetcher import ConcurrentFetcher
+from src.pipelines.cars.cars.listing_buffer import ListingBuffer
+from src.pipelines.cars.cars.title_parser import parse_title
+from src.transformations.bronze_layer import read_raw_csv
+
+
+def crawl_into(url_template: str, max_pages: int, store):
+    """Crawl into `store` (a list or a ListingBuffer), returning the memory it retains"""
+    with ConcurrentFetcher(max_concurrency=8, per_host_interval=0) as fetcher:
+        gc.collect()
+        tracemalloc.start()
+        for page in crawl_cities(TARGET_CITIES, fetcher, "2024-01-01", url_template, max_pages):
+            store.extend(page.listings)
+            del page
+        # The title parse cache holds titles and parse results of its own, in either case
+        parse_title.cache_clear()
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return retained
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20, help="Search result pages per city")
+    args = parser.parse_args()
+
+    with serve_search_pages(latency=0, pages_per_city=args.pages, cache_pages=False) as server:
+        listings = []
+        list_bytes = crawl_into(server.url_template, args.pages + 1, listings)
+        buffer = ListingBuffer()
+        buffer_bytes = crawl_into(server.url_template, args.pages + 1, buffer)
+
+    rows = len(listings)
+    print(f"{rows:,} listings from {len(TARGET_CITIES)} cities x {args.pages} pages")
+    print(f"list of CarListing  {list_bytes / rows:7.0f} bytes/listing  {list_bytes / 1e6:8.1f} MB")
+    print(f"ListingBuffer       {buffer_bytes / rows:7.0f} bytes/listing  {buffer_bytes / 1e6:8.1f} MB  "
+          f"(nbytes {buffer.nbytes / rows:.0f} bytes/listing)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def via_csv() -> pa.Table:
+            path = os.path.join(tmp, "car_listings_bench.csv")
+            save_listings_csv(listings, path)
+            return pa.Table.from_pandas(read_raw_csv(path), preserve_index=False)
+
+        from_csv, csv_seconds = timed(via_csv)
+        direct, direct_seconds = timed(lambda: buffer.to_arrow(dictionary=False))
+        _, parquet_seconds = timed(lambda: buffer.write_parquet(os.path.join(tmp, "listings.parquet")))
+
+    print(f"to Arrow via CSV    {csv_seconds:7.2f}s")
+    print(f"to Arrow directly   {direct_seconds:7.2f}s  (+ parquet write {parquet_seconds:.2f}s)")
+    # Cities finish in a different order on each crawl
+    same = direct.sort_by("link").equals(from_csv.sort_by("link"))
+    print(f"same table: {same}")
+    if not same:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
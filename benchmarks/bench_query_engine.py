@@ -0,0 +1,109 @@
+"""
+Lake metrics through DuckDB vs the original load-everything pandas code
+
+Writes D days of synthetic Silver shards into a temporary lake, then runs
+the market summary and make stats both ways, each in a fresh subprocess so
+peak RSS is comparable. Results must agree; a one-week query shows the
+effect of partition pruning.
+
+    python -m benchmarks.bench_query_engine --days 30 --rows-per-day 100000
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_dashboard_data import add_day
+
+
+def pandas_metrics():
+    # The original metrics.py: read every column of every shard, then aggregate
+    silver = pd.concat([pd.read_parquet(f) for f in glob.glob("storage/silver/car_listings/**/*.parquet", recursive=True)])
+    make_stats = silver.groupby('make', observed=True).agg({'price_numeric': ['mean', 'count'], 'mileage_numeric': 'mean'})
+    return {
+        "total_listings": len(silver),
+        "avg_price": silver['price_numeric'].mean(),
+        "median_price": silver['price_numeric'].median(),
+        "top_make": str(silver['make'].mode()[0]),
+        "make_count_sum": int(make_stats[('price_numeric', 'count')].sum()),
+    }
+
+
+def sql_metrics(start_date=None, end_date=None):
+    from src.analytics.metrics import _make_stats, _market_summary
+    summary = _market_summary(start_date, end_date)
+    make_stats = _make_stats(start_date, end_date)
+    return {
+        "total_listings": summary["total_listings"],
+        "avg_price": summary["avg_price"],
+        "median_price": summary["median_price"],
+        "top_make": summary["top_make"],
+        "make_count_sum": int(make_stats[('price_numeric', 'count')].sum()),
+    }
+
+
+def run_child(mode: str, lake: str) -> dict:
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_query_engine", "--child", mode, "--lake", lake],
+                         capture_output=True, text=True, check=True, cwd=os.getcwd())
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def child(mode: str, lake: str) -> None:
+    sys.path.insert(0, os.getcwd())
+    os.chdir(lake)
+    start = time.perf_counter()
+    if mode == "pandas":
+        result = pandas_metrics()
+    elif mode == "sql":
+        result = sql_metrics()
+    else:
+        dates = sorted(os.listdir("storage/silver/car_listings"))
+        result = sql_metrics(dates[-7][len("date="):], None)
+    result["seconds"] = time.perf_counter() - start
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rows-per-day", type=int, default=100_000)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--lake", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.lake)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as lake:
+        os.chdir(lake)
+        rng = np.random.default_rng(0)
+        for date_str in pd.date_range("2024-01-01", periods=args.days).strftime("%Y-%m-%d"):
+            # Silver partitions by processing date; write one shard per day
+            add_day(rng, date_str, args.rows_per_day)
+        os.chdir(cwd)
+
+        results = {mode: run_child(mode, lake) for mode in ("pandas", "sql", "sql_last_week")}
+
+    for mode, result in results.items():
+        print(f"{mode:14s} {result['seconds']:7.2f}s  peak RSS {result['peak_rss_mb']:8,.0f} MB  "
+              f"rows {result['total_listings']:>11,}  median {result['median_price']:>9,.1f}  top {result['top_make']}")
+    pandas_result, sql_result = results["pandas"], results["sql"]
+    mismatched = [k for k in ("total_listings", "median_price", "top_make", "make_count_sum")
+                  if pandas_result[k] != sql_result[k]]
+    if mismatched or abs(pandas_result["avg_price"] - sql_result["avg_price"]) > 1e-6:
+        print(f"MISMATCH: {mismatched or ['avg_price']}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Recovery time of a killed scrape run: resume from the manifest vs start over
+
+A child process crawls the local stand-in and is killed partway through. The
+run is then resumed from its manifest, and the result is compared with a
+clean full run in both time and output.
+
+    python -m benchmarks.bench_resume --pages 4 --kill-after 3
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.local_server import serve_search_pages
+from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES, scrape_run
+from src.pipelines.cars.cars.fetcher import ConcurrentFetcher
+from src.pipelines.cars.cars.run_manifest import RunManifest
+
+
+def run(runs_root: str, url_template: str, max_pages: int) -> RunManifest:
+    manifest = RunManifest.load_or_create("2024-01-01", TARGET_CITIES, root=runs_root)
+    with ConcurrentFetcher(max_concurrency=8, per_host_interval=0) as fetcher:
+        scrape_run(manifest, fetcher, max_pages, url_template=url_template)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=4, help="Result pages served per city")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--kill-after", type=float, default=3.0, help="Seconds before the first attempt is killed")
+    args = parser.parse_args()
+
+    with serve_search_pages(latency=args.latency, pages_per_city=args.pages) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        full = run(os.path.join(tmp, "full"), server.url_template, args.pages + 1)
+        full_time = time.perf_counter() - start
+        full_requests = server.request_count
+
+        crashed_root = os.path.join(tmp, "crashed")
+        child = subprocess.Popen([sys.executable, "-c",
+                                  "import sys; from benchmarks.bench_resume import run; "
+                                  "run(sys.argv[1], sys.argv[2], int(sys.argv[3]))",
+                                  crashed_root, server.url_template, str(args.pages + 1)],
+                                 stdout=subprocess.DEVNULL)
+        time.sleep(args.kill_after)
+        child.kill()
+        child.wait()
+        requests_before = server.request_count
+
+        start = time.perf_counter()
+        resumed = run(crashed_root, server.url_template, args.pages + 1)
+        resume_time = time.perf_counter() - start
+
+        print(f"full run:    {full_time:6.2f}s  {full_requests} requests  {full.summary()['listings']} listings")
+        print(f"resumed run: {resume_time:6.2f}s  {server.request_count - requests_before} requests  "
+              f"{resumed.summary()['listings']} listings")
+        full_links = [link for chunk in full.committed_chunks() for link in chunk.column("link").to_pylist()]
+        resumed_links = [link for chunk in resumed.committed_chunks() for link in chunk.column("link").to_pylist()]
+        print(f"committed rows: full={len(full_links)}  resumed={len(resumed_links)}  "
+              f"same listings: {sorted(full_links) == sorted(resumed_links)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Crawl scheduling: a fixed daily full crawl against the adaptive per-city plan
+
+Simulates cities posting listings at rates from a handful a day to a few
+thousand, with result pages newest first, and crawls them for N days two
+ways: every city daily at full depth, as the daily schedule did, and
+hourly ticks of plan_crawls / due_cities over CrawlStats fed by the
+simulated crawls, as the adaptive schedule does. Reports requests spent,
+new listings captured, new listings per request and the mean delay from
+posting to capture. A city's rate is known after its second crawl and
+until then it gets a full daily crawl, so requests are also given from the
+third day on.
+
+    python -m benchmarks.bench_scheduler --days 14 --budget 1000
+"""
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from src.pipelines.cars.cars.crawl_scheduler import PAGE_LISTINGS, CrawlStats, due_cities, plan_crawls
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class City:
+    """Listing ids and posting hours of one simulated city, newest first from any point in time"""
+
+    def __init__(self, code: str, rate_per_day: float, latency: float, hours: int, rng: np.random.Generator,
+                 first_id: int):
+        # A stock of older listings, so the first crawls see full pages
+        stock = max(PAGE_LISTINGS * 20, int(rate_per_day * 30))
+        count = rng.poisson(rate_per_day * hours / 24)
+        self.code = code
+        self.latency = latency
+        self.posted = np.concatenate([np.sort(rng.uniform(-24 * 30, 0, stock)), np.sort(rng.uniform(0, hours, count))])
+        self.ids = np.arange(first_id, first_id + len(self.posted), dtype=np.uint64)
+        self.new = count
+
+    def crawl(self, hour: float, pages: int) -> slice:
+        end = int(np.searchsorted(self.posted, hour, side="right"))
+        return slice(max(0, end - pages * PAGE_LISTINGS), end)
+
+
+def make_cities(count: int, hours: int, seed: int):
+    rng = np.random.default_rng(seed)
+    rates = np.exp(rng.uniform(np.log(5), np.log(3000), count))
+    latencies = rng.uniform(0.3, 3.0, count)
+    cities, first_id = [], 0
+    for i, (rate, latency) in enumerate(zip(rates, latencies)):
+        city = City(f"city{i:02d}", rate, latency, hours, rng, first_id)
+        first_id += len(city.ids)
+        cities.append(city)
+    return cities
+
+
+def simulate(cities, hours: int, schedule):
+    """Run `schedule(hour) -> {code: pages}` hourly, returning requests per day, captures and mean delay in hours"""
+    first_seen = {city.code: np.full(len(city.ids), np.nan) for city in cities}
+    by_code = {city.code: city for city in cities}
+    requests = np.zeros(hours // 24)
+    for hour in range(hours):
+        for code, pages in schedule(hour).items():
+            city = by_code[code]
+            seen = city.crawl(hour, pages)
+            requests[hour // 24] += pages
+            window = first_seen[code][seen]
+            window[np.isnan(window)] = hour
+            first_seen[code][seen] = window
+            schedule.observed(city, seen, pages, hour)
+
+    captured, delay = 0, 0.0
+    for city in cities:
+        fresh = slice(len(city.ids) - city.new, len(city.ids))
+        found = ~np.isnan(first_seen[city.code][fresh])
+        captured += int(found.sum())
+        delay += float((first_seen[city.code][fresh][found] - city.posted[fresh][found]).sum())
+    return requests, captured, delay / max(captured, 1)
+
+
+class Daily:
+    def __init__(self, cities, pages: int):
+        self.codes = [city.code for city in cities]
+        self.pages = pages
+
+    def __call__(self, hour: int):
+        return {code: self.pages for code in self.codes} if hour % 24 == 2 else {}
+
+    def observed(self, city, seen, pages, hour):
+        pass
+
+
+class Adaptive:
+    def __init__(self, cities, stats: CrawlStats, budget: int, pages: int):
+        self.codes = [city.code for city in cities]
+        self.stats = stats
+        self.budget = budget
+        self.pages = pages
+
+    def __call__(self, hour: int):
+        plans = plan_crawls(self.codes, self.stats, self.budget, self.pages)
+        return due_cities(plans, self.stats, START + timedelta(hours=hour))
+
+    def observed(self, city, seen, pages, hour):
+        self.stats.observe(city.code, city.ids[seen], [city.latency] * pages, at=START + timedelta(hours=hour))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=14, help="Simulated days, at least 3")
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=20, help="Full crawl depth")
+    parser.add_argument("--budget", type=int, default=1000, help="Adaptive plan's requests a day")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    hours = args.days * 24
+    cities = make_cities(args.cities, hours, args.seed)
+    posted = sum(city.new for city in cities)
+    print(f"{args.cities} cities, {posted:,} new listings over {args.days} days "
+          f"({posted / args.days:,.0f} a day)")
+    with tempfile.TemporaryDirectory() as root:
+        schedules = {
+            "daily full crawl": Daily(cities, args.pages),
+            "adaptive": Adaptive(cities, CrawlStats(root), args.budget, args.pages),
+        }
+        for name, schedule in schedules.items():
+            requests, captured, delay = simulate(cities, hours, schedule)
+            print(f"{name:17s} {requests.sum() / args.days:7,.0f} requests/day ({requests[2:].mean():5,.0f} from "
+                  f"day 3)  captured {captured / posted:6.1%}  {captured / requests.sum():6.1f} new/request  "
+                  f"mean delay {delay:5.1f}h")
+
+
+if __name__ == "__main__":
+    main()
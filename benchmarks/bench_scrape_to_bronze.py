@@ -0,0 +1,89 @@
+"""
+Scraper-to-Bronze handoff: CSV file and re-parse against direct parquet publishing
+
+Crawls the local stand-in into a scrape run, then gets the run's listings
+into Bronze both ways and through bronze_layer_ingestion, as the daily
+pipeline would: via the run's CSV export, which ingestion parses, types and
+rewrites as parquet, and via publish_run, which writes the Bronze shard
+directly and leaves ingestion only to read it back. Checks both give the
+same rows.
+
+    python -m benchmarks.bench_scrape_to_bronze --pages 20 --repeat 10
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from benchmarks.local_server import serve_search_pages
+from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES, publish_run, scrape_run
+from src.pipelines.cars.cars.fetcher import ConcurrentFetcher
+from src.pipelines.cars.cars.run_manifest import RunManifest
+from src.transformations.bronze_layer import bronze_layer_ingestion
+
+COMPARED = ["year", "make", "model", "title", "price", "mileage", "dealer_type", "location", "link", "city",
+            "scrape_date", "data_date"]
+
+
+def crawl(runs_root: str, pages: int, repeat: int) -> RunManifest:
+    """A scrape run over the stand-in, with its committed chunks repeated `repeat` times for volume"""
+    manifest = RunManifest.load_or_create("2024-01-01", TARGET_CITIES, root=runs_root)
+    with serve_search_pages(latency=0, pages_per_city=pages, cache_pages=False) as server, \
+            ConcurrentFetcher(max_concurrency=8, per_host_interval=0) as fetcher:
+        scrape_run(manifest, fetcher, pages + 1, url_template=server.url_template)
+    for city_code, city in manifest.cities.items():
+        chunks = city["chunks"]
+        for copy in range(1, repeat):
+            for chunk in range(chunks):
+                os.link(manifest.chunk_path(city_code, chunk), manifest.chunk_path(city_code, copy * chunks + chunk))
+        city["chunks"] = chunks * repeat
+    return manifest
+
+
+def via_csv(manifest: RunManifest):
+    pv.write_csv(pa.concat_tables(manifest.committed_chunks()), manifest.data["output"])
+    bronze_df, _ = bronze_layer_ingestion()
+    return bronze_df
+
+
+def direct(manifest: RunManifest):
+    publish_run(manifest)
+    bronze_df, _ = bronze_layer_ingestion()
+    return bronze_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20, help="Search result pages per city")
+    parser.add_argument("--repeat", type=int, default=10, help="Times the crawled listings are repeated")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    results = {}
+    with tempfile.TemporaryDirectory() as runs_root:
+        manifest = crawl(runs_root, args.pages, args.repeat)
+        for name, handoff in (("CSV + parse", via_csv), ("direct", direct)):
+            with tempfile.TemporaryDirectory() as lake:
+                os.chdir(lake)
+                try:
+                    start = time.perf_counter()
+                    df = handoff(manifest)
+                    results[name] = (time.perf_counter() - start, df)
+                finally:
+                    os.chdir(cwd)
+
+    for name, (seconds, df) in results.items():
+        print(f"{name:12s} {len(df):>10,} rows into Bronze  {seconds:6.2f}s  {len(df) / seconds:>10,.0f} rows/s")
+    frames = [pa.Table.from_pandas(df[COMPARED], preserve_index=False).sort_by("link")
+              for _, df in results.values()]
+    same = frames[0].equals(frames[1])
+    print(f"same Bronze rows: {same}")
+    if not same:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
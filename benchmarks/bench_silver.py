@@ -0,0 +1,83 @@
+"""
+Silver transformation on a large synthetic Bronze frame
+
+Builds N Bronze-shaped rows from a pool of generated titles (values repeat,
+as they do across daily scrapes), then times the original chained
+str.replace/filter transform against the single-pass typed one and reports
+frame memory before and after. Also checks the "74.5k" mileage case.
+
+    python -m benchmarks.bench_silver --rows 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import legacy
+from benchmarks.fixtures import make_titles
+from src.pipelines.cars.cars.title_parser import parse_titles
+from src.transformations.silver_layer import clean_listings, frame_memory_mb
+
+CITIES = ["newyork", "losangeles", "chicago", "houston", "phoenix", "philadelphia", "sanantonio", "sandiego"]
+
+
+def make_bronze(rows: int, distinct: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    titles = make_titles(distinct, seed=seed)
+    pool = parse_titles(titles)
+    pool["title"] = titles
+    pool["year"] = pd.to_numeric(pool["year"], errors="coerce")
+    pool["price"] = [f"${p:,}" for p in rng.integers(100, 60_000, len(pool))]
+    pool["mileage"] = rng.choice(["74.5k", "120,000", "98000", "N/A", "45k"], len(pool))
+
+    idx = rng.integers(0, len(pool), rows)
+    df = pool.iloc[idx].reset_index(drop=True)
+    # Roughly 10% repeated links, like a listing seen on two pages
+    df["link"] = [f"https://example.org/{i}.html" for i in rng.integers(0, int(rows * 0.9), rows)]
+    df["city"] = rng.choice(CITIES, rows)
+    df["dealer_type"] = "Unknown"
+    return df
+
+
+def check_mileage() -> None:
+    sample = pd.DataFrame({"year": [2015.0], "make": ["Toyota"], "model": ["Camry"], "price": ["$12,500"],
+                           "mileage": ["74.5k"], "link": ["a"], "city": ["x"], "dealer_type": ["Unknown"]})
+    got = clean_listings(sample)["mileage_numeric"].iloc[0]
+    old = legacy.silver_layer_transformation(sample)["mileage_numeric"].iloc[0]
+    print(f'"74.5k" -> {got:,.0f} (legacy: {old:,.1f})')
+    if got != 74_500:
+        raise SystemExit(1)
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:28s} {elapsed:8.2f}s  {len(result):>12,} rows kept  {frame_memory_mb(result):10,.1f} MB")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--distinct", type=int, default=50_000, help="Distinct titles among the rows")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    check_mileage()
+    bronze = make_bronze(args.rows, args.distinct)
+    print(f"bronze: {len(bronze):,} rows, {frame_memory_mb(bronze):,.1f} MB")
+
+    if not args.skip_legacy:
+        # The legacy transform compares year against "N/A", so feed it the raw strings
+        legacy_input = bronze.assign(year=bronze["year"].astype(object).where(bronze["year"].notna(), "N/A"))
+        _, legacy_time = timed("legacy chained replace", lambda: legacy.silver_layer_transformation(legacy_input))
+        del legacy_input
+    _, new_time = timed("single-pass typed", lambda: clean_listings(bronze))
+    if not args.skip_legacy:
+        print(f"speedup: {legacy_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Peak memory of the in-memory pipeline against the streaming one
+
+Writes raw scraper CSVs of N rows and runs each job on them in a fresh
+interpreter, reporting wall time and peak RSS. The streaming job's peak
+should follow --batch-size and stay flat as N grows; the in-memory job's
+grows with N. Also checks both jobs produce the same Gold listing counts
+per city, once cross-posts are added back.
+
+    python -m benchmarks.bench_streaming --rows 500000 2000000 --batch-size 100000
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_silver import make_bronze
+from src.pipelines.cars.cars.listing_buffer import LISTING_COLUMNS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUN_JOB = """
+import resource, sys, time
+sys.path.insert(0, {root!r})
+mode, batch_size = sys.argv[1], int(sys.argv[2])
+start = time.perf_counter()
+if mode == "stream":
+    from src.transformations.streaming import streaming_pipeline
+    config = {{"config": {{"batch_size": batch_size}}}}
+    streaming_pipeline.execute_in_process(raise_on_error=True, run_config={{"ops": {{
+        "stream_bronze_ingestion": config, "stream_silver_transformation": config}}}})
+else:
+    from src.transformations.data_processing_pipeline import data_processing_pipeline
+    data_processing_pipeline.execute_in_process(raise_on_error=True)
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+"""
+
+
+def write_raw_csvs(rows: int, files: int = 4) -> None:
+    """Scraper-shaped CSVs, split over a few files as a day of runs would be"""
+    rng = np.random.default_rng(0)
+    for i in range(files):
+        df = make_bronze(rows // files, distinct=20_000, seed=i)
+        df["link"] = [f"https://{city}.example.org/{i}/{j}.html" for j, city in enumerate(df["city"])]
+        df["title"] = df["year"].astype("Int64").astype(str) + " " + df["make"].astype(str) + " " + df["model"].astype(str)
+        df["location"] = rng.choice(["Downtown", "Northside", None], len(df))
+        df["scrape_date"] = "2024-01-01 02:00:00"
+        df[LISTING_COLUMNS].to_csv(f"car_listings_20240101_{i:06d}.csv", index=False)
+
+
+def run_job(mode: str, batch_size: int):
+    output = subprocess.run([sys.executable, "-c", RUN_JOB.format(root=ROOT), mode, str(batch_size)],
+                            check=True, capture_output=True, text=True).stdout
+    seconds, peak_mb = map(float, output.strip().splitlines()[-1].split())
+    gold = pd.read_parquet("storage/gold/city_partials").groupby("city", observed=True)["listing_count"].sum()
+    # Which copy of a cross-posted car is counted depends on the order rows arrive in; add them back
+    silver = pd.read_parquet("storage/silver/car_listings", columns=["city", "cross_post"])
+    cross_posts = silver.groupby("city", observed=True)["cross_post"].sum()
+    return seconds, peak_mb, gold.add(cross_posts, fill_value=0).sort_index().tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[500_000, 2_000_000])
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            try:
+                write_raw_csvs(rows)
+                raw_mb = sum(os.path.getsize(f) for f in os.listdir(".") if f.endswith(".csv")) / 1024 ** 2
+                results = {}
+                for mode in ("frame", "stream"):
+                    results[mode] = run_job(mode, args.batch_size)
+                    shutil.rmtree("storage")
+                for mode, (seconds, peak_mb, _) in results.items():
+                    print(f"{rows:>10,} rows ({raw_mb:6.0f} MB CSV)  {mode:6s}  {seconds:7.1f}s  peak RSS {peak_mb:7.0f} MB")
+                print(f"{'':>31}same Gold counts: {results['frame'][2] == results['stream'][2]}")
+            finally:
+                os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Scraper telemetry overhead: scrape runs with and without a ScrapeTelemetry
+
+Crawls every target city through the local stand-in with no latency and no
+rate limit, so parsing and buffering dominate and any recording cost shows,
+alternating runs with telemetry off and on. Reports the best time of each
+and the telemetry run's stage breakdown.
+
+    python -m benchmarks.bench_telemetry --pages 10 --repeat 3
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks.local_server import serve_search_pages
+from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES, scrape_run
+from src.pipelines.cars.cars.fetcher import ConcurrentFetcher
+from src.pipelines.cars.cars.run_manifest import RunManifest
+from src.pipelines.cars.cars.scrape_telemetry import ScrapeTelemetry
+
+
+def timed_run(url_template: str, pages: int, telemetry):
+    with tempfile.TemporaryDirectory() as runs_root:
+        manifest = RunManifest.load_or_create("2024-01-01", TARGET_CITIES, root=runs_root)
+        with ConcurrentFetcher(max_concurrency=8, per_host_interval=0) as fetcher:
+            start = time.perf_counter()
+            scrape_run(manifest, fetcher, pages + 1, url_template=url_template, telemetry=telemetry)
+            return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=10, help="Search result pages per city")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    times = {"off": [], "on": []}
+    with serve_search_pages(latency=0, pages_per_city=args.pages) as server:
+        for _ in range(args.repeat):
+            times["off"].append(timed_run(server.url_template, args.pages, None))
+            telemetry = ScrapeTelemetry()
+            times["on"].append(timed_run(server.url_template, args.pages, telemetry))
+
+    off, on = min(times["off"]), min(times["on"])
+    totals = telemetry.report()["totals"]
+    print(f"{totals['pages']:,} pages, {totals['listings_parsed']:,} listings, {totals['bytes'] / 1e6:,.1f} MB")
+    print(f"telemetry off  {off:6.2f}s")
+    print(f"telemetry on   {on:6.2f}s  ({(on - off) / off:+.1%})")
+    print("stage seconds, summed over cities: " +
+          "  ".join(f"{stage} {seconds:.2f}" for stage, seconds in totals["seconds"].items()))
+    print(f"fetch p50 {totals['fetch_p50_seconds'] * 1000:.1f} ms  p95 {totals['fetch_p95_seconds'] * 1000:.1f} ms  "
+          f"statuses {totals['statuses']}  dropped {totals['dropped_reasons']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Point lookups on the price log and range queries on the series rollups
+
+Builds a price log of N entries and D days of synthetic Silver rollups,
+then times 30 daily appends to the log, per-link history lookups and
+90-day (make, model, year) trend queries. The 90-day median from merged
+sketches is checked against the exact median of the underlying rows.
+
+    python -m benchmarks.bench_timeseries --log-entries 5000000 --days 180
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_gold_partials import make_silver_day
+from src.transformations.gold_partials import build_partials
+from src.transformations.timeseries import SERIES_KEY, PriceLog, price_trend, range_median, write_rollups
+
+
+def bench_price_log(entries: int, lookups: int) -> None:
+    rng = np.random.default_rng(0)
+    links = np.array([f"https://example.org/{i}.html" for i in range(lookups)], dtype=object)
+    hashes = np.concatenate([pd.util.hash_array(links), rng.integers(0, 2 ** 63, entries - lookups, dtype=np.uint64)])
+    days = np.datetime64("2024-01-01") + rng.integers(0, 180, entries).astype("timedelta64[D]")
+    prices = rng.integers(1000, 60000, entries).astype(np.int32)
+
+    start = time.perf_counter()
+    log = PriceLog.load().append(hashes, days, prices)
+    print(f"price log: {len(log):,} entries written in {time.perf_counter() - start:.2f}s")
+
+    # Later days append a day's worth of changes each, without rewriting the history
+    per_day = max(entries // 180, 1)
+    start = time.perf_counter()
+    for _ in range(30):
+        log = log.append(rng.integers(0, 2 ** 63, per_day, dtype=np.uint64),
+                         np.full(per_day, np.datetime64("2024-07-01")), prices[:per_day])
+    print(f"daily append: {(time.perf_counter() - start) / 30 * 1e3:.1f} ms per day of {per_day:,} entries "
+          f"over 30 days, {len(log.segments)} segments after")
+
+    log = PriceLog.load()
+    start = time.perf_counter()
+    for link in links:
+        log.lookup(link)
+    per_lookup = (time.perf_counter() - start) / len(links)
+    print(f"lookup: {per_lookup * 1e6:.1f} us per link over {len(links):,} links (memory-mapped)")
+
+
+def bench_rollups(days: int, rows_per_day: int) -> None:
+    rng = np.random.default_rng(1)
+    dates = pd.date_range("2024-01-01", periods=days).strftime("%Y-%m-%d")
+    silver_days = []
+    start = time.perf_counter()
+    for date_str in dates:
+        day = make_silver_day(rng, date_str, rows_per_day)
+        day["year"] = rng.integers(2010, 2020, rows_per_day).astype(np.int16)
+        write_rollups(build_partials(day, SERIES_KEY))
+        silver_days.append(day[["make", "model", "year", "data_date", "price_numeric"]])
+    print(f"rollups: {days} days written in {time.perf_counter() - start:.2f}s")
+
+    silver = pd.concat(silver_days, ignore_index=True)
+    start_date, end_date = dates[-90], dates[-1]
+    start = time.perf_counter()
+    trend = price_trend("Honda", "Civic", 2015, start_date=start_date, end_date=end_date)
+    trend_time = time.perf_counter() - start
+    start = time.perf_counter()
+    median = range_median("Honda", "Civic", 2015, start_date=start_date, end_date=end_date)
+    median_time = time.perf_counter() - start
+
+    in_range = silver["data_date"].between(pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date())
+    series = silver[in_range & (silver["make"] == "Honda") & (silver["model"] == "Civic") & (silver["year"] == 2015)]
+    exact = np.quantile(series["price_numeric"], 0.5, method="lower")
+    print(f"90-day trend: {len(trend)} days in {trend_time * 1000:.1f}ms; "
+          f"range median {median:,.0f} vs exact {exact:,.0f} ({abs(median - exact) / exact:.2%}) in {median_time * 1000:.1f}ms")
+    if abs(median - exact) / exact > 0.01:
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log-entries", type=int, default=5_000_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--rows-per-day", type=int, default=50_000)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            bench_price_log(args.log_entries, args.lookups)
+            bench_rollups(args.days, args.rows_per_day)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
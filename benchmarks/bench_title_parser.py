@@ -0,0 +1,80 @@
+"""
+Golden-corpus check and micro-benchmark for the compiled title parser
+
+Verifies parse_title against fixtures/golden_titles.tsv (outputs recorded
+from the original per-make regex functions), then times both on N titles.
+
+    python -m benchmarks.bench_title_parser --n 1000000
+"""
+import argparse
+import os
+import time
+
+from benchmarks import legacy
+from benchmarks.fixtures import make_titles
+from src.pipelines.cars.cars import title_parser
+from src.pipelines.cars.cars.title_parser import parse_title, parse_titles
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "golden_titles.tsv")
+
+
+def load_golden():
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        next(f)
+        return [line.rstrip("\n").split("\t") for line in f]
+
+
+def check_golden() -> int:
+    rows = load_golden()
+    mismatches = 0
+    for title, *expected in rows:
+        parsed = parse_title.__wrapped__(title)
+        actual = [parsed.year, parsed.make, parsed.model, parsed.mileage, parsed.price]
+        if actual != expected:
+            mismatches += 1
+            print(f"MISMATCH {title!r}: expected {expected}, got {actual}")
+
+    batch = parse_titles([row[0] for row in rows])
+    if batch.values.tolist() != [row[1:] for row in rows]:
+        mismatches += 1
+        print("MISMATCH in parse_titles batch output")
+
+    print(f"golden corpus: {len(rows)} titles, {mismatches} mismatches")
+    return mismatches
+
+
+def legacy_parse(title: str):
+    year, make, model = legacy.extract_car_details(title)
+    return year, make, model, legacy.extract_mileage(title), legacy.extract_price_from_text(title)
+
+
+def timed(label: str, fn, n: int):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:28s} {elapsed:8.2f}s  {n / elapsed:12,.0f} titles/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=1_000_000, help="Titles to parse")
+    parser.add_argument("--distinct", type=int, default=200_000, help="Distinct titles among the N")
+    parser.add_argument("--legacy-n", type=int, default=100_000, help="Titles for the (slow) legacy run")
+    args = parser.parse_args()
+
+    if check_golden():
+        raise SystemExit(1)
+
+    pool = make_titles(args.distinct, seed=1)
+    titles = [pool[i % len(pool)] for i in range(args.n)]
+
+    legacy_time = timed("legacy per-make regex", lambda: [legacy_parse(t) for t in titles[:args.legacy_n]], args.legacy_n)
+    compiled_time = timed("compiled, uncached", lambda: [parse_title.__wrapped__(t) for t in titles], args.n)
+    title_parser.parse_title.cache_clear()
+    timed("parse_titles batch", lambda: parse_titles(titles), args.n)
+    print(f"speedup per title (uncached): {legacy_time / args.legacy_n / (compiled_time / args.n):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Make/model normalization: group counts and group-by cost, raw against canonical
+
+Builds N Bronze-shaped rows from generated titles (with "Chevy"/"VW"
+spellings, trims, shouted titles and a share of typos in models), then
+maps make and model through the Vocabulary and reports the time that takes,
+the number of (make, model) groups before and after, and the time of the
+make stats group-by on each. Also checks that every raw spelling of one
+make lands on the same canonical make.
+
+    python -m benchmarks.bench_vocabulary --rows 10000000
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_silver import make_bronze
+from src.transformations.vocabulary import Vocabulary, compact
+
+ALIASES = {"Chevy": "Chevrolet", "Chevrolet": "Chevrolet", "VW": "Volkswagen", "Volkswagen": "Volkswagen"}
+
+
+def add_typos(models: pd.Series, share: float, rng: np.random.Generator) -> pd.Series:
+    """Drop one letter from a share of the distinct models, as a hurried seller would"""
+    uniques = models.dropna().unique()
+    typo = {}
+    for model in uniques[rng.random(len(uniques)) < share]:
+        letters = [i for i, char in enumerate(model.split(" ")[0]) if char.isalpha()][1:]
+        if len(letters) >= 4:
+            i = letters[rng.integers(0, len(letters))]
+            typo[model] = model[:i] + model[i + 1:]
+    return models.map(typo).fillna(models)
+
+
+def make_stats_seconds(df: pd.DataFrame, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df.groupby(["make", "model"], observed=True).agg(
+            price_mean=("price_numeric", "mean"), price_count=("price_numeric", "count"),
+            mileage_mean=("mileage_numeric", "mean"))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--distinct", type=int, default=50_000, help="Distinct titles among the rows")
+    parser.add_argument("--typos", type=float, default=0.05, help="Share of distinct models given a typo")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    bronze = make_bronze(args.rows, args.distinct)
+    models = add_typos(bronze["model"], args.typos, rng)
+    # Sellers who write in lower case
+    lowered = rng.random(len(models)) < 0.05
+    models = models.where(~lowered, models.str.lower())
+    frame = pd.DataFrame({
+        "price_numeric": rng.integers(500, 60_000, args.rows).astype(np.int32),
+        "mileage_numeric": rng.uniform(0, 250_000, args.rows).astype(np.float32),
+    })
+    raw = frame.assign(make=bronze["make"].astype("category"), model=models.astype("category"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vocabulary = Vocabulary.load(f"{tmp}/aliases.json")
+        start = time.perf_counter()
+        make, model = vocabulary.normalize(bronze["make"], models)
+        normalize_seconds = time.perf_counter() - start
+        vocabulary.save()
+        # A later run starts from the saved aliases
+        start = time.perf_counter()
+        Vocabulary.load(f"{tmp}/aliases.json").normalize(bronze["make"], models)
+        learned_seconds = time.perf_counter() - start
+    canonical = frame.assign(make=make, model=model)
+
+    raw_groups = raw.groupby(["make", "model"], observed=True).ngroups
+    canonical_groups = canonical.groupby(["make", "model"], observed=True).ngroups
+    print(f"{args.rows:,} rows, {raw['make'].nunique()} raw makes -> {canonical['make'].nunique()} canonical, "
+          f"{raw['model'].nunique():,} raw models -> {canonical['model'].nunique():,}")
+    learned = sum(map(len, vocabulary.learned_models.values())) + len(vocabulary.learned_makes)
+    print(f"normalize             first run {normalize_seconds:6.2f}s  from saved aliases {learned_seconds:6.2f}s  "
+          f"({learned:,} aliases learned)")
+    print(f"(make, model) groups  raw {raw_groups:>8,}   canonical {canonical_groups:>8,}")
+    raw_seconds, canonical_seconds = make_stats_seconds(raw), make_stats_seconds(canonical)
+    print(f"make stats group-by   raw {raw_seconds:7.2f}s  canonical {canonical_seconds:7.2f}s  "
+          f"({raw_seconds / canonical_seconds:.1f}x)")
+
+    pairs = pd.DataFrame({"raw": bronze["make"], "canonical": canonical["make"].astype(object)}).drop_duplicates()
+    wrong = pairs[pairs["raw"].map(ALIASES).notna() & (pairs["raw"].map(ALIASES) != pairs["canonical"])]
+    mixed = pairs.groupby(pairs["raw"].map(compact))["canonical"].nunique().max()
+    print(f"aliased makes mapped right: {wrong.empty}, one canonical make per spelling: {mixed == 1}")
+    if not wrong.empty or mixed != 1:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
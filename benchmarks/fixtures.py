@@ -0,0 +1,107 @@
+"""Deterministic Craigslist-style fixtures for offline benchmarks"""
+import random
+from html import escape
+
+MAKE_MODELS = {
+    "Honda": ["Civic", "Accord", "CR-V", "Pilot", "Odyssey"],
+    "Toyota": ["Camry", "Corolla", "RAV4", "Tacoma", "Prius"],
+    "Ford": ["F-150", "Focus", "Fusion", "Escape", "Mustang"],
+    "Chevrolet": ["Silverado 1500", "Malibu", "Equinox", "Tahoe"],
+    "Chevy": ["Cruze", "Impala", "Camaro"],
+    "Nissan": ["Altima", "Sentra", "Rogue", "Frontier"],
+    "BMW": ["328i", "X5", "535i", "M3"],
+    "Mercedes-Benz": ["C300", "E350", "GLC 300"],
+    "Jeep": ["Wrangler", "Grand Cherokee", "Cherokee"],
+    "Hyundai": ["Elantra", "Sonata", "Tucson"],
+    "Subaru": ["Outback", "Forester", "Impreza"],
+    "Volkswagen": ["Jetta", "Passat", "Golf GTI"],
+    "VW": ["Beetle", "Tiguan"],
+    "Tesla": ["Model 3", "Model S"],
+    "Land Rover": ["Range Rover Sport", "Discovery"],
+    "Ram": ["1500", "2500"],
+}
+EXTRAS = ["", "", "", " LX", " EX-L", " Sport", " Touring", " Low miles", " clean title",
+          " 4MATIC", " AMG", " one owner", " Navi backup camera"]
+HOODS = ["Brooklyn", "Queens", "Downtown", "North Side", "Westside", "Midtown", "Suburbs", ""]
+SECTIONS = ["cto", "ctd", "ctd", "ctp"]
+
+
+def make_title(rng: random.Random) -> str:
+    """Build one listing title in the shapes seen on Craigslist"""
+    make = rng.choice(list(MAKE_MODELS))
+    model = rng.choice(MAKE_MODELS[make])
+    year = rng.randint(1995, 2024)
+    title = f"{year} {make} {model}{rng.choice(EXTRAS)}"
+
+    mileage = rng.random()
+    if mileage < 0.3:
+        title += f" {rng.randint(10, 250)}k miles"
+    elif mileage < 0.45:
+        title += f" {rng.randint(10, 250)},{rng.randint(0, 999):03d} miles"
+    elif mileage < 0.55:
+        title += f" {rng.randint(1000, 250000)} mi"
+    if rng.random() < 0.1:
+        title = title.upper()
+    if rng.random() < 0.05:
+        title = title.replace(f"{year} ", "")
+    return title
+
+
+def make_titles(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [make_title(rng) for _ in range(n)]
+
+
+def render_listing(rng: random.Random, city_code: str, post_id: int) -> str:
+    title = make_title(rng)
+    section = rng.choice(SECTIONS)
+    slug = "-".join(title.lower().split())[:40]
+    href = f"https://{city_code}.craigslist.org/{section}/d/{slug}/{post_id}.html"
+    price = f"${rng.randint(500, 65000):,}" if rng.random() < 0.95 else ""
+    hood = rng.choice(HOODS)
+    return (
+        f'    <li class="cl-static-search-result" title="{escape(title)}">\n'
+        f'        <a href="{href}">\n'
+        f'            <div class="title">{escape(title)}</div>\n'
+        f'            <div class="details">\n'
+        f'                <div class="price">{price}</div>\n'
+        f'                <div class="location">\n'
+        f'                    {escape(hood)}\n'
+        f'                </div>\n'
+        f'            </div>\n'
+        f'        </a>\n'
+        f'    </li>\n'
+    )
+
+
+def render_search_page(city_code: str, n_listings: int = 120, seed: int = 0, offset: int = 0) -> str:
+    """Render a static Craigslist cars+trucks search page with `n_listings` results"""
+    rng = random.Random(f"{city_code}:{seed}:{offset}")
+    items = "".join(render_listing(rng, city_code, 7700000000 + offset + i) for i in range(n_listings))
+    return (
+        "<!DOCTYPE html>\n<html>\n<head><title>cars &amp; trucks - craigslist</title></head>\n<body>\n"
+        '<section class="page-container"><div class="cl-search-results">\n'
+        f'<ol class="cl-static-search-results">\n{items}</ol>\n'
+        "</div></section>\n</body>\n</html>\n"
+    )
+
+
+def render_legacy_search_page(city_code: str, n_listings: int = 120, seed: int = 0) -> str:
+    """Older result markup: cl-app-anchor titles with result-price/result-hood spans"""
+    rng = random.Random(f"legacy:{city_code}:{seed}")
+    items = []
+    for i in range(n_listings):
+        title = make_title(rng)
+        section = rng.choice(SECTIONS + ["cta"])
+        price = f'<span class="result-price">${rng.randint(500, 65000):,}</span>' if rng.random() < 0.9 else ""
+        hood = f'<span class="result-hood"> ({escape(rng.choice(HOODS))})</span>' if rng.random() < 0.8 else ""
+        items.append(
+            f'  <li class="cl-static-search-result result-row" data-pid="{7600000000 + i}">\n'
+            f'    <a class="cl-app-anchor text-only" href="/{section}/d/{7600000000 + i}.html">{escape(title)}</a>\n'
+            f'    <span class="result-meta">{price}{hood}</span>\n'
+            f'  </li>\n'
+        )
+    return (
+        "<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"><title>cars &amp; trucks</title></head>\n<body>\n"
+        f'<ul class="rows">\n{"".join(items)}</ul>\n</body>\n</html>\n'
+    )
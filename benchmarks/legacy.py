@@ -0,0 +1,99 @@
+"""Original implementations kept as reference points for benchmarks and golden checks"""
+import csv
+import re
+from typing import Iterable, NamedTuple
+
+
+def extract_car_details(title: str):
+    """Extract year, make, model from title"""
+    year_match = re.search(r'\b(19|20)\d{2}\b', title)
+    year = year_match.group() if year_match else "N/A"
+    
+    makes = ['Mercedes-Benz', 'Land Rover', 'Chevrolet', 'Chevy', 'Toyota', 'Honda', 'Ford', 'BMW', 'Audi', 'Volkswagen', 'VW', 
+             'Nissan', 'Hyundai', 'Kia', 'Subaru', 'Mazda', 'Lexus', 'Infiniti', 'Acura', 'Cadillac', 
+             'Buick', 'GMC', 'Jeep', 'Dodge', 'Chrysler', 'Ram', 'Lincoln', 'Volvo', 'Porsche', 'Tesla',
+             'Mitsubishi', 'Suzuki', 'Fiat', 'Mini', 'Jaguar', 'Maserati', 'Ferrari', 'Lamborghini']
+    
+    make = "N/A"
+    for m in makes:
+        if re.search(rf'\b{m}\b', title, re.IGNORECASE):
+            make = m
+            break
+    
+    model = "N/A"
+    if make != "N/A":
+        if make == "Mercedes-Benz":
+            pattern = r'Mercedes-Benz\s+([A-Za-z0-9-]+(?:\s+[A-Za-z0-9-]+){0,2})'
+        else:
+            pattern = rf'{make}\s+([A-Za-z0-9-]+(?:\s+[A-Za-z0-9-]+){{0,2}})'
+        
+        model_match = re.search(pattern, title, re.IGNORECASE)
+        if model_match:
+            model = model_match.group(1).strip()
+            model = re.sub(r'\s+(Touring|Low|miles|dvd|Navi|navigation|backup|camera|owner|since|new|original|AMG|4MATIC|Coupe).*', '', model, flags=re.IGNORECASE)
+            model = model.strip()
+    
+    return year, make, model
+
+
+def extract_mileage(title: str) -> str:
+    """Extract mileage from title"""
+    patterns = [
+        r'(\d{1,3}[kK])\s*(?:miles?|mi)?',
+        r'(\d{1,3},\d{3})\s*(?:original\s+)?(?:miles?|mi)',
+        r'(\d{4,6})\s*(?:original\s+)?(?:miles?|mi)',
+    ]
+    
+    for pattern in patterns:
+        match = re.search(pattern, title, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    return "N/A"
+
+
+def extract_price_from_text(text: str) -> str:
+    """Extract price from listing text"""
+    price_match = re.search(r'\$[\d,]+', text)
+    if price_match:
+        price = price_match.group()
+        clean_price = price.replace('$', '').replace(',', '')
+        try:
+            float(clean_price)
+            return price
+        except ValueError:
+            pass
+    return "N/A"
+
+
+def silver_layer_transformation(bronze_df):
+    """Clean and standardize data for Silver layer"""
+    import pandas as pd
+
+    df = bronze_df.copy()
+    
+    # Clean price column
+    df['price_numeric'] = df['price'].str.replace('$', '').str.replace(',', '')
+    df['price_numeric'] = pd.to_numeric(df['price_numeric'], errors='coerce')
+    
+    # Clean mileage column
+    df['mileage_numeric'] = df['mileage'].str.replace('k', '000').str.replace('K', '000').str.replace(',', '')
+    df['mileage_numeric'] = pd.to_numeric(df['mileage_numeric'], errors='coerce')
+    
+    # Remove duplicates
+    df = df.drop_duplicates(subset=['link'])
+    
+    # Filter valid data
+    df = df[df['year'] != 'N/A']
+    df = df[df['make'] != 'N/A']
+    df = df[df['price_numeric'] > 500]
+    
+    return df
+
+
+def save_listings_csv(all_listings: Iterable[NamedTuple], filename: str) -> None:
+    """Write a crawl's listings, all held in memory until the end, to one CSV file"""
+    with open(filename, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["year", "make", "model", "title", "price", "mileage", "dealer_type", "location", "link", "city", "scrape_date"])
+        for listing in all_listings:
+            writer.writerow(list(listing))
@@ -0,0 +1,96 @@
+"""Local HTTP stand-in for Craigslist that serves canned search pages"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.fixtures import render_search_page
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float, slow_cities: Dict[str, float], listings_per_page: int,
+                 pages_per_city: int, cache_pages: bool):
+        super().__init__(address, SearchPageHandler)
+        self.latency = latency
+        self.slow_cities = slow_cities
+        self.listings_per_page = listings_per_page
+        self.pages_per_city = pages_per_city
+        self.cache_pages = cache_pages
+        self.request_count = 0
+        self.bytes_sent = 0
+        self._pages: Dict[tuple, bytes] = {}
+        self._lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients killed mid-request (see bench_resume) are expected
+        pass
+
+    def page(self, city_code: str, offset: int) -> bytes:
+        with self._lock:
+            self.request_count += 1
+        n_listings = self.listings_per_page if offset < self.listings_per_page * self.pages_per_city else 0
+        if not self.cache_pages:
+            return render_search_page(city_code, n_listings, offset=offset).encode()
+        with self._lock:
+            if (city_code, offset) not in self._pages:
+                self._pages[city_code, offset] = render_search_page(city_code, n_listings, offset=offset).encode()
+            return self._pages[city_code, offset]
+
+
+class SearchPageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        # Paths look like /<city_code>/d/cars-trucks/search/cta?s=<offset>
+        url = urlsplit(self.path)
+        city_code = url.path.strip("/").split("/")[0]
+        offset = int(parse_qs(url.query).get("s", ["0"])[0])
+        time.sleep(self.server.slow_cities.get(city_code, self.server.latency))
+        body = self.server.page(city_code, offset)
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server._lock:
+            self.server.bytes_sent += len(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_search_pages(latency: float = 0.2, slow_cities: Optional[Dict[str, float]] = None,
+                       listings_per_page: int = 120, pages_per_city: int = 1, cache_pages: bool = True):
+    """
+    Run the stand-in on a free port and yield it, with `url_template` set
+
+    Each city serves `pages_per_city` full pages, then empty ones. Pass
+    `cache_pages=False` for deep crawls so the server does not hold them all.
+    """
+    server = StandInServer(("127.0.0.1", 0), latency, slow_cities or {}, listings_per_page,
+                           pages_per_city, cache_pages)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        port = server.server_address[1]
+        server.url_template = f"http://127.0.0.1:{port}/{{city_code}}/d/cars-trucks/search/cta"
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,300 @@
+"""
+The whole pipeline offline, stage by stage, with results saved per commit
+
+Runs each stage in a fresh interpreter against a temporary lake and reports
+its time, throughput and memory:
+
+    fetch                 scrape_run over the local stand-in server, all target cities
+    parse_fixtures        parse_search_page over the saved pages in benchmarks/fixtures/pages
+    extract_car_details   over generated titles, with an empty parse cache
+    bronze_ingest         bronze_layer_ingestion of a synthetic scraper CSV of --rows rows
+    silver                silver_layer_transformation of the Bronze rows
+    gold                  gold_layer_aggregation of the Silver rows
+    metrics               get_market_summary, get_city_rankings and get_make_stats
+
+Memory is the stage's peak resident memory above what the process held
+when it started (inputs loaded), and the process peak. Loading a stage's
+input and saving its output for the next stage are not timed.
+
+Results are written to benchmarks/results/<time>_<commit>.json and compared
+with the latest earlier result at the same scale, flagging stages that got
+slower or bigger by more than --threshold (and by at least 0.1s or 10 MB,
+so short stages' noise isn't flagged). Linux only (reads /proc).
+
+    python -m benchmarks.suite --rows 1000000
+    python -m benchmarks.suite --rows 10000000 --stages bronze_ingest silver gold metrics
+"""
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+FIXTURE_PAGES = os.path.join(ROOT, "benchmarks", "fixtures", "pages")
+RAW_CSV = "car_listings_20240101_020000.csv"
+
+STAGES = ("fetch", "parse_fixtures", "extract_car_details", "bronze_ingest", "silver", "gold", "metrics")
+# The arguments that decide what a stage does; results are only compared when they match
+SCALE = ("rows", "pages", "titles", "parse_repeat", "latency")
+# Changes below these are noise on short stages, whatever their relative size
+MIN_SECONDS_CHANGE = 0.1
+MIN_MB_CHANGE = 10.0
+
+
+def status_mb(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+class Measure:
+    """Times one call and tracks its peak resident memory, resetting the process peak first"""
+
+    def __init__(self):
+        self.result = {}
+
+    def __call__(self, fn):
+        gc.collect()
+        # Writing 5 resets VmHWM to the current RSS
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        before = status_mb("VmRSS")
+        start = time.perf_counter()
+        value = fn()
+        self.result["seconds"] = time.perf_counter() - start
+        peak = status_mb("VmHWM")
+        self.result["peak_added_mb"] = peak - before
+        self.result["peak_mb"] = peak
+        return value
+
+
+def stage_fetch(args, measure: Measure) -> int:
+    from benchmarks.local_server import serve_search_pages
+    from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES, scrape_run
+    from src.pipelines.cars.cars.fetcher import ConcurrentFetcher
+    from src.pipelines.cars.cars.run_manifest import RunManifest
+
+    manifest = RunManifest.load_or_create("2024-01-01", TARGET_CITIES, root="runs")
+    with serve_search_pages(latency=args.latency, pages_per_city=args.pages) as server:
+        # Render every page up front, so the server's work is neither timed nor counted
+        for city_code in TARGET_CITIES:
+            for page in range(args.pages + 1):
+                server.page(city_code, page * server.listings_per_page)
+        with ConcurrentFetcher(max_concurrency=8, per_host_interval=0) as fetcher:
+            measure(lambda: scrape_run(manifest, fetcher, args.pages + 1, url_template=server.url_template))
+    return manifest.summary()["listings"]
+
+
+def stage_parse_fixtures(args, measure: Measure) -> int:
+    from src.pipelines.cars.cars.comprehensive_scraping import parse_search_page
+    from src.pipelines.cars.cars.title_parser import parse_title
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_PAGES, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path).split("_")[0].split(".")[0], f.read()))
+
+    def parse_all():
+        parsed = 0
+        for _ in range(args.parse_repeat):
+            parse_title.cache_clear()
+            for city_code, content in pages:
+                parsed += len(parse_search_page(content, city_code, city_code, "2024-01-01"))
+        return parsed
+
+    return measure(parse_all)
+
+
+def stage_extract_car_details(args, measure: Measure) -> int:
+    from benchmarks.fixtures import make_titles
+    from src.pipelines.cars.cars.comprehensive_scraping import extract_car_details
+    from src.pipelines.cars.cars.title_parser import parse_title
+
+    titles = make_titles(args.titles, seed=1)
+    parse_title.cache_clear()
+    return len(measure(lambda: [extract_car_details(title) for title in titles]))
+
+
+def stage_bronze_ingest(args, measure: Measure) -> int:
+    from src.transformations.bronze_layer import bronze_layer_ingestion
+
+    bronze_df, _ = measure(bronze_layer_ingestion)
+    return len(bronze_df)
+
+
+def read_lake(root: str) -> pd.DataFrame:
+    from src.transformations.lake import partition_files
+
+    return pd.concat([pd.read_parquet(path) for path in partition_files(root)], ignore_index=True)
+
+
+def stage_silver(args, measure: Measure) -> int:
+    from src.transformations.bronze_layer import BRONZE_ROOT
+    from src.transformations.silver_layer import commit_silver_batch, save_silver_data, silver_layer_transformation
+
+    bronze = read_lake(BRONZE_ROOT)
+    silver, cross_post_batch = measure(lambda: silver_layer_transformation(bronze))
+    del bronze
+    save_silver_data(silver)
+    commit_silver_batch(silver, cross_post_batch)
+    return len(silver)
+
+
+def stage_gold(args, measure: Measure) -> int:
+    from src.analytics.data_access import SILVER_ROOT
+    from src.transformations.gold_layer import gold_layer_aggregation, save_gold_data
+
+    silver = read_lake(SILVER_ROOT)
+    save_gold_data(measure(lambda: gold_layer_aggregation(silver)))
+    return len(silver)
+
+
+def stage_metrics(args, measure: Measure) -> int:
+    from src.analytics.metrics import get_city_rankings, get_make_stats, get_market_summary
+
+    summary, _, _ = measure(lambda: (get_market_summary(), get_city_rankings(), get_make_stats()))
+    return summary["total_listings"]
+
+
+def run_child(stage: str, args) -> None:
+    """Run one stage in this (fresh) interpreter, inside the lake, and print its result as JSON"""
+    os.chdir(os.path.join(args.workdir, "lake"))
+    measure = Measure()
+    rows = globals()[f"stage_{stage}"](args, measure)
+    print(json.dumps({**measure.result, "rows": rows}))
+
+
+def run_stage(stage: str, args) -> dict:
+    command = [sys.executable, "-m", "benchmarks.suite", "--child", stage, "--workdir", args.workdir]
+    for name in SCALE:
+        command += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    process = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if process.returncode:
+        raise SystemExit(f"{stage} failed:\n{process.stderr}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def git_commit() -> str:
+    """Short HEAD commit, with +dirty when tracked files have changed"""
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    return f"{commit}+dirty" if git("status", "--porcelain", "--untracked-files=no") else commit
+
+
+def previous_result(scale: dict, exclude: str = ""):
+    """The latest saved result at the same scale"""
+    for path in sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), reverse=True):
+        if os.path.abspath(path) == os.path.abspath(exclude):
+            continue
+        with open(path, encoding="utf-8") as f:
+            result = json.load(f)
+        if result.get("scale") == scale:
+            return path, result
+    return None, None
+
+
+def compare(current: dict, previous: dict, threshold: float) -> list:
+    """Print each stage against the previous result, returning the stages that regressed"""
+    regressed = []
+    print(f"\nagainst {previous['commit']} ({previous['created']}):")
+    for stage, now in current["stages"].items():
+        before = previous["stages"].get(stage)
+        if not before:
+            continue
+        seconds, mb = now["seconds"] - before["seconds"], now["peak_added_mb"] - before["peak_added_mb"]
+        time_change = seconds / before["seconds"] if before["seconds"] else 0.0
+        memory_change = mb / max(before["peak_added_mb"], 1.0)
+        flags = []
+        if time_change > threshold and seconds > MIN_SECONDS_CHANGE:
+            flags.append("slower")
+        if memory_change > threshold and mb > MIN_MB_CHANGE:
+            flags.append("more memory")
+        if flags:
+            regressed.append(stage)
+        print(f"  {stage:20s} time {time_change:+7.1%}  memory {memory_change:+7.1%}  "
+              f"{'REGRESSED: ' + ', '.join(flags) if flags else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Synthetic listings fed to Bronze and beyond")
+    parser.add_argument("--pages", type=int, default=10, help="Stand-in search result pages per city")
+    parser.add_argument("--titles", type=int, default=200_000, help="Titles for extract_car_details")
+    parser.add_argument("--parse-repeat", type=int, default=20, help="Passes over the saved fixture pages")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stand-in server latency per page, seconds")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--threshold", type=float, default=0.15, help="Slowdown or growth flagged as a regression")
+    parser.add_argument("--no-save", action="store_true", help="Compare, but don't save this run's results")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--child", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(args.child, args)
+
+    from benchmarks.synthetic import write_raw_csv
+
+    stages = [stage for stage in STAGES if stage in args.stages]
+    scale = {name: getattr(args, name) for name in SCALE}
+    current = {
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scale": scale,
+        "stages": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        args.workdir = workdir
+        os.makedirs(os.path.join(workdir, "lake"))
+        if {"bronze_ingest", "silver", "gold", "metrics"} & set(stages):
+            start = time.perf_counter()
+            write_raw_csv(os.path.join(workdir, "lake", RAW_CSV), args.rows)
+            print(f"generated {args.rows:,} synthetic listings in {time.perf_counter() - start:.1f}s")
+        # Later stages read what earlier ones saved, so a lake stage needs the ones before it
+        if "silver" in stages or "gold" in stages or "metrics" in stages:
+            lake_stages = ("bronze_ingest", "silver", "gold", "metrics")
+            first = min(lake_stages.index(stage) for stage in stages if stage in lake_stages)
+            stages = sorted(set(stages) | set(lake_stages[:first]), key=STAGES.index)
+
+        for stage in stages:
+            result = run_stage(stage, args)
+            current["stages"][stage] = result
+            print(f"{stage:20s} {result['seconds']:8.2f}s  {result['rows'] / result['seconds']:>12,.0f} rows/s  "
+                  f"peak +{result['peak_added_mb']:7,.0f} MB  (process {result['peak_mb']:7,.0f} MB)")
+
+    saved = ""
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        saved = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d_%H%M%S}_{current['commit']}.json")
+        with open(saved, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"saved {os.path.relpath(saved, ROOT)}")
+
+    path, previous = previous_result(scale, exclude=saved)
+    if previous is None:
+        print("no earlier result at this scale to compare against")
+        return
+    regressed = compare(current, previous, args.threshold)
+    if regressed and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Synthetic scraper output at any scale, for benchmarks that need more rows than a crawl gives"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from benchmarks.fixtures import HOODS, SECTIONS, make_titles
+from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES
+from src.pipelines.cars.cars.listing_buffer import LISTING_COLUMNS
+from src.pipelines.cars.cars.title_parser import parse_titles
+
+DEALER_TYPES = {"cto": "Owner", "ctd": "Dealer"}
+# Prices repeat across listings, so draw them from a pool rather than formatting each
+PRICES = np.array([f"${price:,}" for price in range(500, 65_000, 25)] + [""] * 130, dtype=object)
+
+
+def title_pool(distinct: int, seed: int = 0) -> pd.DataFrame:
+    """`distinct` generated titles with the fields the scraper parses out of them"""
+    titles = make_titles(distinct, seed=seed)
+    pool = parse_titles(titles)
+    pool["title"] = titles
+    return pool.reset_index(drop=True)
+
+
+def make_listings(rows: int, pool: pd.DataFrame, rng: np.random.Generator, start_id: int = 0,
+                  scrape_date: str = "2024-01-01 02:00:00") -> pd.DataFrame:
+    """
+    `rows` listings shaped like the scraper's CSV rows, all strings
+
+    Titles (and so year, make, model and mileage) are drawn from `pool`;
+    links are unique, numbered from `start_id`, on their city's subdomain.
+    """
+    codes = np.array(list(TARGET_CITIES), dtype=object)
+    names = np.array(list(TARGET_CITIES.values()), dtype=object)
+    sections = np.array(SECTIONS, dtype=object)
+
+    df = pool.iloc[rng.integers(0, len(pool), rows)].reset_index(drop=True)
+    city = rng.integers(0, len(codes), rows)
+    section = pd.Series(sections[rng.integers(0, len(sections), rows)])
+    ids = pd.Series(np.arange(start_id, start_id + rows)).astype(str)
+
+    df["price"] = PRICES[rng.integers(0, len(PRICES), rows)]
+    df["dealer_type"] = section.map(DEALER_TYPES).fillna("Private")
+    df["location"] = np.array(HOODS, dtype=object)[rng.integers(0, len(HOODS), rows)]
+    df["link"] = "https://" + pd.Series(codes[city]) + ".craigslist.org/" + section + "/d/" + ids + ".html"
+    df["city"] = names[city]
+    df["scrape_date"] = scrape_date
+    return df[LISTING_COLUMNS]
+
+
+def write_raw_csv(path: str, rows: int, distinct: int = 50_000, seed: int = 0,
+                  chunk_rows: int = 1_000_000) -> None:
+    """Write `rows` synthetic listings to a scraper CSV, a chunk at a time so 10M rows fit in memory"""
+    pool = title_pool(distinct, seed)
+    rng = np.random.default_rng(seed)
+    writer = None
+    try:
+        for start in range(0, rows, chunk_rows):
+            table = pa.Table.from_pandas(make_listings(min(chunk_rows, rows - start), pool, rng, start),
+                                         preserve_index=False)
+            if writer is None:
+                writer = pv.CSVWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
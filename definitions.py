@@ -1,8 +1,15 @@
 from dagster import Definitions
-from src.pipelines.cars.cars.comprehensive_pipeline import car_scraping_pipeline, daily_car_scraping_schedule
+from src.pipelines.cars.cars.comprehensive_pipeline import (
+    car_scraping_pipeline, daily_car_scraping_schedule, adaptive_car_scraping_schedule,
+)
 from src.transformations.data_processing_pipeline import data_processing_pipeline
+from src.transformations.compaction import lake_compaction
+from src.transformations.backfill import lake_backfill
+from src.transformations.streaming import streaming_pipeline
+from src.transformations.arrow_io import ArrowIOManager
 
 defs = Definitions(
-    jobs=[car_scraping_pipeline, data_processing_pipeline],
-    schedules=[daily_car_scraping_schedule]
+    jobs=[car_scraping_pipeline, data_processing_pipeline, lake_compaction, lake_backfill, streaming_pipeline],
+    schedules=[daily_car_scraping_schedule, adaptive_car_scraping_schedule],
+    resources={"io_manager": ArrowIOManager()},
 )
@@ -1,16 +1,15 @@
-import pandas as pd
 import plotly.express as px
-import glob
 
-def load_silver_data():
-    """Load clean car data"""
-    silver_files = glob.glob("storage/silver/car_listings/**/*.parquet", recursive=True)
-    return pd.concat([pd.read_parquet(f) for f in silver_files])
+from src.analytics.data_access import latest_city_stats, latest_make_counts, latest_price_histogram, load_silver
+from src.transformations.gold_partials import PRICE_BIN_WIDTH
+
+def load_silver_data(columns):
+    """Load the given columns of clean car data"""
+    return load_silver(columns)
 
 def load_gold_data():
-    """Load city analytics data"""
-    gold_files = glob.glob("storage/gold/city_analytics/**/*.parquet", recursive=True)
-    return pd.concat([pd.read_parquet(f) for f in gold_files])
+    """Load city analytics for the most recent day"""
+    return latest_city_stats()
 
 def city_price_chart():
     """Bar chart of average prices by city"""
@@ -21,18 +20,18 @@ def city_price_chart():
     return fig
 
 def price_distribution():
-    """Histogram of car prices"""
-    silver_data = load_silver_data()
-    valid_prices = silver_data[silver_data['price_numeric'] > 0]
-    fig = px.histogram(valid_prices, x='price_numeric', nbins=50,
-                       title='Car Price Distribution')
+    """Histogram of car prices, from the pre-binned Gold table"""
+    hist = latest_price_histogram()
+    fig = px.bar(hist, x='bin_start', y='count',
+                 title='Car Price Distribution')
+    fig.update_traces(width=PRICE_BIN_WIDTH, offset=0)
+    fig.update_layout(bargap=0, xaxis_title='price_numeric')
     return fig
 
 def make_analysis():
-    """Pie chart of car makes"""
-    silver_data = load_silver_data()
-    make_counts = silver_data['make'].value_counts().head(10)
-    fig = px.pie(values=make_counts.values, names=make_counts.index,
+    """Pie chart of car makes, from the Gold make counts"""
+    make_counts = latest_make_counts().head(10)
+    fig = px.pie(values=make_counts['count'], names=make_counts['make'],
                  title='Car Listings by Make')
     return fig
 
@@ -2,6 +2,8 @@ import streamlit as st
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+# Repository root, for the shared src.transformations helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from analytics.charts import city_price_chart, price_distribution, make_analysis, city_inventory
 from analytics.metrics import get_market_summary, get_city_rankings, get_make_stats
@@ -0,0 +1,116 @@
+import os
+import threading
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.transformations.gold_partials import (
+    GOLD_PARTIALS_ROOT, MAKE_COUNTS_ROOT, PRICE_HISTOGRAM_ROOT, SUM_COLUMNS, city_stats,
+)
+from src.transformations.lake import partition_files
+
+SILVER_ROOT = "storage/silver/car_listings"
+PARTIAL_COLUMNS = ['city', 'date'] + SUM_COLUMNS + ['price_keys', 'price_counts']
+
+_lock = threading.Lock()
+# key -> (signature of the partition files it was built from, result)
+_cache: Dict[tuple, tuple] = {}
+
+
+def _files_signature(files: Sequence[str]) -> Tuple[Tuple[str, int, int], ...]:
+    signature = []
+    for path in files:
+        stat = os.stat(path)
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _read_columns(path: str, columns: Sequence[str]) -> pd.DataFrame:
+    available = set(pq.ParquetFile(path).schema_arrow.names)
+    df = pd.read_parquet(path, columns=[c for c in columns if c in available])
+    for column in columns:
+        if column not in df:
+            # Older shards predate some columns
+            df[column] = pd.NA
+    return df[list(columns)]
+
+
+def load_table(root: str, columns: Sequence[str], start_date: Optional[str] = None,
+               end_date: Optional[str] = None) -> pd.DataFrame:
+    """
+    Requested columns of a partitioned table, cached for the whole process
+
+    The result is keyed on the partition files and their mtimes/sizes, so it
+    is reused until a partition file is added or rewritten. When files were
+    only added, just those are read and appended to the cached frame.
+    Cached frames are shared: treat them as read-only.
+    """
+    columns = tuple(columns)
+    files = partition_files(root, start_date, end_date)
+    signature = _files_signature(files)
+    key = ("table", root, columns, start_date, end_date)
+
+    with _lock:
+        cached_signature, df = _cache.get(key, ((), None))
+        if df is not None and cached_signature == signature:
+            return df
+
+        if df is not None and set(cached_signature) <= set(signature):
+            cached_files = {path for path, _, _ in cached_signature}
+            frames = [df] + [_read_columns(f, columns) for f in files if f not in cached_files]
+        else:
+            frames = [_read_columns(f, columns) for f in files]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(columns))
+        _cache[key] = (signature, df)
+        return df
+
+
+def cached_result(name: str, root: str, compute: Callable[[], pd.DataFrame]):
+    """Memoize `compute` until the partition files under `root` change"""
+    signature = _files_signature(partition_files(root))
+    key = ("result", name, root)
+    with _lock:
+        cached_signature, result = _cache.get(key, ((), None))
+        if result is not None and cached_signature == signature:
+            return result
+    result = compute()
+    with _lock:
+        _cache[key] = (signature, result)
+    return result
+
+
+def load_silver(columns: Sequence[str]) -> pd.DataFrame:
+    return load_table(SILVER_ROOT, columns)
+
+
+def load_latest(root: str, columns: Sequence[str]) -> pd.DataFrame:
+    """Requested columns of a table's most recent date partition"""
+    files = partition_files(root)
+    if not files:
+        return pd.DataFrame(columns=list(columns))
+    latest = os.path.basename(os.path.dirname(files[-1]))[len("date="):]
+    return load_table(root, columns, latest, latest)
+
+
+def latest_city_stats() -> pd.DataFrame:
+    """City analytics for the most recent Gold partition"""
+    return cached_result("latest_city_stats", GOLD_PARTIALS_ROOT,
+                         lambda: city_stats(load_latest(GOLD_PARTIALS_ROOT, PARTIAL_COLUMNS)))
+
+
+def latest_price_histogram() -> pd.DataFrame:
+    """Listing counts per price bin across all cities, for the most recent day"""
+    hist = load_latest(PRICE_HISTOGRAM_ROOT, ['bin_start', 'count'])
+    return hist.groupby('bin_start', as_index=False, observed=True)['count'].sum()
+
+
+def latest_make_counts() -> pd.DataFrame:
+    """Listing counts per make across all cities, for the most recent day, largest first"""
+    counts = load_latest(MAKE_COUNTS_ROOT, ['make', 'count'])
+    return counts.groupby('make', as_index=False, observed=True)['count'].sum().sort_values('count', ascending=False)
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,77 @@
+import glob
+import os
+import threading
+from typing import Dict, Optional, Sequence
+
+import duckdb
+import pandas as pd
+
+from src.transformations.gold_partials import GOLD_PARTIALS_ROOT, MAKE_COUNTS_ROOT, PRICE_HISTOGRAM_ROOT
+
+# View name -> hive-partitioned table root (date=YYYY-MM-DD/*.parquet)
+LAKE_TABLES = {
+    "bronze": "storage/bronze/car_listings",
+    "silver": "storage/silver/car_listings",
+    "gold_city_partials": GOLD_PARTIALS_ROOT,
+    "gold_price_histogram": PRICE_HISTOGRAM_ROOT,
+    "gold_make_counts": MAKE_COUNTS_ROOT,
+}
+
+_local = threading.local()
+
+
+def table_glob(root: str) -> str:
+    return os.path.join(root, "date=*", "*.parquet")
+
+
+def connect(tables: Optional[Dict[str, str]] = None, memory_limit: str = "1GB") -> duckdb.DuckDBPyConnection:
+    """
+    In-memory DuckDB connection with each lake table registered as a view
+
+    The views glob their partitions at query time, so new partitions show up
+    without re-registering. The hive `date` column is typed as DATE, and
+    filters on it prune whole partitions before any file is opened; other
+    filters and column lists are pushed down into the parquet scan.
+    Aggregations past `memory_limit` spill to a temp directory.
+    """
+    con = duckdb.connect(":memory:", config={"memory_limit": memory_limit})
+    for name, root in (tables or LAKE_TABLES).items():
+        if not glob.glob(table_glob(root)):
+            # read_parquet fails on an empty glob; leave the view out until data lands
+            continue
+        con.execute(
+            f"CREATE OR REPLACE VIEW {name} AS SELECT * FROM read_parquet('{table_glob(root)}', "
+            "hive_partitioning = true, union_by_name = true)"
+        )
+    return con
+
+
+def has_table(name: str) -> bool:
+    return bool(glob.glob(table_glob(LAKE_TABLES[name])))
+
+
+def query(sql: str, params: Optional[Sequence] = None) -> pd.DataFrame:
+    """
+    Run SQL against the lake views and return a DataFrame
+
+    Each thread gets its own connection, since Streamlit serves sessions from
+    several threads. Views missing at connect time are registered on the next
+    query once their first partition exists.
+    """
+    con = getattr(_local, "con", None)
+    if con is None or any(has_table(name) and name not in _local.views for name in LAKE_TABLES):
+        con = _local.con = connect()
+        _local.views = {name for name in LAKE_TABLES if has_table(name)}
+    return con.execute(sql, params or []).df()
+
+
+def date_filter(start_date: Optional[str], end_date: Optional[str]) -> tuple:
+    """WHERE clause on the hive `date` column, and its parameters"""
+    clauses, params = [], []
+    if start_date:
+        clauses.append("date >= CAST(? AS DATE)")
+        params.append(start_date)
+    if end_date:
+        clauses.append("date <= CAST(? AS DATE)")
+        params.append(end_date)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
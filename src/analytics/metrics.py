@@ -1,34 +1,80 @@
 import pandas as pd
-import glob
 
-def get_market_summary():
-    """Basic market statistics"""
-    silver_data = pd.concat([pd.read_parquet(f) for f in glob.glob("storage/silver/car_listings/**/*.parquet", recursive=True)])
-    
+from src.analytics.data_access import SILVER_ROOT, cached_result
+from src.analytics.lake_sql import date_filter, has_table, query
+from src.transformations.gold_partials import GOLD_PARTIALS_ROOT, city_stats, partition_dates
+
+def get_market_summary(start_date=None, end_date=None):
+    """Basic market statistics, over Silver partitions within the optional date range"""
+    return cached_result(f"market_summary:{start_date}:{end_date}", SILVER_ROOT,
+                         lambda: _market_summary(start_date, end_date))
+
+def _market_summary(start_date, end_date):
+    if not has_table("silver"):
+        return {"total_listings": 0, "avg_price": float("nan"), "median_price": float("nan"),
+                "avg_mileage": float("nan"), "top_make": None, "cities_count": 0}
+    where, params = date_filter(start_date, end_date)
+
+    summary = query(f"""
+        SELECT count(*) AS total_listings,
+               avg(price_numeric) AS avg_price,
+               median(price_numeric) AS median_price,
+               avg(mileage_numeric) AS avg_mileage,
+               count(DISTINCT city) AS cities_count
+        FROM silver{where}
+    """, params).iloc[0]
+    top_make = query(f"""
+        SELECT make FROM silver{where}
+        GROUP BY make ORDER BY count(*) DESC, make LIMIT 1
+    """, params)
+
     return {
-        "total_listings": len(silver_data),
-        "avg_price": silver_data['price_numeric'].mean(),
-        "median_price": silver_data['price_numeric'].median(),
-        "avg_mileage": silver_data['mileage_numeric'].mean(),
-        "top_make": silver_data['make'].mode()[0],
-        "cities_count": silver_data['city'].nunique()
+        "total_listings": int(summary['total_listings']),
+        "avg_price": summary['avg_price'],
+        "median_price": summary['median_price'],
+        "avg_mileage": summary['avg_mileage'],
+        "top_make": top_make['make'].iloc[0] if len(top_make) else None,
+        "cities_count": int(summary['cities_count'])
     }
 
-def get_city_rankings():
-    """City rankings by price and inventory"""
-    gold_data = pd.concat([pd.read_parquet(f) for f in glob.glob("storage/gold/city_analytics/**/*.parquet", recursive=True)])
-    
+def get_city_rankings(start_date=None, end_date=None):
+    """City rankings by price and inventory, for the date range or else the most recent day"""
+    gold_data = cached_result(f"city_stats:{start_date}:{end_date}", GOLD_PARTIALS_ROOT,
+                              lambda: _city_stats(start_date, end_date))
+
     return {
         "highest_prices": gold_data.nlargest(5, 'avg_price')[['city', 'avg_price']],
         "lowest_prices": gold_data.nsmallest(5, 'avg_price')[['city', 'avg_price']],
         "most_inventory": gold_data.nlargest(5, 'listing_count')[['city', 'listing_count']]
     }
 
-def get_make_stats():
+def _city_stats(start_date, end_date):
+    dates = partition_dates()
+    if not dates:
+        return city_stats(pd.DataFrame())
+    if not start_date and not end_date:
+        start_date = end_date = dates[-1]
+    where, params = date_filter(start_date, end_date)
+    return city_stats(query(f"SELECT * FROM gold_city_partials{where}", params))
+
+def get_make_stats(start_date=None, end_date=None):
     """Statistics by car make"""
-    silver_data = pd.concat([pd.read_parquet(f) for f in glob.glob("storage/silver/car_listings/**/*.parquet", recursive=True)])
-    
-    return silver_data.groupby('make').agg({
-        'price_numeric': ['mean', 'count'],
-        'mileage_numeric': 'mean'
-    }).round(2)
+    return cached_result(f"make_stats:{start_date}:{end_date}", SILVER_ROOT,
+                         lambda: _make_stats(start_date, end_date))
+
+def _make_stats(start_date, end_date):
+    columns = pd.MultiIndex.from_tuples([('price_numeric', 'mean'), ('price_numeric', 'count'), ('mileage_numeric', 'mean')])
+    if not has_table("silver"):
+        return pd.DataFrame(columns=columns)
+    where, params = date_filter(start_date, end_date)
+
+    stats = query(f"""
+        SELECT make,
+               avg(price_numeric) AS price_mean,
+               count(price_numeric) AS price_count,
+               avg(mileage_numeric) AS mileage_mean
+        FROM silver{where}
+        GROUP BY make ORDER BY make
+    """, params).set_index('make')
+    stats.columns = columns
+    return stats.round(2)
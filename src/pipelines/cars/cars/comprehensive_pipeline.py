@@ -1,5 +1,6 @@
-from dagster import job, schedule, DefaultScheduleStatus
-from src.pipelines.cars.cars.comprehensive_scraping import scrape_car_listings
+from dagster import job, schedule, DefaultScheduleStatus, RunRequest, SkipReason
+from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES, scrape_car_listings
+from src.pipelines.cars.cars.crawl_scheduler import CrawlStats, DEFAULT_DAILY_REQUESTS, due_cities, plan_crawls
 
 @job
 def car_scraping_pipeline():
@@ -12,7 +13,8 @@ def car_scraping_pipeline():
     Expected output: 2,500-5,000+ car listings
     Estimated time: 1-2 hours
     
-    Output file: car_listings_YYYYMMDD_HHMMSS.csv
+    Output: Bronze shard storage/bronze/car_listings/date=YYYY-MM-DD/part-car_listings_YYYYMMDD_HHMMSS.parquet
+    (plus car_listings_YYYYMMDD_HHMMSS.csv with export_csv)
     """
     scrape_car_listings()
 
@@ -20,7 +22,7 @@ def car_scraping_pipeline():
 @schedule(
     job=car_scraping_pipeline,
     cron_schedule="0 2 * * *",  # Daily at 2 AM
-    default_status=DefaultScheduleStatus.RUNNING
+    default_status=DefaultScheduleStatus.STOPPED
 )
 def daily_car_scraping_schedule():
     """
@@ -28,10 +30,45 @@ def daily_car_scraping_schedule():
     
     This will automatically scrape car listings from 50 US cities
     every day at 2 AM to capture fresh automotive market data.
+    Superseded by adaptive_car_scraping_schedule; kept as a fallback.
     """
     return {}
 
 
+@schedule(
+    job=car_scraping_pipeline,
+    cron_schedule="0 * * * *",  # Checks every hour which cities are due
+    default_status=DefaultScheduleStatus.RUNNING
+)
+def adaptive_car_scraping_schedule(context):
+    """
+    Scrape only the cities that are due, each at its own frequency and depth
+    
+    Busy cities are crawled more often and quiet ones less, as planned by
+    plan_crawls from earlier runs' new-listing rates and latencies within
+    DEFAULT_DAILY_REQUESTS a day. Cities never crawled before are due at
+    once, so the first tick crawls every city in full.
+    """
+    stats = CrawlStats()
+    plans = plan_crawls(TARGET_CITIES, stats, DEFAULT_DAILY_REQUESTS)
+    due = due_cities(plans, stats, context.scheduled_execution_time)
+    if not due:
+        return SkipReason("No city is due")
+    
+    tick = context.scheduled_execution_time.strftime("%H%M")
+    return RunRequest(
+        run_key=context.scheduled_execution_time.isoformat(),
+        run_config={"ops": {"scrape_car_listings": {"config": {
+            "cities": sorted(due),
+            "city_pages": due,
+            "run_name": tick,
+            # Revalidate every page, so a city crawled twice within the default TTL still sees new listings
+            "cache_ttl_hours": 0.0,
+        }}}},
+        tags={"cities": str(len(due))},
+    )
+
+
 # Alternative schedules you can use instead:
 
 # @schedule(
@@ -1,13 +1,22 @@
-import requests
-from bs4 import BeautifulSoup
-from dagster import op, Out
-from typing import List, NamedTuple
-import csv
-import time
+from dagster import op, Out, Enum, EnumValue, Field, Map
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import re
-import sys
+import queue
 import os
+import threading
+import time
+
+
+from src.pipelines.cars.cars.fetcher import ConcurrentFetcher
+from src.pipelines.cars.cars.crawl_scheduler import record_run
+from src.pipelines.cars.cars.html_extract import BACKENDS, DEFAULT_BACKEND, extract_listings
+from src.pipelines.cars.cars.http_cache import HTTPCache
+from src.pipelines.cars.cars.listing_buffer import ListingBuffer
+from src.pipelines.cars.cars.run_manifest import RunManifest
+from src.pipelines.cars.cars.scrape_telemetry import ScrapeTelemetry
+from src.pipelines.cars.cars.title_parser import PRICE_RE, parse_price, parse_title
+from src.transformations.bronze_layer import publish_listings
 
 # Target cities for scraping
 TARGET_CITIES = {
@@ -80,63 +89,18 @@ class CarListing(NamedTuple):
 
 def extract_car_details(title: str):
     """Extract year, make, model from title"""
-    year_match = re.search(r'\b(19|20)\d{2}\b', title)
-    year = year_match.group() if year_match else "N/A"
-    
-    makes = ['Mercedes-Benz', 'Land Rover', 'Chevrolet', 'Chevy', 'Toyota', 'Honda', 'Ford', 'BMW', 'Audi', 'Volkswagen', 'VW', 
-             'Nissan', 'Hyundai', 'Kia', 'Subaru', 'Mazda', 'Lexus', 'Infiniti', 'Acura', 'Cadillac', 
-             'Buick', 'GMC', 'Jeep', 'Dodge', 'Chrysler', 'Ram', 'Lincoln', 'Volvo', 'Porsche', 'Tesla',
-             'Mitsubishi', 'Suzuki', 'Fiat', 'Mini', 'Jaguar', 'Maserati', 'Ferrari', 'Lamborghini']
-    
-    make = "N/A"
-    for m in makes:
-        if re.search(rf'\b{m}\b', title, re.IGNORECASE):
-            make = m
-            break
-    
-    model = "N/A"
-    if make != "N/A":
-        if make == "Mercedes-Benz":
-            pattern = r'Mercedes-Benz\s+([A-Za-z0-9-]+(?:\s+[A-Za-z0-9-]+){0,2})'
-        else:
-            pattern = rf'{make}\s+([A-Za-z0-9-]+(?:\s+[A-Za-z0-9-]+){{0,2}})'
-        
-        model_match = re.search(pattern, title, re.IGNORECASE)
-        if model_match:
-            model = model_match.group(1).strip()
-            model = re.sub(r'\s+(Touring|Low|miles|dvd|Navi|navigation|backup|camera|owner|since|new|original|AMG|4MATIC|Coupe).*', '', model, flags=re.IGNORECASE)
-            model = model.strip()
-    
-    return year, make, model
+    parsed = parse_title(title)
+    return parsed.year, parsed.make, parsed.model
 
 
 def extract_mileage(title: str) -> str:
     """Extract mileage from title"""
-    patterns = [
-        r'(\d{1,3}[kK])\s*(?:miles?|mi)?',
-        r'(\d{1,3},\d{3})\s*(?:original\s+)?(?:miles?|mi)',
-        r'(\d{4,6})\s*(?:original\s+)?(?:miles?|mi)',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, title, re.IGNORECASE)
-        if match:
-            return match.group(1)
-    return "N/A"
+    return parse_title(title).mileage
 
 
 def extract_price_from_text(text: str) -> str:
     """Extract price from listing text"""
-    price_match = re.search(r'\$[\d,]+', text)
-    if price_match:
-        price = price_match.group()
-        clean_price = price.replace('$', '').replace(',', '')
-        try:
-            float(clean_price)
-            return price
-        except ValueError:
-            pass
-    return "N/A"
+    return parse_price(text)
 
 
 def extract_location_from_text(text: str) -> str:
@@ -151,95 +115,362 @@ def extract_location_from_text(text: str) -> str:
         if found_price and '$' not in line and len(line) > 2:
             return line
         
-        if '$' in line and re.search(r'\$[\d,]+', line):
+        if '$' in line and PRICE_RE.search(line):
             found_price = True
     
     return "N/A"
 
 
-@op(out=Out(List[CarListing]))
-def scrape_car_listings() -> List[CarListing]:
-    target_cities = TARGET_CITIES
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-    all_listings = []
-    scrape_date = datetime.now().strftime("%Y-%m-%d")
+SEARCH_URL_TEMPLATE = "https://{city_code}.craigslist.org/d/cars-trucks/search/cta"
+
+# Bump whenever parsing output changes, so cached parsed pages are rebuilt
+PARSED_PAGE_VERSION = "1"
+
+# About eight result pages: few enough to refetch after a crash, enough to keep chunks from being tiny
+DEFAULT_CHUNK_ROWS = 1000
+
+
+def parse_search_page(content: bytes, city_code: str, city_name: str, scrape_date: str,
+                      backend: str = DEFAULT_BACKEND, errors: Optional[List[str]] = None,
+                      stage_seconds: Optional[Dict[str, float]] = None) -> List[CarListing]:
+    """
+    Parse the car listings out of one Craigslist search results page
     
-    for i, (city_code, city_name) in enumerate(target_cities.items(), 1):
-        print(f"[{i}/{len(target_cities)}] {city_name}")
-        
+    Listings that fail to parse are skipped; pass `errors` to collect why.
+    Pass `stage_seconds` to have the seconds spent finding the listings in
+    the HTML ("html") and extracting their fields ("extract") added to it.
+    """
+    parsed = []
+    
+    start = time.perf_counter() if stage_seconds is not None else 0.0
+    raw_listings = extract_listings(content, backend)
+    if stage_seconds is not None:
+        extracted = time.perf_counter()
+        stage_seconds["html"] = stage_seconds.get("html", 0.0) + extracted - start
+    
+    for listing in raw_listings:
         try:
-            url = f"https://{city_code}.craigslist.org/d/cars-trucks/search/cta"
-            response = requests.get(url, headers=headers)
-            soup = BeautifulSoup(response.content, "html.parser")
-            listings = soup.select("li.cl-static-search-result")
+            title = listing.title.strip()
+            link = listing.href
+            if link.startswith("/"):
+                link = f"https://{city_code}.craigslist.org" + link
+            
+            year, make, model = extract_car_details(title)
+            mileage = extract_mileage(title)
             
-            for listing in listings[:100]:
-                try:
-                    title_tag = (listing.select_one("a[href*='/cto/']") or 
-                                listing.select_one("a[href*='/ctd/']") or 
-                                listing.select_one("a[href*='/ctp/']") or 
-                                listing.select_one("a.cl-app-anchor"))
-                    
-                    if not title_tag:
-                        continue
-                        
-                    title = title_tag.text.strip()
-                    link = title_tag.get("href", "")
-                    if link.startswith("/"):
-                        link = f"https://{city_code}.craigslist.org" + link
-                    
-                    year, make, model = extract_car_details(title)
-                    mileage = extract_mileage(title)
-                    
-                    full_text = listing.get_text()
-                    
-                    price_tag = listing.select_one("span.result-price")
-                    if price_tag:
-                        price = price_tag.text.strip()
-                    else:
-                        price = extract_price_from_text(full_text)
-                    
-                    if "/cto/" in link:
-                        dealer_type = "Owner"
-                    elif "/ctd/" in link:
-                        dealer_type = "Dealer"
-                    else:
-                        dealer_type = "Private"
-                    
-                    location_tag = listing.select_one("span.result-hood")
-                    if location_tag:
-                        location = location_tag.text.strip().replace('(', '').replace(')', '')
-                    else:
-                        location = extract_location_from_text(full_text)
-                    
-                    all_listings.append(CarListing(
-                        year=year,
-                        make=make,
-                        model=model,
-                        title=title,
-                        price=price,
-                        mileage=mileage,
-                        dealer_type=dealer_type,
-                        location=location,
-                        link=link,
-                        city=city_name,
-                        scrape_date=scrape_date
-                    ))
-                    
-                except Exception:
-                    continue
+            if listing.price is not None:
+                price = listing.price.strip()
+            else:
+                price = extract_price_from_text(listing.text)
             
-            time.sleep(1)
+            if "/cto/" in link:
+                dealer_type = "Owner"
+            elif "/ctd/" in link:
+                dealer_type = "Dealer"
+            else:
+                dealer_type = "Private"
             
-        except Exception:
+            if listing.hood is not None:
+                location = listing.hood.strip().replace('(', '').replace(')', '')
+            else:
+                location = extract_location_from_text(listing.text)
+            
+            parsed.append(CarListing(
+                year=year,
+                make=make,
+                model=model,
+                title=title,
+                price=price,
+                mileage=mileage,
+                dealer_type=dealer_type,
+                location=location,
+                link=link,
+                city=city_name,
+                scrape_date=scrape_date
+            ))
+            
+        except Exception as e:
+            if errors is not None:
+                errors.append(f"{type(e).__name__}: {e}"[:200])
             continue
     
-    filename = f"car_listings_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    with open(filename, mode="w", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        writer.writerow(["year", "make", "model", "title", "price", "mileage", "dealer_type", "location", "link", "city", "scrape_date"])
-        for listing in all_listings:
-            writer.writerow(list(listing))
+    if stage_seconds is not None:
+        stage_seconds["extract"] = stage_seconds.get("extract", 0.0) + time.perf_counter() - extracted
+    return parsed
+
+
+def page_url(search_url: str, offset: int) -> str:
+    """URL of the search results page starting at `offset`"""
+    return search_url if offset == 0 else f"{search_url}?s={offset}"
+
+
+class CityPage(NamedTuple):
+    """One crawled result page, or (with done=True) the end of a city's crawl"""
+    city_code: str
+    next_page: int
+    next_offset: int
+    listings: List[CarListing]
+    listing_errors: List[str]
+    done: bool = False
+    error: Optional[str] = None
+    # Seconds the page took over the network; 0 when served from the HTTP cache
+    fetch_seconds: float = 0.0
+
+
+class CrawlError(Exception):
+    pass
+
+
+def crawl_city(fetcher: ConcurrentFetcher, city_code: str, city_name: str, scrape_date: str,
+               url_template: str = SEARCH_URL_TEMPLATE, max_pages: int = 20,
+               backend: str = DEFAULT_BACKEND, start_page: int = 0, start_offset: int = 0,
+               telemetry: Optional[ScrapeTelemetry] = None) -> Iterator[CityPage]:
+    """
+    Walk a city's search result pages in order, yielding each page
+    
+    Starts from `start_page` / `start_offset` when resuming. Stops at
+    `max_pages`, on an empty page, or when Craigslist starts repeating the
+    previous page, and raises CrawlError on a failed page. Only the previous
+    page's links are kept, so memory does not grow with crawl depth. Each
+    fetch and parse is recorded in `telemetry`, if given.
+    """
+    search_url = url_template.format(city_code=city_code)
+    offset = start_offset
+    previous_links = set()
+    
+    for page_index in range(start_page, max_pages):
+        url = page_url(search_url, offset)
+        result = fetcher.fetch(url, key=city_code, rate_key=city_code)
+        if result.error or result.status not in (200, 304):
+            if telemetry:
+                telemetry.record_fetch_failure(city_code, result)
+            raise CrawlError(f"page at offset {offset} failed: {result.error or f'HTTP {result.status}'}")
+        
+        page = None
+        errors = []
+        stage_seconds = {} if telemetry else None
+        if result.not_modified:
+            rows = fetcher.cache.load_parsed(url, PARSED_PAGE_VERSION)
+            if rows is not None:
+                page = [CarListing(*row, scrape_date=scrape_date) for row in rows]
+                fetcher.cache.stats.add("parsed_reused")
+        if page is None:
+            page = parse_search_page(result.content, city_code, city_name, scrape_date, backend, errors, stage_seconds)
+            if fetcher.cache:
+                fetcher.cache.store_parsed(url, [list(listing[:-1]) for listing in page], PARSED_PAGE_VERSION)
+        if telemetry:
+            telemetry.record_page(city_code, result, stage_seconds, len(page), errors)
+        links = {listing.link for listing in page}
+        if not page or links <= previous_links:
+            return
+        
+        previous_links = links
+        offset += len(page)
+        yield CityPage(city_code, page_index + 1, offset, page, errors, fetch_seconds=result.elapsed)
+
+
+def crawl_cities(target_cities: Dict[str, str], fetcher: ConcurrentFetcher, scrape_date: str,
+                 url_template: str = SEARCH_URL_TEMPLATE, max_pages: int = 20,
+                 backend: str = DEFAULT_BACKEND,
+                 resume_points: Optional[Dict[str, Tuple[int, int]]] = None,
+                 city_pages: Optional[Dict[str, int]] = None,
+                 telemetry: Optional[ScrapeTelemetry] = None) -> Iterator[CityPage]:
+    """
+    Crawl every city concurrently, yielding pages as they arrive
+    
+    Each city ends with a done=True CityPage carrying the failure reason, if
+    any. Pages are handed over through a bounded queue, so crawl threads
+    block instead of buffering when the consumer falls behind. `city_pages`
+    overrides `max_pages` for individual cities.
+    """
+    resume_points = resume_points or {}
+    city_pages = city_pages or {}
+    pages = queue.Queue(maxsize=fetcher.max_concurrency * 2)
+    stop = threading.Event()
+    
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    def crawl(city_code, city_name):
+        start_page, start_offset = resume_points.get(city_code, (0, 0))
+        last = CityPage(city_code, start_page, start_offset, [], [])
+        error = None
+        try:
+            for page in crawl_city(fetcher, city_code, city_name, scrape_date, url_template,
+                                   city_pages.get(city_code, max_pages), backend, start_page, start_offset,
+                                   telemetry):
+                if stop.is_set():
+                    return
+                put(page)
+                last = page
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            put(last._replace(listings=[], listing_errors=[], done=True, error=error))
+    
+    with ThreadPoolExecutor(max_workers=fetcher.max_concurrency, thread_name_prefix="crawl") as executor:
+        for city_code, city_name in target_cities.items():
+            executor.submit(crawl, city_code, city_name)
+        
+        finished = 0
+        counts = dict.fromkeys(target_cities, 0)
+        try:
+            while finished < len(target_cities):
+                page = pages.get()
+                counts[page.city_code] += len(page.listings)
+                if page.done:
+                    finished += 1
+                    city_name = target_cities[page.city_code]
+                    status = f"failed ({page.error})" if page.error else f"{counts[page.city_code]} listings"
+                    print(f"[{finished}/{len(target_cities)}] {city_name}: {status}")
+                yield page
+        finally:
+            stop.set()
+
+
+def scrape_run(manifest: RunManifest, fetcher: ConcurrentFetcher, max_pages: int = 20,
+               backend: str = DEFAULT_BACKEND, url_template: str = SEARCH_URL_TEMPLATE,
+               chunk_rows: int = DEFAULT_CHUNK_ROWS,
+               city_pages: Optional[Dict[str, int]] = None,
+               telemetry: Optional[ScrapeTelemetry] = None) -> Dict[str, List[float]]:
+    """
+    Crawl a run's pending cities into per-city parquet chunks
+    
+    Each city's pages collect in a ListingBuffer and are written out as a
+    chunk, and committed to the manifest, once it holds `chunk_rows`
+    listings and when the city finishes. An interrupted run can be resumed
+    from the same manifest; only pages after the last committed chunk are
+    fetched again. Returns each crawled city's page fetch times. With
+    `telemetry`, also records per-stage timings, statuses and drops.
+    """
+    fetch_seconds: Dict[str, List[float]] = {}
+    buffers: Dict[str, ListingBuffer] = {}
+    uncommitted: Dict[str, CityPage] = {}
+    errors: Dict[str, List[str]] = {}
+    
+    def commit(city_code: str) -> None:
+        buffer = buffers.get(city_code)
+        if buffer is not None and len(buffer):
+            last = uncommitted.pop(city_code)
+            start = time.perf_counter()
+            manifest.write_chunk(city_code, buffer, last.next_page, last.next_offset, errors.pop(city_code, []))
+            buffer.clear()
+            if telemetry:
+                telemetry.record_stage(city_code, "write", time.perf_counter() - start)
+    
+    try:
+        for page in crawl_cities(manifest.pending(), fetcher, manifest.data["scrape_date"], url_template,
+                                 max_pages, backend, manifest.resume_points(), city_pages, telemetry):
+            city_code = page.city_code
+            if page.done:
+                if telemetry and page.error:
+                    telemetry.record_failure(city_code, page.error)
+                commit(city_code)
+                buffers.pop(city_code, None)
+                manifest.finish_city(city_code, page.error)
+                continue
+            
+            fetch_seconds.setdefault(city_code, []).append(page.fetch_seconds)
+            buffer = buffers.setdefault(city_code, ListingBuffer())
+            start = time.perf_counter()
+            buffer.extend(page.listings)
+            if telemetry:
+                telemetry.record_stage(city_code, "buffer", time.perf_counter() - start)
+            uncommitted[city_code] = page
+            errors.setdefault(city_code, []).extend(page.listing_errors)
+            if len(buffer) >= chunk_rows:
+                commit(city_code)
+    finally:
+        # Buffered pages are complete, so they are kept even if the crawl was cut short
+        for city_code in list(buffers):
+            commit(city_code)
+    return fetch_seconds
+
+
+def publish_run(manifest: RunManifest, export_csv: bool = False) -> List[str]:
+    """
+    Publish a run's committed listings into Bronze and return the shard paths
+    
+    The chunks are streamed in one at a time, so publishing holds one chunk
+    in memory, as the crawl did. With `export_csv`, the listings are also written to the run's CSV file
+    (car_listings_YYYYMMDD_HHMMSS.csv) for anyone who wants the raw export.
+    """
+    source = os.path.splitext(manifest.data["output"])[0] + ".parquet"
+    csv_path = manifest.data["output"] if export_csv else None
+    return publish_listings(manifest.committed_chunks(), source, csv_path)
+
+
+@op(
+    out=Out(list),
+    config_schema={
+        "max_concurrency": Field(int, default_value=8, description="Maximum requests in flight at once"),
+        "per_host_interval": Field(float, default_value=1.0, description="Minimum seconds between requests to one host"),
+        "timeout": Field(float, default_value=30.0, description="Per-request timeout in seconds"),
+        "max_pages": Field(int, default_value=20, description="Maximum search result pages crawled per city"),
+        "html_backend": Field(Enum("HtmlBackend", [EnumValue(name) for name in BACKENDS]), default_value=DEFAULT_BACKEND,
+                              description="HTML extraction backend: lxml or bs4"),
+        "use_cache": Field(bool, default_value=True, description="Serve and revalidate pages from the on-disk HTTP cache"),
+        "cache_ttl_hours": Field(float, default_value=12.0, description="Hours a cached page is used without revalidation"),
+        "cache_max_mb": Field(int, default_value=500, description="Size limit of the HTTP cache"),
+        "resume": Field(bool, default_value=True, description="Resume today's run from its manifest instead of starting over"),
+        "chunk_rows": Field(int, default_value=DEFAULT_CHUNK_ROWS,
+                            description="Listings a city buffers before they are written out and committed"),
+        "export_csv": Field(bool, default_value=False,
+                            description="Also write the run's listings to car_listings_YYYYMMDD_HHMMSS.csv"),
+        "cities": Field([str], is_required=False, description="City codes to crawl; all target cities if not set"),
+        "city_pages": Field(Map(str, int), is_required=False, description="Pages to crawl per city, overriding max_pages"),
+        "run_name": Field(str, is_required=False,
+                          description="Names the run within the day, so several runs a day each resume on their own"),
+        "telemetry": Field(bool, default_value=True,
+                           description="Record per-stage timings, HTTP statuses and dropped listings per city"),
+    }
+)
+def scrape_car_listings(context) -> list:
+    """
+    Crawl all target cities into Bronze and return the Bronze shard paths
+    
+    Progress is checkpointed in the run manifest, so a re-run on the same day
+    only fetches the pages and cities that are still missing. The listings
+    go straight into Bronze as parquet, queued for the next ingestion, and
+    each finished city's crawl is recorded for the adaptive scheduler. With
+    telemetry on, the run's timings and counts go into the output metadata
+    and a telemetry_HHMMSS.json report next to the manifest.
+    """
+    config = context.op_config
+    scrape_date = datetime.now().strftime("%Y-%m-%d")
+    cities = {code: TARGET_CITIES[code] for code in config.get("cities", TARGET_CITIES)}
+    manifest = RunManifest.load_or_create(scrape_date, cities, resume=config["resume"], run_name=config.get("run_name"))
+    pending = manifest.pending()
+    telemetry = ScrapeTelemetry(manifest.data["run_id"]) if config["telemetry"] else None
+    print(f"Run {manifest.data['run_id']}: {len(pending)} of {len(cities)} cities to crawl")
+    
+    cache = None
+    if config["use_cache"]:
+        cache = HTTPCache(ttl=config["cache_ttl_hours"] * 3600, max_bytes=config["cache_max_mb"] * 1024 * 1024)
+    
+    with ConcurrentFetcher(max_concurrency=config["max_concurrency"],
+                           per_host_interval=config["per_host_interval"],
+                           timeout=config["timeout"], cache=cache) as fetcher:
+        fetch_seconds = scrape_run(manifest, fetcher, config["max_pages"], config["html_backend"],
+                                   chunk_rows=config["chunk_rows"], city_pages=config.get("city_pages"),
+                                   telemetry=telemetry)
+    shards = publish_run(manifest, config["export_csv"])
+    record_run(manifest, pending, fetch_seconds)
     
-    print(f"Saved {len(all_listings)} listings to {filename}")
-    return all_listings
+    summary = manifest.summary()
+    print(f"Published {summary['listings']} listings to {', '.join(shards) or 'no shards'} ({summary})")
+    metadata = {"run_manifest": manifest.path, "bronze_shards": ", ".join(shards), **summary}
+    if cache:
+        cache.evict()
+        cache_stats = cache.stats.as_dict()
+        print(f"HTTP cache: {cache_stats}")
+        metadata.update({f"cache_{name}": count for name, count in cache_stats.items()})
+    if telemetry:
+        metadata.update({"telemetry_report": telemetry.save(manifest.run_dir), **telemetry.metadata()})
+    context.add_output_metadata(metadata)
+    return shards
@@ -0,0 +1,215 @@
+import json
+import math
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.pipelines.cars.cars.run_manifest import RunManifest
+from src.transformations.dedup_index import link_hashes
+
+SCHEDULER_ROOT = "storage/scheduler"
+
+# Listings on one search result page
+PAGE_LISTINGS = 120
+# Crawl intervals a city can be given, shortest first
+INTERVAL_HOURS = (6, 12, 24, 48, 72, 168)
+# Requests a day across all cities; what crawling every city daily at 20 pages costs
+DEFAULT_DAILY_REQUESTS = 1000
+# Fresh listings (see fresh_value) a shorter interval must add per extra request to be worth it
+MIN_GAIN_PER_REQUEST = 5.0
+# Weight of the latest run in the smoothed rates
+SMOOTHING = 0.5
+# A city this close to its next crawl is treated as due, so hourly ticks don't slip an interval
+DUE_SLACK_HOURS = 0.5
+
+
+def utc(moment: datetime) -> datetime:
+    """A timezone-aware time as UTC; naive times are rejected rather than guessed at"""
+    if moment.tzinfo is None or moment.utcoffset() is None:
+        raise ValueError(f"Expected a timezone-aware time, got naive {moment.isoformat()}")
+    return moment.astimezone(timezone.utc)
+
+
+class CityPlan(NamedTuple):
+    interval_hours: int
+    pages: int
+
+
+class CrawlStats:
+    """
+    What earlier scrape runs saw of each city
+
+    Per city: when it was last crawled, its smoothed rate of new listings
+    per hour and its smoothed seconds per page fetch, in one JSON file, plus
+    the link hashes of its last crawl in an .npy file. Times are stored as
+    UTC with their offset, so they compare with schedule ticks on any host.
+    A crawl's new listings are the links that were not in the city's
+    previous crawl. Result pages are newest first, so when every crawled
+    link is new the crawl did not reach back to the previous one; that rate
+    is only a lower bound and counts double.
+
+    Layout: <root>/city_stats.json and <root>/links/<city_code>.npy
+    """
+
+    def __init__(self, root: str = SCHEDULER_ROOT):
+        self.root = root
+        self.path = os.path.join(root, "city_stats.json")
+        self.cities: Dict[str, dict] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.cities = json.load(f)
+
+    def _links_path(self, city_code: str) -> str:
+        return os.path.join(self.root, "links", f"{city_code}.npy")
+
+    def observe(self, city_code: str, hashes: np.ndarray, fetch_seconds: Iterable[float],
+                at: Optional[datetime] = None) -> None:
+        """Record one finished crawl of a city: the hashes of the links it found and its page fetch times"""
+        at = utc(at) if at else datetime.now(timezone.utc)
+        links = np.unique(hashes)
+        city = self.cities.setdefault(city_code, {"crawls": 0, "rate": None, "latency": None})
+
+        links_path = self._links_path(city_code)
+        if city.get("last_crawl") and os.path.exists(links_path):
+            new = int((~np.isin(links, np.load(links_path), assume_unique=True)).sum())
+            hours = max((at - utc(datetime.fromisoformat(city["last_crawl"]))).total_seconds() / 3600, 1.0)
+            rate = new / hours * (2 if new and new == len(links) else 1)
+            city["rate"] = rate if city["rate"] is None else SMOOTHING * rate + (1 - SMOOTHING) * city["rate"]
+            city["last_new"] = new
+
+        # Pages served from the HTTP cache say nothing about the site's latency
+        fetched = [seconds for seconds in fetch_seconds if seconds > 0]
+        if fetched:
+            latency = float(np.mean(fetched))
+            city["latency"] = latency if city["latency"] is None else \
+                SMOOTHING * latency + (1 - SMOOTHING) * city["latency"]
+
+        city["crawls"] += 1
+        city["last_crawl"] = at.isoformat(timespec="seconds")
+        city["last_links"] = len(links)
+        os.makedirs(os.path.dirname(links_path), exist_ok=True)
+        np.save(f"{links_path}.tmp.npy", links)
+        os.replace(f"{links_path}.tmp.npy", links_path)
+
+    def save(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.cities, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def record_run(manifest: RunManifest, city_codes: Iterable[str], fetch_seconds: Dict[str, List[float]],
+               stats: Optional[CrawlStats] = None) -> CrawlStats:
+    """Observe each of `city_codes` the run finished crawling, from its committed listings, and save the stats"""
+    stats = stats or CrawlStats()
+    for code in city_codes:
+        city = manifest.cities[code]
+        if city["status"] != "complete":
+            continue
+        links = [pq.read_table(manifest.chunk_path(code, chunk), columns=["link"]).column("link")
+                 for chunk in range(city["chunks"])]
+        hashes = link_hashes(pa.chunked_array(links, pa.string()).to_pandas()) if links else \
+            np.empty(0, dtype=np.uint64)
+        stats.observe(code, hashes, fetch_seconds.get(code, []))
+    stats.save()
+    return stats
+
+
+def crawl_depth(rate: float, interval_hours: int, max_pages: int) -> int:
+    """Pages reaching back over everything listed since the previous crawl, with a quarter to spare"""
+    return int(min(max_pages, max(1, math.ceil(rate * interval_hours * 1.25 / PAGE_LISTINGS))))
+
+
+def daily_requests(plan: CityPlan) -> float:
+    return plan.pages * 24 / plan.interval_hours
+
+
+def fresh_value(rate: float, plan: CityPlan) -> float:
+    """
+    New listings a day a plan captures, each discounted by how late it is found
+
+    A crawl catches at most its pages' worth of what was listed since the
+    previous one. A listing is found half an interval after it is posted on
+    average, and counts 24 / (24 + that delay): fully when found at once,
+    half when found a day late.
+    """
+    captured = min(rate * plan.interval_hours, plan.pages * PAGE_LISTINGS) * 24 / plan.interval_hours
+    return captured * 24 / (24 + plan.interval_hours / 2)
+
+
+def plan_crawls(city_codes: Iterable[str], stats: CrawlStats, daily_budget: int = DEFAULT_DAILY_REQUESTS,
+                max_pages: int = 20, min_gain: float = MIN_GAIN_PER_REQUEST) -> Dict[str, CityPlan]:
+    """
+    Crawl interval and page depth for each city, within `daily_budget` requests a day
+
+    A city without a measured rate yet is crawled daily at full depth.
+    Every other city starts at the longest interval, with the depth its rate
+    needs. If that is already over budget, cities lose pages, least
+    fresh_value lost per request saved first. Otherwise, while the budget
+    allows, the city whose next shorter interval adds the most fresh_value
+    per extra request gets it, as long as that is at least `min_gain`, so
+    leftover budget is not spent on cities with nothing new. Requests are
+    weighted by the city's latency relative to the median, so a slow city
+    has to be worth more to be crawled more often.
+    """
+    plans, options, weights = {}, {}, {}
+    latencies = [city["latency"] for city in stats.cities.values() if city.get("latency")]
+    median_latency = float(np.median(latencies)) if latencies else 1.0
+
+    for code in city_codes:
+        city = stats.cities.get(code, {})
+        if city.get("rate") is None:
+            plans[code] = CityPlan(24, max_pages)
+            continue
+        options[code] = [CityPlan(hours, crawl_depth(city["rate"], hours, max_pages)) for hours in INTERVAL_HOURS]
+        plans[code] = options[code][-1]
+        weights[code] = (city.get("latency") or median_latency) / median_latency
+
+    spent = sum(daily_requests(plan) for plan in plans.values())
+    while spent > daily_budget:
+        trimmable = [code for code in options if plans[code].pages > 1]
+        if not trimmable:
+            return plans
+        code = min(trimmable, key=lambda code: (
+            fresh_value(stats.cities[code]["rate"], plans[code])
+            - fresh_value(stats.cities[code]["rate"], plans[code]._replace(pages=plans[code].pages - 1))))
+        spent -= daily_requests(plans[code]) - daily_requests(plans[code]._replace(pages=plans[code].pages - 1))
+        plans[code] = plans[code]._replace(pages=plans[code].pages - 1)
+
+    while True:
+        best, best_gain = None, min_gain
+        for code, choices in options.items():
+            current = INTERVAL_HOURS.index(plans[code].interval_hours)
+            if current == 0:
+                continue
+            step = choices[current - 1]
+            cost = daily_requests(step) - daily_requests(plans[code])
+            if spent + cost > daily_budget:
+                continue
+            rate = stats.cities[code]["rate"]
+            gain = (fresh_value(rate, step) - fresh_value(rate, plans[code])) / max(cost * weights[code], 1e-9)
+            if gain >= best_gain:
+                best, best_gain = code, gain
+        if best is None:
+            return plans
+        current = INTERVAL_HOURS.index(plans[best].interval_hours)
+        spent += daily_requests(options[best][current - 1]) - daily_requests(plans[best])
+        plans[best] = options[best][current - 1]
+
+
+def due_cities(plans: Dict[str, CityPlan], stats: CrawlStats, now: Optional[datetime] = None) -> Dict[str, int]:
+    """The cities whose interval has run out since their last crawl, with the pages to crawl"""
+    now = utc(now) if now else datetime.now(timezone.utc)
+    due = {}
+    for code, plan in plans.items():
+        last_crawl = stats.cities.get(code, {}).get("last_crawl")
+        hours = (now - utc(datetime.fromisoformat(last_crawl))).total_seconds() / 3600 if last_crawl else math.inf
+        if hours >= plan.interval_hours - DUE_SLACK_HOURS:
+            due[code] = plan.pages
+    return due
+
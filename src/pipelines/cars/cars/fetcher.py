@@ -0,0 +1,132 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.pipelines.cars.cars.http_cache import HTTPCache
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+
+
+class FetchResult(NamedTuple):
+    key: str
+    url: str
+    status: int
+    content: bytes
+    elapsed: float
+    error: Optional[str]
+    # True when `content` is an unchanged cached body (fresh hit or 304)
+    not_modified: bool = False
+    # Seconds spent waiting for the rate-limit slot and a free connection before the request
+    waited: float = 0.0
+
+
+class HostRateLimiter:
+    """Enforce a minimum interval between requests to the same host"""
+
+    def __init__(self, min_interval: float = 1.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def wait(self, host: str) -> float:
+        """Sleep until the host's next slot, returning the seconds slept"""
+        if self.min_interval <= 0:
+            return 0.0
+
+        # Reserve the next free slot for this host, then sleep outside the lock
+        # so other hosts are never blocked behind it
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return max(delay, 0.0)
+
+
+class ConcurrentFetcher:
+    """
+    Thread-pooled HTTP fetcher with keep-alive connection pooling
+
+    At most `max_concurrency` requests are in flight at once, whichever
+    threads issue them, and requests sharing a rate key (the URL host by
+    default) are spaced at least `per_host_interval` seconds apart. With a
+    `cache`, fresh entries skip the network entirely and stale ones are
+    revalidated with a conditional request.
+    """
+
+    def __init__(self, max_concurrency: int = 8, per_host_interval: float = 1.0,
+                 timeout: float = 30.0, headers: Optional[Dict[str, str]] = None,
+                 pool_hosts: int = 64, cache: Optional[HTTPCache] = None):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.rate_limiter = HostRateLimiter(per_host_interval)
+        self.cache = cache
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="fetch")
+
+    def fetch(self, url: str, key: Optional[str] = None, rate_key: Optional[str] = None) -> FetchResult:
+        """Fetch one URL, waiting for its rate-limit slot first"""
+        key = key or url
+        entry = self.cache.get(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            self.cache.stats.add("hits")
+            return FetchResult(key, url, 200, entry.content, 0.0, None, not_modified=True)
+
+        waited = self.rate_limiter.wait(rate_key or urlsplit(url).hostname or "")
+        headers = HTTPCache.conditional_headers(entry) if entry else None
+
+        queued = time.perf_counter()
+        with self._slots:
+            start = time.perf_counter()
+            waited += start - queued
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                return FetchResult(key, url, 0, b"", time.perf_counter() - start, f"{type(e).__name__}: {e}",
+                                   waited=waited)
+            elapsed = time.perf_counter() - start
+
+        if response.status_code == 304:
+            if not entry:
+                # Nothing cached stands in for the empty body
+                return FetchResult(key, url, 304, b"", elapsed, "HTTP 304 with no cached copy", waited=waited)
+            self.cache.refresh(entry, response.headers)
+            self.cache.stats.add("revalidated")
+            return FetchResult(key, url, 304, entry.content, elapsed, None, not_modified=True, waited=waited)
+        if self.cache and response.status_code == 200:
+            self.cache.put(url, response.headers, response.content)
+            self.cache.stats.add("misses")
+        return FetchResult(key, url, response.status_code, response.content, elapsed, None, waited=waited)
+
+    def fetch_all(self, urls: Dict[str, str], rate_keys: Optional[Dict[str, str]] = None) -> Iterator[FetchResult]:
+        """Fetch {key: url} concurrently, yielding results as they complete"""
+        rate_keys = rate_keys or {}
+        futures = [self._executor.submit(self.fetch, url, key, rate_keys.get(key))
+                   for key, url in urls.items()]
+        for future in as_completed(futures):
+            yield future.result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
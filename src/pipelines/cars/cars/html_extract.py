@@ -0,0 +1,136 @@
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+
+class RawListing(NamedTuple):
+    title: str
+    href: str
+    price: Optional[str]  # span.result-price text, if the tag exists
+    hood: Optional[str]   # span.result-hood text, if the tag exists
+    text: str             # Full listing text, only filled when price or hood is missing
+
+
+# Anchor preference for the listing title: owner, dealer and private sections first
+TITLE_HREF_SECTIONS = ("/cto/", "/ctd/", "/ctp/")
+
+
+def extract_bs4(content: bytes) -> List[RawListing]:
+    """Extract raw listings with BeautifulSoup's pure-Python html.parser"""
+    soup = BeautifulSoup(content, "html.parser")
+    raw = []
+
+    for listing in soup.select("li.cl-static-search-result"):
+        title_tag = (listing.select_one("a[href*='/cto/']") or
+                     listing.select_one("a[href*='/ctd/']") or
+                     listing.select_one("a[href*='/ctp/']") or
+                     listing.select_one("a.cl-app-anchor"))
+        if not title_tag:
+            continue
+
+        price_tag = listing.select_one("span.result-price")
+        hood_tag = listing.select_one("span.result-hood")
+        raw.append(RawListing(
+            title=title_tag.text,
+            href=title_tag.get("href", ""),
+            price=price_tag.text if price_tag else None,
+            hood=hood_tag.text if hood_tag else None,
+            text=listing.get_text() if not (price_tag and hood_tag) else ""
+        ))
+
+    return raw
+
+
+_local = threading.local()
+
+if etree is not None:
+    _RESULTS = etree.XPath(
+        "//li[contains(concat(' ', normalize-space(@class), ' '), ' cl-static-search-result ')]"
+    )
+
+
+# html.parser-backed soups collapse each whitespace-only text node to "\n" (or
+# " " without a newline); titles keep that inner whitespace, so match it
+_ASCII_SPACES = " \n\t\x0c\r"
+
+
+def _text(el) -> str:
+    return "".join(
+        t if t.strip(_ASCII_SPACES) else ("\n" if "\n" in t else " ")
+        for t in el.itertext()
+    )
+
+
+def extract_lxml(content: bytes) -> List[RawListing]:
+    """
+    Extract raw listings with lxml and precompiled XPath
+
+    Each result's subtree is walked once, picking up the title anchor and the
+    price and hood spans with the same precedence as the BeautifulSoup path.
+    """
+    # lxml parsers serialise concurrent use, so each crawl thread gets its own
+    if not hasattr(_local, "parser"):
+        _local.parser = etree.HTMLParser(encoding="utf-8")
+    root = etree.fromstring(content, _local.parser) if content else None
+    if root is None:
+        return []
+    raw = []
+
+    for listing in _RESULTS(root):
+        anchors: List[Optional[etree._Element]] = [None] * (len(TITLE_HREF_SECTIONS) + 1)
+        price_tag = hood_tag = None
+
+        for el in listing.iter("a", "span"):
+            classes = (el.get("class") or "").split()
+            if el.tag == "a":
+                href = el.get("href") or ""
+                for i, section in enumerate(TITLE_HREF_SECTIONS):
+                    if anchors[i] is None and section in href:
+                        anchors[i] = el
+                if anchors[-1] is None and "cl-app-anchor" in classes:
+                    anchors[-1] = el
+            else:
+                if price_tag is None and "result-price" in classes:
+                    price_tag = el
+                if hood_tag is None and "result-hood" in classes:
+                    hood_tag = el
+
+        title_tag = next((a for a in anchors if a is not None), None)
+        if title_tag is None:
+            continue
+
+        raw.append(RawListing(
+            title=_text(title_tag),
+            href=title_tag.get("href", ""),
+            price=_text(price_tag) if price_tag is not None else None,
+            hood=_text(hood_tag) if hood_tag is not None else None,
+            text=_text(listing) if price_tag is None or hood_tag is None else ""
+        ))
+
+    return raw
+
+
+# Backend names extract_listings accepts, whether or not their parser is installed
+BACKENDS = ("lxml", "bs4")
+
+EXTRACTORS: Dict[str, Callable[[bytes], List[RawListing]]] = {"bs4": extract_bs4}
+if etree is not None:
+    EXTRACTORS["lxml"] = extract_lxml
+
+DEFAULT_BACKEND = "lxml" if etree is not None else "bs4"
+
+
+def extract_listings(content: bytes, backend: str = DEFAULT_BACKEND) -> List[RawListing]:
+    """
+    Extract raw listings from a search page, falling back to bs4 if lxml is
+    not installed; raises ValueError for a backend name it doesn't know
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown HTML backend {backend!r}, expected one of: {', '.join(BACKENDS)}")
+    return EXTRACTORS.get(backend, extract_bs4)(content)
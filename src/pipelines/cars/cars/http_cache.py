@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+
+class CacheEntry(NamedTuple):
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    content: bytes
+
+
+class CacheStats:
+    """Per-run cache counters, safe to update from crawl threads"""
+
+    FIELDS = ("hits", "revalidated", "misses", "parsed_reused", "evicted")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, field: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[field] += n
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+class HTTPCache:
+    """
+    On-disk HTTP response store with conditional revalidation
+
+    Entries younger than `ttl` seconds are served without any request. Older
+    entries are revalidated with If-None-Match / If-Modified-Since, and a 304
+    refreshes them in place. `evict` drops entries not stored or revalidated
+    for `expire_after` seconds, then the oldest ones until the store fits in
+    `max_bytes`. Parsed listings can be stored next to a response so that
+    unchanged pages are not parsed again.
+
+    Layout: <root>/<sha1[:2]>/<sha1>.{json,body,parsed.json}
+    """
+
+    def __init__(self, root: str = "storage/http_cache", ttl: float = 12 * 3600,
+                 expire_after: float = 7 * 24 * 3600, max_bytes: int = 500 * 1024 * 1024):
+        self.root = root
+        self.ttl = ttl
+        self.expire_after = expire_after
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+
+    def _path(self, url: str, suffix: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, key[:2], f"{key}.{suffix}")
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        try:
+            with open(self._path(url, "json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self._path(url, "body"), "rb") as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(url, meta.get("etag"), meta.get("last_modified"), meta["stored_at"], content)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.stored_at < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry) -> Dict[str, str]:
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def put(self, url: str, headers, content: bytes) -> None:
+        """Store a 200 response, dropping any listings parsed from the old body"""
+        self._write(self._path(url, "body"), content)
+        self._write(self._path(url, "json"), json.dumps({
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "stored_at": time.time(),
+        }).encode("utf-8"))
+        try:
+            os.remove(self._path(url, "parsed.json"))
+        except FileNotFoundError:
+            pass
+
+    def refresh(self, entry: CacheEntry, headers) -> None:
+        """Restart an entry's TTL after a 304, picking up any new validators"""
+        self._write(self._path(entry.url, "json"), json.dumps({
+            "url": entry.url,
+            "etag": headers.get("ETag") or entry.etag,
+            "last_modified": headers.get("Last-Modified") or entry.last_modified,
+            "stored_at": time.time(),
+        }).encode("utf-8"))
+
+    def store_parsed(self, url: str, rows: List[list], version: str) -> None:
+        self._write(self._path(url, "parsed.json"),
+                    json.dumps({"version": version, "rows": rows}).encode("utf-8"))
+
+    def load_parsed(self, url: str, version: str) -> Optional[List[list]]:
+        try:
+            with open(self._path(url, "parsed.json"), encoding="utf-8") as f:
+                parsed = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return parsed["rows"] if parsed.get("version") == version else None
+
+    def evict(self) -> int:
+        """Remove expired entries, then the oldest ones while over the size limit"""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(".json") and not name.endswith(".parsed.json"):
+                    key = name[:-len(".json")]
+                    paths = [os.path.join(dirpath, f"{key}.{s}") for s in ("json", "body", "parsed.json")]
+                    existing = [p for p in paths if os.path.exists(p)]
+                    entries.append((os.path.getmtime(paths[0]), sum(os.path.getsize(p) for p in existing), existing))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.expire_after
+        evicted = 0
+        for mtime, size, paths in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            for path in paths:
+                os.remove(path)
+            total -= size
+            evicted += 1
+
+        self.stats.add("evicted", evicted)
+        return evicted
@@ -0,0 +1,131 @@
+import math
+import sys
+from array import array
+from typing import Dict, Iterable, NamedTuple, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+# Fields of a scraped listing, in the order Bronze and the scraper's chunks hold them
+LISTING_COLUMNS = ["year", "make", "model", "title", "price", "mileage", "dealer_type", "location", "link", "city", "scrape_date"]
+
+# Fields drawn from small vocabularies, stored as int32 codes into a per-column vocabulary
+DICTIONARY_COLUMNS = ("make", "model", "price", "mileage", "dealer_type", "location", "city", "scrape_date")
+# Fields that are (nearly) unique per listing, stored as one UTF-8 byte string plus offsets
+TEXT_COLUMNS = ("title", "link")
+
+# Strings Bronze's CSV reader turns into nulls (including "N/A"), so a buffer
+# converts to the same values a CSV round trip would give
+NULL_VALUES = frozenset(pv.ConvertOptions().null_values)
+
+
+class ListingBuffer:
+    """
+    Scraped listings held column by column instead of as one tuple of strings each
+
+    A list of CarListing tuples costs a tuple plus up to eleven str objects
+    per listing. Here, year is a float array (NaN when missing), title and
+    link are appended to one UTF-8 byte string per column with an offsets
+    array, and the other fields are int32 codes into a per-column vocabulary,
+    so city, scrape_date, make and dealer_type cost four bytes a row however
+    many listings repeat them. Nothing per listing stays a Python object.
+
+    to_arrow() builds the table straight from these buffers: dictionary
+    columns as Arrow dictionary arrays over the vocabulary, text columns as
+    string arrays over the bytes. Values Bronze's CSV reader would read as
+    null (empty, "N/A", ...) are null, so the table matches reading the same
+    listings back from a scraper CSV.
+    """
+
+    def __init__(self):
+        self._year = array("d")
+        self._codes = {name: array("i") for name in DICTIONARY_COLUMNS}
+        self._vocab: Dict[str, Dict[str, int]] = {name: {} for name in DICTIONARY_COLUMNS}
+        self._text = {name: bytearray() for name in TEXT_COLUMNS}
+        self._offsets = {name: array("q", [0]) for name in TEXT_COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self._year)
+
+    def append(self, listing: NamedTuple) -> None:
+        """Add one listing with the LISTING_COLUMNS fields, e.g. a CarListing"""
+        year = listing.year
+        try:
+            self._year.append(float(year) if year not in NULL_VALUES else math.nan)
+        except (TypeError, ValueError):
+            self._year.append(math.nan)
+
+        for name in DICTIONARY_COLUMNS:
+            value = getattr(listing, name)
+            if value is None or value in NULL_VALUES:
+                self._codes[name].append(-1)
+            else:
+                vocab = self._vocab[name]
+                self._codes[name].append(vocab.setdefault(value, len(vocab)))
+
+        for name in TEXT_COLUMNS:
+            value = getattr(listing, name)
+            data = self._text[name]
+            if value is not None and value not in NULL_VALUES:
+                data += value.encode("utf-8")
+            self._offsets[name].append(len(data))
+
+    def extend(self, listings: Iterable[NamedTuple]) -> None:
+        for listing in listings:
+            self.append(listing)
+
+    def clear(self) -> None:
+        """Drop the listings but keep the vocabularies, so codes stay stable across batches"""
+        del self._year[:]
+        for codes in self._codes.values():
+            del codes[:]
+        for name in TEXT_COLUMNS:
+            self._text[name].clear()
+            del self._offsets[name][1:]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the buffers and vocabularies"""
+        size = self._year.itemsize * len(self._year)
+        for name in DICTIONARY_COLUMNS:
+            size += self._codes[name].itemsize * len(self._codes[name]) + sys.getsizeof(self._vocab[name])
+            size += sum(sys.getsizeof(value) for value in self._vocab[name])
+        for name in TEXT_COLUMNS:
+            size += len(self._text[name]) + self._offsets[name].itemsize * len(self._offsets[name])
+        return size
+
+    def _dictionary_column(self, name: str, dictionary: bool) -> pa.Array:
+        codes = np.array(self._codes[name], dtype=np.int32)
+        indices = pa.array(codes, mask=codes < 0)
+        column = pa.DictionaryArray.from_arrays(indices, pa.array(list(self._vocab[name]), pa.string()))
+        return column if dictionary else column.cast(pa.string())
+
+    def _text_column(self, name: str) -> pa.Array:
+        offsets = np.array(self._offsets[name], dtype=np.int64)
+        # Nulls are the zero-length entries, as an empty field would be in a CSV
+        valid = np.diff(offsets) > 0
+        return pa.LargeStringArray.from_buffers(
+            len(self), pa.py_buffer(offsets), pa.py_buffer(bytes(self._text[name])),
+            pa.array(valid).buffers()[1], null_count=int((~valid).sum()),
+        ).cast(pa.string())
+
+    def to_arrow(self, dictionary: bool = True) -> pa.Table:
+        """
+        The listings as a table with the LISTING_COLUMNS, in order
+
+        With `dictionary`, low-cardinality columns stay dictionary encoded;
+        otherwise they are plain strings, as in the Bronze CSV schema.
+        """
+        # Copies: an Arrow view would stop the arrays growing while the table lives
+        year = np.array(self._year, dtype=np.float64)
+        columns = {"year": pa.array(year, mask=np.isnan(year))}
+        for name in DICTIONARY_COLUMNS:
+            columns[name] = self._dictionary_column(name, dictionary)
+        for name in TEXT_COLUMNS:
+            columns[name] = self._text_column(name)
+        return pa.table({name: columns[name] for name in LISTING_COLUMNS})
+
+    def write_parquet(self, path: str, dictionary: bool = True, compression: Optional[str] = "snappy") -> None:
+        pq.write_table(self.to_arrow(dictionary), path, compression=compression)
@@ -0,0 +1,135 @@
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.pipelines.cars.cars.listing_buffer import ListingBuffer
+
+RUNS_ROOT = "storage/runs"
+
+
+class RunManifest:
+    """
+    Progress record of one scrape run, at city/page granularity
+
+    Each city's pages are written out as numbered parquet chunks. After every
+    chunk the manifest records the next page and offset to fetch, plus the
+    number of committed chunks. A re-run of the same run resumes each
+    unfinished city from there; a chunk written after the last commit is
+    overwritten, so nothing is counted twice. Failures are kept with their
+    reasons instead of being swallowed.
+
+    Layout: <root>/<run_id>/manifest.json and <root>/<run_id>/shards/<city_code>-<chunk>.parquet
+    """
+
+    def __init__(self, run_dir: str, data: dict):
+        self.run_dir = run_dir
+        self.path = os.path.join(run_dir, "manifest.json")
+        self.data = data
+
+    @classmethod
+    def load_or_create(cls, scrape_date: str, cities: Dict[str, str], resume: bool = True,
+                       root: str = RUNS_ROOT, run_name: Optional[str] = None) -> "RunManifest":
+        """
+        Resume today's run if one exists (and `resume` is set), otherwise start a new one
+
+        `run_name` tells apart several runs on one day, each resumable on its own.
+        """
+        now = datetime.now()
+        run_id = scrape_date.replace("-", "") + (f"_{run_name}" if run_name else "")
+        if not resume:
+            run_id += f"_{now:%H%M%S}"
+        run_dir = os.path.join(root, run_id)
+        manifest_path = os.path.join(run_dir, "manifest.json")
+
+        if resume and os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = cls(run_dir, json.load(f))
+        else:
+            manifest = cls(run_dir, {
+                "run_id": run_id,
+                "scrape_date": scrape_date,
+                "created_at": now.isoformat(timespec="seconds"),
+                "output": f"car_listings_{now:%Y%m%d_%H%M%S}.csv",
+                "cities": {},
+            })
+
+        for city_code, city_name in cities.items():
+            manifest.data["cities"].setdefault(city_code, {
+                "city_name": city_name,
+                "status": "pending",
+                "next_page": 0,
+                "next_offset": 0,
+                "listings": 0,
+                "chunks": 0,
+                "listing_errors": {},
+                "failures": [],
+            })
+        os.makedirs(os.path.join(run_dir, "shards"), exist_ok=True)
+        manifest.save()
+        return manifest
+
+    @property
+    def cities(self) -> Dict[str, dict]:
+        return self.data["cities"]
+
+    def pending(self) -> Dict[str, str]:
+        """Cities still to crawl, including ones that failed on an earlier attempt"""
+        return {code: city["city_name"] for code, city in self.cities.items() if city["status"] != "complete"}
+
+    def resume_points(self) -> Dict[str, Tuple[int, int]]:
+        return {code: (city["next_page"], city["next_offset"]) for code, city in self.cities.items()}
+
+    def chunk_path(self, city_code: str, chunk: int) -> str:
+        return os.path.join(self.run_dir, "shards", f"{city_code}-{chunk:05d}.parquet")
+
+    def write_chunk(self, city_code: str, buffer: ListingBuffer, next_page: int, next_offset: int,
+                    listing_errors: List[str]) -> None:
+        """Write a city's buffered pages as its next chunk, then commit them"""
+        city = self.cities[city_code]
+        path = self.chunk_path(city_code, city["chunks"])
+        buffer.write_parquet(f"{path}.tmp", dictionary=False)
+        os.replace(f"{path}.tmp", path)
+
+        city["status"] = "running"
+        city["next_page"] = next_page
+        city["next_offset"] = next_offset
+        city["listings"] += len(buffer)
+        city["chunks"] += 1
+        for reason in listing_errors:
+            city["listing_errors"][reason] = city["listing_errors"].get(reason, 0) + 1
+        self.save()
+
+    def finish_city(self, city_code: str, error: Optional[str] = None) -> None:
+        city = self.cities[city_code]
+        if error:
+            city["status"] = "failed"
+            city["failures"].append({"at": datetime.now().isoformat(timespec="seconds"), "error": error})
+        else:
+            city["status"] = "complete"
+        self.save()
+
+    def summary(self) -> Dict[str, int]:
+        statuses = [city["status"] for city in self.cities.values()]
+        return {
+            "cities_complete": statuses.count("complete"),
+            "cities_failed": statuses.count("failed"),
+            "cities_pending": len(statuses) - statuses.count("complete") - statuses.count("failed"),
+            "listings": sum(city["listings"] for city in self.cities.values()),
+            "listing_errors": sum(sum(city["listing_errors"].values()) for city in self.cities.values()),
+        }
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def committed_chunks(self) -> Iterator[pa.Table]:
+        """The run's committed chunks, city by city, each read as a table with the LISTING_COLUMNS"""
+        for city_code, city in self.cities.items():
+            for chunk in range(city["chunks"]):
+                yield pq.read_table(self.chunk_path(city_code, chunk))
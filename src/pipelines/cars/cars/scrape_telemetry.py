@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.pipelines.cars.cars.fetcher import FetchResult
+
+# Where a page's time goes, in order: waiting for the host's rate-limit slot
+# and a free connection, the request itself, finding the listings in the
+# HTML, extracting their fields, buffering them and writing chunks out
+STAGES = ("wait", "network", "html", "extract", "buffer", "write")
+
+
+def fetch_status(result: FetchResult) -> str:
+    """Histogram bucket of a fetch: its HTTP status, "cache" for a fresh cache hit, "error" when it never got one"""
+    if result.error:
+        return "error"
+    if result.not_modified and result.status == 200:
+        return "cache"
+    return str(result.status)
+
+
+def drop_reason(error: str) -> str:
+    """The exception type of a listing parse error, as parse_search_page records them"""
+    return error.split(":", 1)[0]
+
+
+class CityTelemetry:
+    """Counters for one city's crawl"""
+
+    def __init__(self):
+        self.pages = 0
+        self.bytes = 0
+        self.parsed = 0
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.statuses: Counter = Counter()
+        self.dropped: Counter = Counter()
+        self.latencies: List[float] = []
+        self.error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "pages": self.pages,
+            "bytes": self.bytes,
+            "listings_parsed": self.parsed,
+            "listings_dropped": sum(self.dropped.values()),
+            "dropped_reasons": dict(self.dropped.most_common()),
+            "statuses": dict(sorted(self.statuses.items())),
+            "seconds": {stage: round(seconds, 4) for stage, seconds in self.seconds.items()},
+            **latency_percentiles(self.latencies),
+            "error": self.error,
+        }
+
+
+def latency_percentiles(latencies: Iterable[float]) -> Dict[str, Optional[float]]:
+    latencies = np.fromiter(latencies, dtype=np.float64)
+    if not len(latencies):
+        return {"fetch_p50_seconds": None, "fetch_p95_seconds": None}
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {"fetch_p50_seconds": round(float(p50), 4), "fetch_p95_seconds": round(float(p95), 4)}
+
+
+class ScrapeTelemetry:
+    """
+    Per-city timings and counts for one scrape run
+
+    Crawl threads record each page's fetch (status, bytes, time waiting and
+    on the network) and parse (HTML and field extraction time, listings
+    parsed, listings dropped by exception type); the consumer records time
+    spent buffering and writing chunks, and cities that failed. Fetch
+    latency percentiles are over requests that went to the network, so
+    fresh cache hits don't pull them down.
+
+    Recording is a few counter updates per page, under one lock. Callers
+    pass None instead of a ScrapeTelemetry to skip even that, and then
+    don't time the parse stages either.
+    """
+
+    def __init__(self, run_id: str = ""):
+        self.run_id = run_id
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.cities: Dict[str, CityTelemetry] = {}
+
+    def _city(self, city_code: str) -> CityTelemetry:
+        city = self.cities.get(city_code)
+        if city is None:
+            city = self.cities.setdefault(city_code, CityTelemetry())
+        return city
+
+    def record_page(self, city_code: str, result: FetchResult, stage_seconds: Dict[str, float],
+                    parsed: int, errors: List[str]) -> None:
+        with self._lock:
+            city = self._city(city_code)
+            city.pages += 1
+            status = fetch_status(result)
+            city.statuses[status] += 1
+            if status != "cache":
+                city.latencies.append(result.elapsed)
+            if status == "200":
+                city.bytes += len(result.content)
+            city.seconds["wait"] += result.waited
+            city.seconds["network"] += result.elapsed
+            for stage, seconds in stage_seconds.items():
+                city.seconds[stage] += seconds
+            city.parsed += parsed
+            city.dropped.update(drop_reason(error) for error in errors)
+
+    def record_fetch_failure(self, city_code: str, result: FetchResult) -> None:
+        """A fetch that ended the city's crawl, so it was never parsed"""
+        with self._lock:
+            city = self._city(city_code)
+            city.statuses[fetch_status(result)] += 1
+            city.seconds["wait"] += result.waited
+            city.seconds["network"] += result.elapsed
+
+    def record_stage(self, city_code: str, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._city(city_code).seconds[stage] += seconds
+
+    def record_failure(self, city_code: str, error: str) -> None:
+        with self._lock:
+            self._city(city_code).error = error
+
+    def report(self) -> dict:
+        """The run's totals and per-city figures, as written by save()"""
+        with self._lock:
+            cities = {code: city.as_dict() for code, city in sorted(self.cities.items())}
+            latencies = [latency for city in self.cities.values() for latency in city.latencies]
+            statuses = sum((city.statuses for city in self.cities.values()), Counter())
+            dropped = sum((city.dropped for city in self.cities.values()), Counter())
+
+        totals = {
+            "cities": len(cities),
+            "cities_failed": sum(1 for city in cities.values() if city["error"]),
+            "pages": sum(city["pages"] for city in cities.values()),
+            "bytes": sum(city["bytes"] for city in cities.values()),
+            "listings_parsed": sum(city["listings_parsed"] for city in cities.values()),
+            "listings_dropped": sum(dropped.values()),
+            "dropped_reasons": dict(dropped.most_common()),
+            "statuses": dict(sorted(statuses.items())),
+            "seconds": {stage: round(sum(city["seconds"][stage] for city in cities.values()), 4) for stage in STAGES},
+            **latency_percentiles(latencies),
+        }
+        return {
+            "run_id": self.run_id,
+            "started": self.started.isoformat(timespec="seconds"),
+            "wall_seconds": round(time.perf_counter() - self._start, 4),
+            "totals": totals,
+            "cities": cities,
+        }
+
+    def save(self, directory: str) -> str:
+        """Write the report as telemetry_HHMMSS.json in `directory`, so resumed attempts each keep theirs"""
+        path = os.path.join(directory, f"telemetry_{self.started:%H%M%S}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+    def metadata(self) -> dict:
+        """Run totals flattened for Dagster output metadata; city counts are left to the manifest summary"""
+        report = self.report()
+        totals = report["totals"]
+        metadata = {f"seconds_{stage}": seconds for stage, seconds in totals.pop("seconds").items()}
+        metadata.update({key: value for key, value in totals.items()
+                         if value is not None and key not in ("cities", "cities_failed")})
+        by_time = sorted(report["cities"].items(), key=lambda item: -sum(item[1]["seconds"].values()))
+        metadata["slowest_cities"] = {code: round(sum(city["seconds"].values()), 2) for code, city in by_time[:5]}
+        metadata["wall_seconds"] = report["wall_seconds"]
+        return metadata
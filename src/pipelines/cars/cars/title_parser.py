@@ -0,0 +1,111 @@
+import re
+from functools import lru_cache
+from typing import Iterable, NamedTuple
+
+import pandas as pd
+
+# Listed in match priority order: when a title names several makes, the
+# earliest one in this list wins, wherever it appears in the title
+MAKES = ['Mercedes-Benz', 'Land Rover', 'Chevrolet', 'Chevy', 'Toyota', 'Honda', 'Ford', 'BMW', 'Audi', 'Volkswagen', 'VW',
+         'Nissan', 'Hyundai', 'Kia', 'Subaru', 'Mazda', 'Lexus', 'Infiniti', 'Acura', 'Cadillac',
+         'Buick', 'GMC', 'Jeep', 'Dodge', 'Chrysler', 'Ram', 'Lincoln', 'Volvo', 'Porsche', 'Tesla',
+         'Mitsubishi', 'Suzuki', 'Fiat', 'Mini', 'Jaguar', 'Maserati', 'Ferrari', 'Lamborghini']
+
+_YEAR_RE = re.compile(r'\b(?:19|20)\d{2}\b')
+
+# One precompiled word-boundary pattern per make. On ASCII titles a plain
+# substring test on the lowercased title rules out almost every make before
+# any regex runs; non-ASCII titles skip that shortcut because IGNORECASE also
+# folds a few non-ASCII characters (e.g. U+017F matches "s").
+_MAKE_RES = [(make, make.lower(), re.compile(rf'\b{re.escape(make)}\b', re.IGNORECASE)) for make in MAKES]
+
+_MODEL_RES = {
+    make: re.compile(rf'{re.escape(make)}\s+([A-Za-z0-9-]+(?:\s+[A-Za-z0-9-]+){{0,2}})', re.IGNORECASE)
+    for make in MAKES
+}
+_MODEL_SUFFIX_RE = re.compile(
+    r'\s+(Touring|Low|miles|dvd|Navi|navigation|backup|camera|owner|since|new|original|AMG|4MATIC|Coupe).*',
+    re.IGNORECASE
+)
+
+_MILEAGE_RES = [
+    re.compile(r'(\d{1,3}[kK])\s*(?:miles?|mi)?', re.IGNORECASE),
+    re.compile(r'(\d{1,3},\d{3})\s*(?:original\s+)?(?:miles?|mi)', re.IGNORECASE),
+    re.compile(r'(\d{4,6})\s*(?:original\s+)?(?:miles?|mi)', re.IGNORECASE),
+]
+
+PRICE_RE = re.compile(r'\$[\d,]+')
+_DIGIT_RE = re.compile(r'\d')
+
+
+class ParsedTitle(NamedTuple):
+    year: str
+    make: str
+    model: str
+    mileage: str
+    price: str
+
+
+def parse_year_make(title: str):
+    """Find the first model year and the highest-priority make"""
+    year_match = _YEAR_RE.search(title)
+    year = year_match.group() if year_match else "N/A"
+
+    lowered = title.lower() if title.isascii() else None
+    for make, key, pattern in _MAKE_RES:
+        if (lowered is None or key in lowered) and pattern.search(title):
+            return year, make
+    return year, "N/A"
+
+
+def parse_model(title: str, make: str) -> str:
+    """Take up to three words after the make, minus trim and marketing suffixes"""
+    if make == "N/A":
+        return "N/A"
+    model_match = _MODEL_RES[make].search(title)
+    if not model_match:
+        return "N/A"
+    model = model_match.group(1).strip()
+    return _MODEL_SUFFIX_RE.sub('', model).strip()
+
+
+def parse_mileage(title: str) -> str:
+    if title.isascii():
+        # Every pattern needs either a "k" suffix or a "mi" unit
+        lowered = title.lower()
+        if 'k' not in lowered and 'mi' not in lowered:
+            return "N/A"
+    for pattern in _MILEAGE_RES:
+        match = pattern.search(title)
+        if match:
+            return match.group(1)
+    return "N/A"
+
+
+def parse_price(text: str) -> str:
+    price_match = PRICE_RE.search(text)
+    # "$," and similar have nothing numeric left once cleaned
+    if price_match and _DIGIT_RE.search(price_match.group()):
+        return price_match.group()
+    return "N/A"
+
+
+@lru_cache(maxsize=65536)
+def parse_title(title: str) -> ParsedTitle:
+    """Parse year, make, model, mileage and price out of a listing title"""
+    year, make = parse_year_make(title)
+    return ParsedTitle(year, make, parse_model(title, make), parse_mileage(title), parse_price(title))
+
+
+def parse_titles(titles: Iterable[str]) -> pd.DataFrame:
+    """
+    Parse a list or Series of titles into a DataFrame of ParsedTitle columns
+
+    Each distinct title is parsed once. A Series keeps its index.
+    """
+    titles = titles if isinstance(titles, pd.Series) else pd.Series(list(titles), dtype=object)
+    codes, uniques = pd.factorize(titles.fillna(""), sort=False)
+    parsed = pd.DataFrame([parse_title(title) for title in uniques], columns=ParsedTitle._fields)
+    result = parsed.take(codes)
+    result.index = titles.index
+    return result
@@ -0,0 +1,61 @@
+import os
+import pickle
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+from dagster import ConfigurableIOManager, InputContext, OutputContext
+
+IO_ROOT = "storage/_io"
+
+
+def arrow_backed_strings(arrow_type: pa.DataType):
+    """types_mapper keeping string columns as Arrow arrays; other types convert as usual"""
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype("pyarrow")
+    return None
+
+
+class ArrowIOManager(ConfigurableIOManager):
+    """
+    Hand DataFrames and Arrow tables between ops as memory-mapped Arrow IPC files
+
+    Outputs are written uncompressed in the Arrow IPC file format, so a
+    downstream op maps the file and reads its buffers in place: string
+    columns come back as Arrow-backed string[pyarrow] columns on the mapped
+    buffers, and null-free numeric columns as views of them, instead of
+    rebuilding every value the way unpickling does. Categoricals, dates and
+    timestamps convert to their usual pandas dtypes. Other outputs (paths,
+    dicts, lists) are small and are pickled as before.
+
+    Files live under <base_dir>/<run_id>/<step>/<output>.
+    """
+
+    base_dir: str = IO_ROOT
+
+    def _path(self, context) -> str:
+        return os.path.join(self.base_dir, *context.get_identifier())
+
+    def handle_output(self, context: OutputContext, obj: Any) -> None:
+        path = self._path(context)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if isinstance(obj, (pd.DataFrame, pa.Table)):
+            table = obj if isinstance(obj, pa.Table) else pa.Table.from_pandas(obj)
+            with pa.OSFile(f"{path}.arrow", "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            context.add_output_metadata({"rows": table.num_rows, "bytes": os.path.getsize(f"{path}.arrow")})
+        else:
+            with open(f"{path}.pickle", "wb") as f:
+                pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load_input(self, context: InputContext) -> Any:
+        path = self._path(context.upstream_output)
+        if not os.path.exists(f"{path}.arrow"):
+            with open(f"{path}.pickle", "rb") as f:
+                return pickle.load(f)
+
+        table = pa.ipc.open_file(pa.memory_map(f"{path}.arrow")).read_all()
+        if table.schema.pandas_metadata is None:
+            return table
+        return table.to_pandas(types_mapper=arrow_backed_strings, split_blocks=True)
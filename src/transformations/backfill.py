@@ -0,0 +1,328 @@
+import itertools
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from dagster import Field, Out, job, op
+
+from src.transformations.bronze_layer import BRONZE_ROOT
+from src.transformations.cross_posts import CROSS_POST_INDEX_PATH, CrossPostIndex, Fingerprints
+from src.transformations.dedup_index import DEDUP_INDEX_PATH, LISTING_STATUSES, DedupIndex, link_hashes, listing_dates
+from src.transformations.gold_layer import GOLD_TABLES, merge_into_partitions
+from src.transformations.gold_partials import (
+    GOLD_PARTIALS_ROOT, MAKE_COUNTS_ROOT, PRICE_HISTOGRAM_ROOT, build_make_counts, build_partials, build_price_histogram,
+)
+from src.transformations.lake import commit_batch, partition_files, write_shard
+from src.transformations.silver_layer import SILVER_ROOT, clean_listings
+from src.transformations.timeseries import PRICE_LOG_ROOT, ROLLUP_ROOT, SERIES_KEY, TIMESERIES_ROOT, PriceLog, write_rollups
+
+BACKFILL_ROOT = "storage/_backfill"
+# Per-cell aggregates staged by pass 2 for the merge pass
+AGGREGATES = ("city_partials", "price_histogram", "make_counts", "series_rollups")
+# Everything a backfill rebuilds from Bronze, swapped in together at the end
+REBUILT_PATHS = [SILVER_ROOT, DEDUP_INDEX_PATH, CROSS_POST_INDEX_PATH, GOLD_PARTIALS_ROOT, PRICE_HISTOGRAM_ROOT, MAKE_COUNTS_ROOT, TIMESERIES_ROOT]
+
+
+def bronze_dates() -> List[str]:
+    partitions = {os.path.dirname(path) for path in partition_files(BRONZE_ROOT)}
+    return sorted(os.path.basename(p)[len("date="):] for p in partitions)
+
+
+def city_counts() -> pd.Series:
+    """Bronze rows per city, read from the city column alone"""
+    counts = pd.Series(dtype=np.int64)
+    for path in partition_files(BRONZE_ROOT):
+        cities = pq.read_table(path, columns=['city']).column('city').to_pandas()
+        counts = counts.add(cities.value_counts(), fill_value=0)
+    return counts.astype(np.int64)
+
+
+def assign_city_shards(counts: pd.Series, shards: int) -> List[List[str]]:
+    """
+    Split cities into `shards` groups of similar row counts
+
+    Largest city first onto the lightest shard; ties break by name, so the
+    same lake always gives the same shards.
+    """
+    groups: List[List[str]] = [[] for _ in range(shards)]
+    loads = [0] * shards
+    for city, rows in sorted(counts.items(), key=lambda item: (-item[1], item[0])):
+        shard = min(range(shards), key=lambda i: (loads[i], i))
+        groups[shard].append(city)
+        loads[shard] += rows
+    return groups
+
+
+def staged(run_dir: str, path: str) -> str:
+    """Where a backfill run builds its replacement for a lake path"""
+    return os.path.join(run_dir, path)
+
+
+def read_bronze_shard(date_str: str, cities: Sequence[str], with_nulls: bool) -> pd.DataFrame:
+    """One date partition's Bronze rows for a set of cities; city-sorted compacted files skip row groups"""
+    expression = pc.field('city').isin(list(cities))
+    if with_nulls:
+        expression = expression | pc.field('city').is_null()
+    frames = [pq.read_table(path, filters=expression).to_pandas()
+              for path in partition_files(BRONZE_ROOT, date_str, date_str)]
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def clean_task(task: Tuple[str, int, List[str], str]):
+    """
+    Worker: clean one (date, city shard) of Bronze into a staged file
+
+    Returns the link hashes, days and prices of the kept rows, in file
+    order, for the listing history pass, and their cross-post fingerprints.
+    """
+    date_str, shard, cities, run_dir = task
+    df = read_bronze_shard(date_str, cities, with_nulls=shard == 0)
+    if df.empty:
+        return (date_str, shard, np.empty(0, np.uint64), np.empty(0, 'datetime64[D]'), np.empty(0, np.int32),
+                Fingerprints.empty())
+
+    df = clean_listings(df)
+    write_shard(df, os.path.join(run_dir, "clean"), date_str, f"shard-{shard:03d}.parquet")
+    return (date_str, shard, link_hashes(df['link']), listing_dates(df), df['price_numeric'].to_numpy(dtype=np.int32),
+            Fingerprints.of(df))
+
+
+def tag_history(hashes: np.ndarray, days: np.ndarray, prices: np.ndarray):
+    """
+    listing_status, first_seen and previous last_seen of every row at once
+
+    Rows are ordered by link then day (input order breaking ties), which is
+    the order the daily pipeline would have met them in; each row is then
+    compared with the previous sighting of its link. Gives the same tags as
+    running the dedup index batch by batch, without a serial pass over dates.
+    """
+    order = np.lexsort((np.arange(len(hashes)), days, hashes))
+    h, d, p = hashes[order], days[order], prices[order]
+
+    repeat = np.zeros(len(h), dtype=bool)
+    repeat[1:] = h[1:] == h[:-1]
+    previous = np.flatnonzero(repeat) - 1
+
+    status = np.zeros(len(h), dtype=np.int8)
+    status[repeat] = np.where(p[repeat] == p[previous], 1, 2)
+    group = np.cumsum(~repeat) - 1
+    first_seen = d[~repeat][group]
+    last_seen = np.full(len(h), np.datetime64('NaT'), dtype='datetime64[D]')
+    last_seen[repeat] = d[previous]
+
+    tags = [np.empty_like(a) for a in (status, first_seen, last_seen)]
+    for tag, column in zip(tags, (status, first_seen, last_seen)):
+        tag[order] = column
+
+    # Last row of each link: what the dedup index holds after the final day
+    last = np.ones(len(h), dtype=bool)
+    last[:-1] = ~repeat[1:]
+    index = (h[last], first_seen[last], d[last], p[last])
+    return tags, index
+
+
+def cross_post_history(cleaned: list, path: str) -> Tuple[np.ndarray, CrossPostIndex]:
+    """
+    cross_post of every row, and the cross-post index after the final day
+
+    Cross-posts span city shards, so this pass is serial: the cells'
+    fingerprints are matched and added one date at a time, in (date, shard)
+    order, as the daily pipeline would have met them.
+    """
+    index = CrossPostIndex.load(path)
+    flags = []
+    for _, cells in itertools.groupby(cleaned, key=lambda cell: cell[0]):
+        batch = Fingerprints.concat([cell[5] for cell in cells])
+        cluster = index.match(batch)
+        index.add(batch, cluster)
+        index.prune()
+        flags.append(cluster != batch.link_hash)
+    return np.concatenate(flags), index
+
+
+def aggregate_task(task: Tuple[str, int, np.ndarray, np.ndarray, np.ndarray, str]) -> None:
+    """
+    Worker: tag one staged (date, city shard), write its Silver shard and aggregate it
+
+    The Gold and series aggregates are staged as parquet too; pickling their
+    sketch arrays back to the parent would cost more than building them.
+    """
+    date_str, shard, status, first_seen, last_seen, cross_post, run_dir = task
+    path = os.path.join(run_dir, "clean", f"date={date_str}", f"shard-{shard:03d}.parquet")
+    df = pd.read_parquet(path).assign(
+        listing_status=pd.Categorical.from_codes(status, LISTING_STATUSES),
+        first_seen=first_seen,
+        last_seen=last_seen,
+        cross_post=cross_post,
+    )
+
+    changed = df[df['listing_status'] != 'seen']
+    if not changed.empty:
+        write_shard(changed, staged(run_dir, SILVER_ROOT), date_str, f"backfill-{shard:03d}.parquet")
+
+    aggregates = (build_partials(df), build_price_histogram(df), build_make_counts(df), build_partials(df, SERIES_KEY))
+    for name, aggregate in zip(AGGREGATES, aggregates):
+        if not aggregate.empty:
+            write_shard(aggregate, os.path.join(run_dir, "aggregates", name), date_str, f"shard-{shard:03d}.parquet")
+    os.remove(path)
+
+
+def read_aggregates(run_dir: str, name: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Staged aggregates of the cells within a date range, in (date, shard) order"""
+    files = partition_files(os.path.join(run_dir, "aggregates", name), start_date, end_date)
+    frames = [pd.read_parquet(f) for f in files]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def gold_task(task: Tuple[str, str]) -> None:
+    """Worker: merge one date's cells into its Gold partitions"""
+    run_dir, date_str = task
+    for name, (root, combine) in GOLD_TABLES.items():
+        aggregate = read_aggregates(run_dir, name, date_str, date_str)
+        if not aggregate.empty:
+            merge_into_partitions(aggregate, staged(run_dir, root), combine)
+
+
+def rollup_task(task: Tuple[str, str]) -> None:
+    """Worker: merge one month's cells into its series rollup file"""
+    run_dir, month = task
+    rollups = read_aggregates(run_dir, "series_rollups", f"{month}-01", f"{month}-31")
+    if not rollups.empty:
+        write_rollups(rollups, staged(run_dir, ROLLUP_ROOT))
+
+
+def swap_in(staged_path: str, target: str) -> None:
+    """
+    Replace a lake file or directory with its staged rebuild
+
+    The old version is moved aside before the new one is moved in, and only
+    deleted afterwards; a target with nothing staged is removed.
+    """
+    backup = f"{target}.pre-backfill"
+    if os.path.exists(target):
+        os.replace(target, backup)
+    if os.path.exists(staged_path):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(staged_path, target)
+    if os.path.isdir(backup):
+        shutil.rmtree(backup)
+    elif os.path.exists(backup):
+        os.remove(backup)
+
+
+def backfill(workers: Optional[int] = None, city_shards: Optional[int] = None) -> Dict[str, float]:
+    """
+    Rebuild Silver, Gold and the time series from every Bronze partition in parallel
+
+    Work is split into a (date, city shard) grid and run on a process pool
+    in three passes, each worker reading and writing only its own part:
+
+    1. clean each cell's Bronze rows into a staged file;
+    2. tag each cell against the listing history (worked out for all rows
+       at once from the hashes pass 1 returned) and its cross-posts (matched
+       date by date from the fingerprints it returned), write its Silver
+       shard and build its Gold and series aggregates;
+    3. merge the aggregates per date (Gold) and per month (series rollups).
+
+    Listing links are on their city's subdomain, so every sighting of a
+    listing falls in the same city shard and dedup within a cell matches
+    dedup over the whole day. Cells are merged in (date, shard) order, so
+    the result does not depend on the number of workers or which finished
+    first. Everything is built under a run directory and swapped into place
+    at the end. Do not run it alongside the daily pipeline.
+    """
+    workers = workers or os.cpu_count() or 1
+    city_shards = city_shards or workers
+    dates = bronze_dates()
+    # The same keys whether or not there is anything to backfill
+    stats = {"dates": len(dates), "workers": workers, "city_shards": city_shards, "cells": 0, "rows": 0,
+             "seconds": 0.0, "rows_per_second": 0.0, "clean_seconds": 0.0, "aggregate_seconds": 0.0,
+             "merge_seconds": 0.0}
+    if not dates:
+        return stats
+
+    run_dir = os.path.join(BACKFILL_ROOT, f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}")
+    shards = assign_city_shards(city_counts(), city_shards)
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        tasks = [(date_str, shard, cities, run_dir) for date_str in dates for shard, cities in enumerate(shards)]
+        cleaned = [cell for cell in pool.map(clean_task, tasks) if len(cell[2])]
+        stats["clean_seconds"] = time.perf_counter() - start
+        if not cleaned:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            if os.path.isdir(BACKFILL_ROOT) and not os.listdir(BACKFILL_ROOT):
+                os.rmdir(BACKFILL_ROOT)
+            stats.update({"cells": len(tasks), "seconds": time.perf_counter() - start})
+            return stats
+
+        hashes, days, prices = (np.concatenate([cell[i] for cell in cleaned]) for i in (2, 3, 4))
+        tags, index = tag_history(hashes, days, prices)
+        cross_post, cross_posts = cross_post_history(cleaned, staged(run_dir, CROSS_POST_INDEX_PATH))
+        bounds = np.cumsum([0] + [len(cell[2]) for cell in cleaned])
+        tasks = [(date_str, shard) + tuple(tag[lo:hi] for tag in tags) + (cross_post[lo:hi], run_dir)
+                 for (date_str, shard, *_), lo, hi in zip(cleaned, bounds[:-1], bounds[1:])]
+        list(pool.map(aggregate_task, tasks))
+        stats["aggregate_seconds"] = time.perf_counter() - start - stats["clean_seconds"]
+
+        list(pool.map(gold_task, [(run_dir, date_str) for date_str in dates]))
+        months = sorted({date_str[:7] for date_str in dates})
+        list(pool.map(rollup_task, [(run_dir, month) for month in months]))
+        stats["merge_seconds"] = time.perf_counter() - start - stats["clean_seconds"] - stats["aggregate_seconds"]
+
+    changed = tags[0] != LISTING_STATUSES.index('seen')
+    PriceLog.load(staged(run_dir, PRICE_LOG_ROOT)).append(hashes[changed], days[changed], prices[changed])
+    DedupIndex(staged(run_dir, DEDUP_INDEX_PATH), *index).save()
+    cross_posts.save()
+
+    # The rebuild covers any batch a failed run left open, which must not be rolled back over it
+    commit_batch()
+    for path in REBUILT_PATHS:
+        swap_in(staged(run_dir, path), path)
+    shutil.rmtree(run_dir)
+    if not os.listdir(BACKFILL_ROOT):
+        os.rmdir(BACKFILL_ROOT)
+
+    stats.update({
+        "cells": len(dates) * city_shards,
+        "rows": len(hashes),
+        "seconds": time.perf_counter() - start,
+    })
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"]
+    return stats
+
+
+@op(
+    out=Out(dict),
+    config_schema={
+        "workers": Field(int, default_value=0, description="Worker processes; 0 uses every core"),
+        "city_shards": Field(int, default_value=0, description="City shards per date; 0 uses one per worker"),
+    }
+)
+def backfill_lake(context) -> dict:
+    """Reprocess all of Bronze into Silver, Gold and the time series across a process pool"""
+    config = context.op_config
+    stats = backfill(config["workers"] or None, config["city_shards"] or None)
+    if stats["rows"]:
+        print(f"Backfill: {stats['rows']:,} rows over {stats['dates']} dates x {stats['city_shards']} city shards "
+              f"on {stats['workers']} workers in {stats['seconds']:.1f}s ({stats['rows_per_second']:,.0f} rows/s)")
+    elif stats["dates"]:
+        print(f"Backfill: no valid rows in {stats['dates']} Bronze dates, lake left as it was")
+    else:
+        print("Backfill: no Bronze partitions")
+    context.add_output_metadata(stats)
+    return stats
+
+
+@job
+def lake_backfill():
+    """Rebuild Silver, Gold and the time series from Bronze, fanned out over dates and city shards"""
+    backfill_lake()
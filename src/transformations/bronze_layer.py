@@ -1,37 +1,243 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import csv
 import os
-from dagster import op, Out
+from dagster import op, Out, Field
 import glob
 from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-@op(out=Out(pd.DataFrame))
-def bronze_layer_ingestion() -> pd.DataFrame:
-    """Convert latest CSV to Parquet in Bronze layer and return DataFrame"""
-    
-    latest_csv = max(glob.glob("car_listings_*.csv"), key=os.path.getctime)
-    df = pd.read_csv(latest_csv)
-    
-    # Handle both old (capitalized) and new (lowercase) column formats
-    date_col = 'scrape_date' if 'scrape_date' in df.columns else 'Scrape_Date'
-    
-    df['ingestion_timestamp'] = datetime.now()
-    df['data_date'] = pd.to_datetime(df[date_col]).dt.date
-    
-    # Standardize column names to lowercase
+from src.transformations.lake import ShardWriter, partition_files, read_json, rewrite_without, write_json, write_shard
+
+BRONZE_ROOT = "storage/bronze/car_listings"
+INGESTION_LOG = "storage/bronze/_ingestion_log.json"
+
+# Explicit raw CSV schema; "N/A" and blanks load as nulls
+BRONZE_SCHEMA = {
+    "year": pa.float64(),
+    "make": pa.string(),
+    "model": pa.string(),
+    "title": pa.string(),
+    "price": pa.string(),
+    "mileage": pa.string(),
+    "dealer_type": pa.string(),
+    "location": pa.string(),
+    "link": pa.string(),
+    "city": pa.string(),
+    "scrape_date": pa.string(),
+}
+
+
+# Lineage columns every Bronze shard carries after the listing columns
+LINEAGE_SCHEMA = {
+    "ingestion_timestamp": pa.timestamp("ns"),
+    "data_date": pa.date32(),
+    "source_file": pa.string(),
+}
+# Bump whenever BRONZE_SCHEMA or LINEAGE_SCHEMA changes; recorded in the metadata of shards written from Arrow
+BRONZE_SCHEMA_VERSION = "1"
+BRONZE_TABLE_SCHEMA = pa.schema(list(BRONZE_SCHEMA.items()) + list(LINEAGE_SCHEMA.items()),
+                                metadata={"bronze_schema_version": BRONZE_SCHEMA_VERSION})
+
+def raw_convert_options(path: str) -> pv.ConvertOptions:
+    """CSV conversion options applying the Bronze schema to a raw file's header"""
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+
+    # Older files use capitalized headers (e.g. Scrape_Date)
+    column_types = {name: BRONZE_SCHEMA[name.lower()] for name in header if name.lower() in BRONZE_SCHEMA}
+    return pv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+
+
+def read_raw_csv(path: str) -> pd.DataFrame:
+    """Read a scraper CSV with the pyarrow engine and the explicit Bronze schema"""
+    table = pv.read_csv(
+        path,
+        # Titles are quoted and may span lines, which a block boundary must not split
+        parse_options=pv.ParseOptions(newlines_in_values=True),
+        convert_options=raw_convert_options(path),
+    )
+
+    df = table.to_pandas()
     df.columns = df.columns.str.lower()
-    
-    # Save to Bronze storage
-    date_str = df['data_date'].iloc[0].strftime('%Y-%m-%d')
-    output_path = f"storage/bronze/car_listings/date={date_str}/data.parquet"
-    
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    df.to_parquet(output_path, index=False)
-    
-    return df  # Return the DataFrame directly
-
-@op(out=Out(pd.DataFrame))
-def load_bronze_data() -> pd.DataFrame:
-    """Load all Bronze data"""
-    parquet_files = glob.glob("storage/bronze/car_listings/**/*.parquet", recursive=True)
+    return df
+
+
+def changed_raw_files(log: dict) -> Iterator[Tuple[str, os.stat_result, Optional[dict]]]:
+    """Raw CSVs that are new or have changed since the ingestion log saw them, oldest first, with their log entry"""
+    for path in sorted(glob.glob("car_listings_*.csv"), key=os.path.getmtime):
+        stat = os.stat(path)
+        seen = log["files"].get(path)
+        if seen and seen["size"] == stat.st_size and seen["mtime"] == stat.st_mtime:
+            continue
+        yield path, stat, seen
+
+
+def shard_name_for(path: str) -> str:
+    return f"part-{os.path.splitext(os.path.basename(path))[0]}.parquet"
+
+
+def drop_previous_shards(path: str, seen: Optional[dict], written: List[str]) -> None:
+    """
+    Remove an earlier version's rows of a changed raw file from Bronze, once the new version's shards are written
+
+    Only shards the new version just rewrote are left alone; any other,
+    including a date the file no longer has rows for, loses the file's rows.
+    """
+    if not seen:
+        return
+    rewritten = set(written)
+    # Rows from the earlier version may since have been compacted into shared files
+    for old_shard in seen["shards"]:
+        if old_shard not in rewritten and os.path.exists(old_shard):
+            rewrite_without(old_shard, 'source_file', path)
+
+
+def add_lineage(df: pd.DataFrame, path: str) -> pd.DataFrame:
+    df['ingestion_timestamp'] = datetime.now()
+    df['data_date'] = pd.to_datetime(df['scrape_date']).dt.date
+    df['source_file'] = path
+    return df
+
+
+def record_ingestion(log: dict, path: str, stat: Optional[os.stat_result], rows: int, shards: List[str]) -> None:
+    """
+    Log a source as ingested and queue its shards for Silver
+
+    The source is not read again unless it changes, but its shards stay in
+    the pending queue until a Silver run that took them has committed (see
+    release_shards), so a failed run leaves them for the next one.
+    """
+    pending = log.setdefault("pending", [])
+    pending.extend(shard for shard in shards if shard not in pending)
+    log["files"][path] = {
+        "size": stat.st_size if stat else None,
+        "mtime": stat.st_mtime if stat else None,
+        "rows": rows,
+        "shards": shards,
+        "ingested_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    write_json(INGESTION_LOG, log)
+
+
+def bronze_table(table: pa.Table, source: str) -> pa.Table:
+    """Scraped listings with the lineage columns added, cast to BRONZE_TABLE_SCHEMA"""
+    data_date = pc.strptime(pc.utf8_slice_codeunits(table.column("scrape_date"), 0, 10),
+                            format="%Y-%m-%d", unit="s").cast(pa.date32())
+    table = table.select(list(BRONZE_SCHEMA)).cast(pa.schema(list(BRONZE_SCHEMA.items())))
+    table = table.append_column("ingestion_timestamp", pa.repeat(pa.scalar(datetime.now(), pa.timestamp("ns")), len(table)))
+    table = table.append_column("data_date", data_date)
+    table = table.append_column("source_file", pa.repeat(pa.scalar(source, pa.string()), len(table)))
+    return table.cast(BRONZE_TABLE_SCHEMA)
+
+
+def publish_listings(tables: Iterable[pa.Table], source: str, csv_path: Optional[str] = None) -> List[str]:
+    """
+    Write scraped listings straight into Bronze and queue them for the next ingestion
+
+    `tables` hold the LISTING_COLUMNS and are taken one at a time, so only
+    one is in memory however large the run. Each gets the lineage columns,
+    is cast to BRONZE_TABLE_SCHEMA and is appended to its dates' shards,
+    named after `source` like a raw file's shards, so publishing the same
+    source again replaces them. The shards are queued in the ingestion log
+    for the next ingestion to pass on. With `csv_path`, the listings are
+    also exported there as CSV, which is logged as already ingested so it
+    is not read in again.
+    """
+    log = read_json(INGESTION_LOG, {"files": {}})
+    writers: Dict[str, ShardWriter] = {}
+    listing_schema = pa.schema(list(BRONZE_SCHEMA.items()))
+    csv_writer = pv.CSVWriter(f"{csv_path}.tmp", listing_schema) if csv_path else None
+    rows = 0
+    for table in tables:
+        if csv_writer:
+            csv_writer.write_table(table.select(list(BRONZE_SCHEMA)).cast(listing_schema))
+        table = bronze_table(table, source)
+        data_date = table.column("data_date")
+        for day in pc.unique(data_date).to_pylist():
+            if str(day) not in writers:
+                writers[str(day)] = ShardWriter(BRONZE_ROOT, str(day), shard_name_for(source))
+            writers[str(day)].write(table.filter(pc.equal(data_date, day)))
+        rows += len(table)
+    shards = [writers[day].close() for day in sorted(writers)]
+    drop_previous_shards(source, log["files"].get(source), shards)
+
+    record_ingestion(log, source, None, rows, shards)
+    if csv_writer:
+        csv_writer.close()
+        os.replace(f"{csv_path}.tmp", csv_path)
+        record_ingestion(log, csv_path, os.stat(csv_path), rows, shards)
+    return shards
+
+
+def queued_shards(log: dict) -> List[str]:
+    """Bronze shards no Silver run has committed yet: newly ingested, published, or left by a failed run"""
+    return [shard for shard in log.get("pending", []) if os.path.exists(shard)]
+
+
+def release_shards(shards: List[str]) -> None:
+    """Take shards off the pending queue once the Silver run they were handed to has committed"""
+    log = read_json(INGESTION_LOG, None)
+    if not log or not shards:
+        return
+    released = set(shards)
+    log["pending"] = [shard for shard in log.get("pending", []) if shard not in released and os.path.exists(shard)]
+    write_json(INGESTION_LOG, log)
+
+
+@op(out={"bronze_df": Out(pd.DataFrame), "bronze_shards": Out(list)})
+def bronze_layer_ingestion():
+    """
+    Ingest new raw CSVs into the Bronze layer and return the rows Silver has yet to take
+
+    The ingestion log records each processed file with its size and mtime, so
+    a run only reads files that are new or have changed since. Each file is
+    appended to its date partitions as its own shard, named after the file,
+    so re-ingesting a changed file replaces its shard instead of duplicating it.
+    Shards the scraper published straight into Bronze are already in place
+    and are only read back, as are shards a failed Silver run left on the
+    pending queue. The shards handed on are returned as bronze_shards, for
+    save_silver_data to release once Silver has committed them.
+    """
+    log = read_json(INGESTION_LOG, {"files": {}})
+    new_frames, shards = [], []
+
+    for path, stat, seen in changed_raw_files(log):
+        df = add_lineage(read_raw_csv(path), path)
+        written = [write_shard(part, BRONZE_ROOT, str(data_date), shard_name_for(path))
+                   for data_date, part in df.groupby('data_date', sort=True)]
+        drop_previous_shards(path, seen, written)
+
+        record_ingestion(log, path, stat, len(df), written)
+        new_frames.append(df)
+        shards.extend(written)
+        print(f"Bronze: ingested {len(df)} rows from {path}")
+
+    for shard in queued_shards(log):
+        if shard in shards:
+            continue
+        df = pd.read_parquet(shard)
+        new_frames.append(df)
+        shards.append(shard)
+        print(f"Bronze: {len(df)} queued rows (published by the scraper or left by a failed run) in {shard}")
+
+    if not new_frames:
+        print("Bronze: no new raw files or queued shards")
+        return pd.DataFrame(columns=list(BRONZE_SCHEMA) + ['ingestion_timestamp', 'data_date', 'source_file']), []
+    return pd.concat(new_frames, ignore_index=True), shards
+
+@op(
+    out=Out(pd.DataFrame),
+    config_schema={
+        "start_date": Field(str, is_required=False, description="First partition to load (YYYY-MM-DD)"),
+        "end_date": Field(str, is_required=False, description="Last partition to load (YYYY-MM-DD)"),
+    }
+)
+def load_bronze_data(context) -> pd.DataFrame:
+    """Load Bronze data, optionally only the partitions within a date range"""
+    config = context.op_config
+    parquet_files = partition_files(BRONZE_ROOT, config.get("start_date"), config.get("end_date"))
     dfs = [pd.read_parquet(f) for f in parquet_files]
     return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
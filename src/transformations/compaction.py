@@ -0,0 +1,170 @@
+import glob
+import os
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Dict, List, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dagster import Field, Out, job, op
+
+from src.transformations.bronze_layer import BRONZE_ROOT, INGESTION_LOG
+from src.transformations.lake import COMPACTION_JOURNAL, partition_files, read_json, superseded_files, write_json
+from src.transformations.silver_layer import SILVER_ROOT
+
+# Gold tables are rewritten whole per date by their writers, so only the append-only layers need compaction
+COMPACTED_TABLES = {
+    "bronze": {"root": BRONZE_ROOT, "sort_by": ["city", "make"]},
+    "silver": {"root": SILVER_ROOT, "sort_by": ["city", "make"]},
+}
+COMPACTED_PREFIX = "compacted-"
+
+
+def finish_interrupted(partition: str) -> None:
+    """Roll an interrupted compaction forward if its output landed, otherwise back"""
+    journal_path = os.path.join(partition, COMPACTION_JOURNAL)
+    if not os.path.exists(journal_path):
+        return
+    for path in superseded_files(partition):
+        if os.path.exists(path):
+            os.remove(path)
+    os.remove(journal_path)
+
+
+def needs_compaction(files: Sequence[str], min_files: int) -> bool:
+    if len(files) >= min_files:
+        return True
+    return any(not os.path.basename(f).startswith(COMPACTED_PREFIX) for f in files)
+
+
+def compact_partition(partition: str, sort_by: Sequence[str], row_group_size: int,
+                      compression: str) -> Dict[str, int]:
+    """
+    Merge a partition's files into one sorted, zstd-compressed, dictionary-encoded file
+
+    Rows are sorted by `sort_by` so row-group min/max statistics can skip
+    whole groups on city/make filters. The output is written to a temp file
+    and renamed into place; a journal listing the inputs is written first,
+    so an interrupted swap is finished (or undone) by the next run, and
+    partition_files hides the inputs as soon as the output exists.
+    """
+    files = sorted(glob.glob(os.path.join(partition, "*.parquet")))
+    bytes_before = sum(os.path.getsize(f) for f in files)
+
+    # Shards written by different code versions can disagree on types; pandas reconciles them
+    df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+    df = df.sort_values([c for c in sort_by if c in df], kind="stable", ignore_index=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    output_name = f"{COMPACTED_PREFIX}{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+    output_path = os.path.join(partition, output_name)
+    tmp_path = f"{output_path}.tmp"
+    pq.write_table(table, tmp_path, row_group_size=row_group_size, compression=compression,
+                   use_dictionary=True, write_statistics=True)
+
+    write_json(os.path.join(partition, COMPACTION_JOURNAL),
+               {"output": output_name, "inputs": [os.path.basename(f) for f in files]})
+    os.replace(tmp_path, output_path)
+    finish_interrupted(partition)
+
+    return {
+        "files_before": len(files),
+        "files_after": 1,
+        "bytes_before": bytes_before,
+        "bytes_after": os.path.getsize(output_path),
+        "rows": len(df),
+        "replaced": {f: output_path for f in files},
+    }
+
+
+def update_ingestion_log(replaced: Dict[str, str]) -> None:
+    """Point Bronze ingestion log entries at the compacted files that now hold their rows"""
+    log = read_json(INGESTION_LOG, None)
+    if not log:
+        return
+    for entry in log["files"].values():
+        entry["shards"] = sorted({replaced.get(shard, shard) for shard in entry["shards"]})
+    write_json(INGESTION_LOG, log)
+
+
+def scan_seconds(files: List[str]) -> float:
+    """Time to read every file of a table in full"""
+    start = time.perf_counter()
+    for path in files:
+        pq.read_table(path)
+    return time.perf_counter() - start
+
+
+def compact_table(root: str, sort_by: Sequence[str], min_files: int = 2, min_age_days: int = 1,
+                  row_group_size: int = 128 * 1024, compression: str = "zstd") -> Dict[str, float]:
+    """Compact every partition of a table that has small or unoptimized files and is old enough"""
+    cutoff = str(date.today() - timedelta(days=min_age_days))
+    files_before = partition_files(root)
+    stats = {
+        "partitions_compacted": 0,
+        "files_before": len(files_before),
+        "bytes_before": sum(os.path.getsize(f) for f in files_before),
+        "scan_seconds_before": scan_seconds(files_before),
+    }
+
+    # Shards still on the pending queue are read back on their own by the next ingestion
+    pending = set(read_json(INGESTION_LOG, {}).get("pending", [])) if root == BRONZE_ROOT else set()
+    replaced = {}
+    for partition in sorted(glob.glob(os.path.join(root, "date=*"))):
+        finish_interrupted(partition)
+        if os.path.basename(partition)[len("date="):] > cutoff:
+            continue
+        files = glob.glob(os.path.join(partition, "*.parquet"))
+        if not files or not needs_compaction(files, min_files) or pending.intersection(files):
+            continue
+        result = compact_partition(partition, sort_by, row_group_size, compression)
+        replaced.update(result["replaced"])
+        stats["partitions_compacted"] += 1
+
+    files_after = partition_files(root)
+    stats.update({
+        "files_after": len(files_after),
+        "bytes_after": sum(os.path.getsize(f) for f in files_after),
+        "scan_seconds_after": scan_seconds(files_after),
+    })
+    if root == BRONZE_ROOT and replaced:
+        update_ingestion_log(replaced)
+    return stats
+
+
+@op(
+    out=Out(dict),
+    config_schema={
+        "tables": Field([str], default_value=list(COMPACTED_TABLES), description="Lake tables to compact"),
+        "min_files": Field(int, default_value=2, description="Compact partitions with at least this many files"),
+        "min_age_days": Field(int, default_value=1, description="Leave partitions newer than this many days alone"),
+        "row_group_size": Field(int, default_value=128 * 1024, description="Rows per parquet row group"),
+        "compression": Field(str, default_value="zstd", description="Parquet compression codec"),
+    }
+)
+def compact_lake(context) -> dict:
+    """Merge small files per partition and report file count, size and scan time before and after"""
+    config = context.op_config
+    report = {}
+    for name in config["tables"]:
+        table = COMPACTED_TABLES[name]
+        stats = compact_table(table["root"], table["sort_by"], config["min_files"], config["min_age_days"],
+                              config["row_group_size"], config["compression"])
+        report[name] = stats
+        print(f"{name}: {stats['partitions_compacted']} partitions compacted, "
+              f"{stats['files_before']} -> {stats['files_after']} files, "
+              f"{stats['bytes_before'] / 1024 ** 2:.1f} -> {stats['bytes_after'] / 1024 ** 2:.1f} MB, "
+              f"full scan {stats['scan_seconds_before']:.2f}s -> {stats['scan_seconds_after']:.2f}s")
+
+    context.add_output_metadata({
+        f"{name}_{key}": value for name, stats in report.items() for key, value in stats.items()
+    })
+    return report
+
+
+@job
+def lake_compaction():
+    """Compact Bronze and Silver partitions into sorted, zstd-compressed files"""
+    compact_lake()
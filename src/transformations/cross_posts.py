@@ -0,0 +1,491 @@
+import os
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.transformations.dedup_index import link_hashes, listing_dates
+
+CROSS_POST_INDEX_PATH = "storage/silver/_cross_post_index.parquet"
+NUM_HASHES = 32
+BANDS = 8
+ROWS_PER_BAND = NUM_HASHES // BANDS
+# About where a pair becomes a candidate at even odds, (1 / BANDS) ** (1 / ROWS_PER_BAND)
+MIN_SIMILARITY = 0.6
+PRICE_TOLERANCE = 0.05
+MILEAGE_TOLERANCE = 0.01
+# Each year, price and mileage token is shingled this many times, so a title's
+# two dozen trigrams do not drown out whether the car is the same
+FIELD_WEIGHT = 4
+# A band bucket this full is a stock title at a stock price, not one car: it is skipped, not paired out
+MAX_BUCKET = 50
+# Listings not seen for this long are dropped from the index; cross-posts go up within days of each other
+RETENTION_DAYS = 30
+CHUNK_ROWS = 1_000_000
+
+# Multiply-add-shift hash functions, fixed so signatures from different runs compare
+_rng = np.random.default_rng(20240101)
+_HASH_A = _rng.integers(0, 2 ** 64, NUM_HASHES, dtype=np.uint64, endpoint=False) | np.uint64(1)
+_HASH_B = _rng.integers(0, 2 ** 64, NUM_HASHES, dtype=np.uint64, endpoint=False)
+_BAND_MIX = np.uint64(0x9E3779B97F4A7C15)
+_EMPTY = np.iinfo(np.uint32).max
+# Field tokens: field in bits 28+, copy in bits 24-27, value below; title trigrams take 24 bits
+_YEAR, _PRICE, _PRICE_SHIFTED, _MILEAGE, _MILEAGE_SHIFTED = (np.uint64(field << 28) for field in range(1, 6))
+_COPIES = np.arange(FIELD_WEIGHT, dtype=np.uint64) << np.uint64(24)
+
+
+def ranges(starts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Concatenated start..start+size-1 for each pair, without a Python loop"""
+    within = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    return np.repeat(starts, sizes) + within
+
+
+def title_trigrams(titles: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Character trigrams of each title, as 24-bit codes, and how many each title has
+
+    Titles are lowercased with every run of other characters than a-z and
+    0-9 turned into one space, so "CIVIC EX-L" and "Civic ex l" agree. The
+    trigrams are read straight off the Arrow string buffer.
+    """
+    strings = pa.array(titles, type=pa.string(), from_pandas=True)
+    strings = pc.utf8_lower(strings)
+    strings = pc.utf8_trim_whitespace(pc.replace_substring_regex(strings, r"[^a-z0-9]+", " "))
+    strings = pc.fill_null(strings, "")
+
+    offsets = np.frombuffer(strings.buffers()[1], np.int32)[strings.offset:strings.offset + len(strings) + 1]
+    data = strings.buffers()[2]
+    data = np.frombuffer(data, np.uint8).astype(np.uint32) if data is not None else np.empty(0, np.uint32)
+    counts = np.maximum(np.diff(offsets) - 2, 0)
+    starts = ranges(offsets[:-1], counts)
+    codes = (data[starts] << 16) | (data[starts + 1] << 8) | data[starts + 2]
+    return codes.astype(np.uint64), counts
+
+
+def min_hashes(codes: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """MinHash signature (n, NUM_HASHES) of n shingle sets given back to back; an empty set is all _EMPTY"""
+    signature = np.full((len(counts), NUM_HASHES), _EMPTY, dtype=np.uint32)
+    filled = counts > 0
+    if not filled.any():
+        return signature
+    starts = (np.cumsum(counts) - counts)[filled]
+    for k in range(NUM_HASHES):
+        hashed = ((_HASH_A[k] * codes + _HASH_B[k]) >> np.uint64(32)).astype(np.uint32)
+        signature[filled, k] = np.minimum.reduceat(hashed, starts)
+    return signature
+
+
+def log_buckets(values: np.ndarray, tolerance: float) -> np.ndarray:
+    """Half-width buckets of log(value), so values within `tolerance` of each other are at most two apart"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        buckets = np.floor(np.log1p(values.astype(np.float64)) / np.log1p(tolerance) * 2)
+    return np.nan_to_num(buckets).astype(np.int64)
+
+
+def field_shingles(year: np.ndarray, price: np.ndarray, mileage: np.ndarray) -> np.ndarray:
+    """
+    Year, price and mileage tokens of each row, (n, 5) codes
+
+    Each token stands for FIELD_WEIGHT shingles (see _COPIES). Price and
+    mileage each give a bucket as wide as their tolerance on two grids half
+    a bucket apart, so values within half the tolerance share at least one
+    token. Unknown mileage repeats the year token, which leaves the set
+    unchanged.
+    """
+    mask = np.int64(0x00FFFFFF)
+
+    def tokens(field: np.uint64, values: np.ndarray) -> np.ndarray:
+        return field | (values & mask).astype(np.uint64)
+
+    half_price = log_buckets(price, PRICE_TOLERANCE)
+    half_mileage = log_buckets(mileage, MILEAGE_TOLERANCE)
+    known = ~np.isnan(mileage)
+    year_token = tokens(_YEAR, year.astype(np.int64))
+    return np.stack([
+        year_token,
+        tokens(_PRICE, half_price // 2),
+        tokens(_PRICE_SHIFTED, (half_price + 1) // 2),
+        np.where(known, tokens(_MILEAGE, half_mileage // 2), year_token),
+        np.where(known, tokens(_MILEAGE_SHIFTED, (half_mileage + 1) // 2), year_token),
+    ], axis=1)
+
+
+def band_keys(signature: np.ndarray) -> np.ndarray:
+    """One 64-bit key per band of ROWS_PER_BAND signature values, (n, BANDS)"""
+    values = signature.astype(np.uint64)
+    keys = np.empty((len(values), BANDS), dtype=np.uint64)
+    for band in range(BANDS):
+        key = np.zeros(len(values), dtype=np.uint64)
+        for column in range(band * ROWS_PER_BAND, (band + 1) * ROWS_PER_BAND):
+            key = pd.util.hash_array(key * _BAND_MIX + values[:, column], categorize=False)
+        keys[:, band] = key
+    return keys
+
+
+@dataclass
+class Fingerprints:
+    """
+    What the cross-post index needs of each Silver row
+
+    `signature` keeps the low 8 bits of each MinHash value, enough to
+    estimate similarity (b-bit MinHash); `bands` are the LSH keys built
+    from the full values.
+    """
+    link_hash: np.ndarray
+    day: np.ndarray
+    year: np.ndarray
+    price: np.ndarray
+    mileage: np.ndarray
+    signature: np.ndarray
+    bands: np.ndarray
+
+    @classmethod
+    def of(cls, df: pd.DataFrame) -> "Fingerprints":
+        """
+        Fingerprints of Silver rows, shingled from title, price, mileage and year
+
+        A signature is the element-wise minimum of its title's and its field
+        tokens' signatures, as MinHash of a union is. Each distinct title and
+        each distinct field token is hashed once.
+        """
+        if df.empty:
+            return cls.empty()
+        if len(df) > CHUNK_ROWS:
+            return cls.concat([cls.of(df.iloc[start:start + CHUNK_ROWS]) for start in range(0, len(df), CHUNK_ROWS)])
+
+        year = df['year'].to_numpy(dtype=np.int16)
+        price = df['price_numeric'].to_numpy(dtype=np.int32)
+        mileage = df['mileage_numeric'].to_numpy(dtype=np.float32)
+
+        title_codes, titles = pd.factorize(df['title'].astype(object))
+        title_signature = min_hashes(*title_trigrams(pd.Series(titles, dtype=object)))
+        title_signature = np.vstack([title_signature, np.full((1, NUM_HASHES), _EMPTY, np.uint32)])
+        # Few distinct field tokens: each one's copies are hashed once, then looked up per row
+        token_codes, tokens = pd.factorize(field_shingles(year, price, mileage).ravel())
+        token_signature = min_hashes((tokens[:, None] | _COPIES).ravel(), np.full(len(tokens), FIELD_WEIGHT))
+        token_codes = token_codes.reshape(len(df), -1)
+
+        # Code -1 (no title) takes the appended all-empty row
+        signature = title_signature[title_codes]
+        for field in range(token_codes.shape[1]):
+            np.minimum(signature, token_signature[token_codes[:, field]], out=signature)
+        return cls(link_hashes(df['link']), listing_dates(df), year, price, mileage,
+                   (signature & 0xFF).astype(np.uint8), band_keys(signature))
+
+    @classmethod
+    def empty(cls) -> "Fingerprints":
+        return cls(np.empty(0, np.uint64), np.empty(0, 'datetime64[D]'), np.empty(0, np.int16),
+                   np.empty(0, np.int32), np.empty(0, np.float32), np.empty((0, NUM_HASHES), np.uint8),
+                   np.empty((0, BANDS), np.uint64))
+
+    @classmethod
+    def concat(cls, parts: List["Fingerprints"]) -> "Fingerprints":
+        if not parts:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(part, name) for part in parts]) for name in cls.__dataclass_fields__))
+
+    def take(self, rows: np.ndarray) -> "Fingerprints":
+        return Fingerprints(*(getattr(self, name)[rows] for name in self.__dataclass_fields__))
+
+    def __len__(self) -> int:
+        return len(self.link_hash)
+
+
+def fingerprint_table(fingerprints: Fingerprints, cluster: np.ndarray) -> pa.Table:
+    """Fingerprints and their clusters as an Arrow table, signature and bands as fixed-size binary"""
+
+    def binary(values: np.ndarray) -> pa.Array:
+        width = values.shape[1] * values.itemsize
+        return pa.FixedSizeBinaryArray.from_buffers(pa.binary(width), len(values),
+                                                    [None, pa.py_buffer(np.ascontiguousarray(values).tobytes())])
+
+    return pa.table({
+        'link_hash': pa.array(fingerprints.link_hash, pa.uint64()),
+        'cluster': pa.array(cluster, pa.uint64()),
+        'last_seen': pa.array(fingerprints.day, pa.date32()),
+        'year': pa.array(fingerprints.year, pa.int16()),
+        'price': pa.array(fingerprints.price, pa.int32()),
+        'mileage': pa.array(fingerprints.mileage, pa.float32()),
+        'signature': binary(fingerprints.signature),
+        'bands': binary(fingerprints.bands),
+    })
+
+
+def table_fingerprints(table: pa.Table) -> Tuple[Fingerprints, np.ndarray]:
+    """Fingerprints and clusters back from fingerprint_table's layout"""
+
+    def column(name: str) -> np.ndarray:
+        return np.array(table.column(name).to_numpy())
+
+    def matrix(name: str, dtype, width: int) -> np.ndarray:
+        array = table.column(name).combine_chunks()
+        if not len(array):
+            return np.empty((0, width), dtype=dtype)
+        values = np.frombuffer(array.buffers()[1], dtype=dtype)
+        return values[array.offset * width:(array.offset + len(array)) * width].reshape(-1, width).copy()
+
+    fingerprints = Fingerprints(column('link_hash'), column('last_seen').astype('datetime64[D]'), column('year'),
+                                column('price'), column('mileage'), matrix('signature', np.uint8, NUM_HASHES),
+                                matrix('bands', np.uint64, BANDS))
+    return fingerprints, column('cluster')
+
+
+def exact_keys(fingerprints: Fingerprints) -> np.ndarray:
+    """A hash of each row's band keys, year, price and mileage, equal for exact copies"""
+    key = np.zeros(len(fingerprints), dtype=np.uint64)
+    columns = [fingerprints.bands[:, band] for band in range(BANDS)] + [
+        fingerprints.year.astype(np.uint64), fingerprints.price.astype(np.uint64),
+        fingerprints.mileage.astype(np.float32).view(np.uint32).astype(np.uint64)]
+    for column in columns:
+        key = pd.util.hash_array(key * _BAND_MIX + column, categorize=False)
+    return key
+
+
+def confirmed(a: Fingerprints, i: np.ndarray, b: Fingerprints, j: np.ndarray) -> np.ndarray:
+    """
+    Which candidate pairs (a[i], b[j]) are the same car
+
+    Shingles must be at least MIN_SIMILARITY alike (estimated from the
+    8-bit signatures, corrected for chance agreement), the year the same,
+    and the price within PRICE_TOLERANCE. Mileage must be within
+    MILEAGE_TOLERANCE where both listings give it; where either does not,
+    the price must match exactly.
+    """
+    same = a.year[i] == b.year[j]
+    # Each check gathers only the pairs the ones before it leave
+    rest = np.flatnonzero(same)
+    price_a, price_b = a.price[i[rest]].astype(np.float64), b.price[j[rest]].astype(np.float64)
+    same[rest] = np.abs(price_a - price_b) <= PRICE_TOLERANCE * np.maximum(price_a, price_b)
+
+    rest = np.flatnonzero(same)
+    mileage_a, mileage_b = a.mileage[i[rest]].astype(np.float64), b.mileage[j[rest]].astype(np.float64)
+    with np.errstate(invalid='ignore'):
+        close_mileage = np.abs(mileage_a - mileage_b) <= MILEAGE_TOLERANCE * np.maximum(mileage_a, mileage_b)
+    known = ~np.isnan(mileage_a) & ~np.isnan(mileage_b)
+    same[rest] = np.where(known, close_mileage, a.price[i[rest]] == b.price[j[rest]])
+
+    rest = np.flatnonzero(same)
+    agree = (a.signature[i[rest]] == b.signature[j[rest]]).mean(axis=1)
+    same[rest] = (agree - 1 / 256) / (1 - 1 / 256) >= MIN_SIMILARITY
+    return same
+
+
+def batch_candidates(bands: np.ndarray) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Per band, pairs (i, j), i > j, of batch rows sharing a bucket of at most MAX_BUCKET rows"""
+    for band in range(BANDS):
+        order = np.argsort(bands[:, band])
+        keys = bands[order, band]
+        run_start = np.ones(len(keys), dtype=bool)
+        run_start[1:] = keys[1:] != keys[:-1]
+        starts = np.flatnonzero(run_start)
+        sizes = np.diff(np.append(starts, len(keys)))
+        # Each row of a run pairs with the rows before it in the run
+        offsets = np.arange(len(keys)) - np.repeat(starts, sizes)
+        offsets[np.repeat(sizes > MAX_BUCKET, sizes)] = 0
+        later = np.repeat(np.arange(len(keys)), offsets)
+        earlier = later - 1 - (np.arange(len(later)) - np.repeat(np.cumsum(offsets) - offsets, offsets))
+        yield order[later], order[earlier]
+
+
+def confirmed_pairs(candidates: Iterator[Tuple[np.ndarray, np.ndarray]], a: Fingerprints,
+                    b: Fingerprints) -> Tuple[np.ndarray, np.ndarray]:
+    """The candidate pairs (a[i], b[j]) that `confirmed` accepts, each once; one band's candidates in memory at a time"""
+    left, right = [], []
+    for i, j in candidates:
+        keep = confirmed(a, i, b, j)
+        left.append(i[keep])
+        right.append(j[keep])
+    return unique_pairs(np.concatenate(left), np.concatenate(right))
+
+
+def unique_pairs(left: np.ndarray, right: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Drop pairs found in more than one band"""
+    if not len(left):
+        return left.astype(np.int64), right.astype(np.int64)
+    width = np.int64(right.max()) + 1
+    codes = np.unique(left.astype(np.int64) * width + right)
+    return codes // width, codes % width
+
+
+def component_labels(left: np.ndarray, right: np.ndarray, n_nodes: int) -> np.ndarray:
+    """Smallest node id in each node's connected component, by min-label propagation with pointer jumping"""
+    labels = np.arange(n_nodes)
+    while len(left):
+        low = np.minimum(labels[left], labels[right])
+        if (labels[left] == low).all() and (labels[right] == low).all():
+            break
+        np.minimum.at(labels, left, low)
+        np.minimum.at(labels, right, low)
+        labels = labels[labels]
+    return labels
+
+
+class CrossPostIndex:
+    """
+    Recent listings hashed for near-duplicate lookup, to catch cross-posts
+
+    Dealers post the same car to several cities (and repost it) under new
+    links, which the link-based dedup index cannot see. Each listing is
+    shingled from its title's character trigrams plus year, price and
+    mileage tokens, MinHashed, and its signature cut into BANDS bands; two
+    listings sharing any band bucket are a candidate pair (LSH), and
+    candidates are confirmed by `confirmed`. A batch is matched by a binary
+    search per row and band into the sorted band keys, plus a sort of the
+    batch's own keys, so matching costs O(batch log n) rather than a
+    comparison with every stored listing. Only each cluster's first listing
+    is in the band keys, so a car posted fifty times is one bucket entry.
+
+    Confirmed pairs join into clusters, named by the link hash of the
+    earliest listing (the lowest hash among listings first seen together).
+    A listing is a cross-post when its cluster is another listing's; a link
+    keeps the cluster it was first given.
+    """
+
+    def __init__(self, path: str, entries: Fingerprints, cluster: np.ndarray):
+        self.path = path
+        self.entries = entries
+        self.cluster = cluster
+        # Built on first use, then kept sorted as listings are added
+        self._links: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._bands: Optional[List[Tuple[np.ndarray, np.ndarray]]] = None
+
+    @classmethod
+    def load(cls, path: str = CROSS_POST_INDEX_PATH) -> "CrossPostIndex":
+        if not os.path.exists(path):
+            return cls(path, Fingerprints.empty(), np.empty(0, np.uint64))
+        return cls(path, *table_fingerprints(pq.read_table(path)))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def link_table(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._links is None:
+            order = np.argsort(self.entries.link_hash, kind='stable')
+            self._links = (self.entries.link_hash[order], order)
+        return self._links
+
+    def band_tables(self) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Sorted band keys of each cluster's first listing, with their entries"""
+        if self._bands is None:
+            roots = np.flatnonzero(self.cluster == self.entries.link_hash)
+            self._bands = []
+            for band in range(BANDS):
+                order = roots[np.argsort(self.entries.bands[roots, band], kind='stable')]
+                self._bands.append((self.entries.bands[order, band], order))
+        return self._bands
+
+    def lookup(self, hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Entry of each link hash, and whether it is stored at all"""
+        sorted_hashes, order = self.link_table()
+        positions = np.searchsorted(sorted_hashes, hashes)
+        found = np.zeros(len(hashes), dtype=bool)
+        in_range = positions < len(sorted_hashes)
+        found[in_range] = sorted_hashes[positions[in_range]] == hashes[in_range]
+        entries = np.zeros(len(hashes), dtype=np.int64)
+        entries[found] = order[positions[found]]
+        return entries, found
+
+    def stored_candidates(self, new: Fingerprints) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Per band, pairs (batch row, entry) sharing a bucket of at most MAX_BUCKET entries"""
+        for band, (keys, order) in enumerate(self.band_tables()):
+            lo = np.searchsorted(keys, new.bands[:, band], side='left')
+            sizes = np.searchsorted(keys, new.bands[:, band], side='right') - lo
+            sizes[sizes > MAX_BUCKET] = 0
+            yield np.repeat(np.arange(len(new)), sizes), order[ranges(lo, sizes)]
+
+    def match(self, batch: Fingerprints) -> np.ndarray:
+        """
+        Cluster of each batch row, against the stored listings and the rest of the batch
+
+        Stored links keep their cluster. New links are matched once each, by
+        their first row; confirmed pairs are joined into components, named
+        by their earliest stored member or, failing one, by the lowest link
+        hash among their new members.
+        """
+        cluster = np.zeros(len(batch), dtype=np.uint64)
+        entries, found = self.lookup(batch.link_hash)
+        cluster[found] = self.cluster[entries[found]]
+
+        unseen = np.flatnonzero(~found)
+        # In link hash order, so which of a batch's copies names the cluster does not depend on row order
+        _, first, inverse = np.unique(batch.link_hash[unseen], return_index=True, return_inverse=True)
+        new = batch.take(unseen[first])
+
+        # Exact copies (same signature and fields) join the first of their kind directly;
+        # only one of each kind goes through LSH
+        kinds, _ = pd.factorize(exact_keys(new))
+        kind_first = np.full(kinds.max() + 1 if len(kinds) else 0, len(kinds), dtype=np.int64)
+        np.minimum.at(kind_first, kinds, np.arange(len(kinds)))
+        copies = np.flatnonzero(kind_first[kinds] != np.arange(len(kinds)))
+        distinct = new.take(kind_first)
+
+        stored_rows, stored = confirmed_pairs(self.stored_candidates(distinct), distinct, self.entries)
+        later, earlier = confirmed_pairs(batch_candidates(distinct.bands), distinct, distinct)
+        stored_rows, later, earlier = kind_first[stored_rows], kind_first[later], kind_first[earlier]
+
+        # Nodes: stored entries first, then new rows; only those with a confirmed pair
+        n_stored = len(self)
+        left = np.concatenate([stored, n_stored + later, n_stored + copies])
+        right = n_stored + np.concatenate([stored_rows, earlier, kind_first[kinds[copies]]])
+        nodes, edges = np.unique(np.concatenate([left, right]), return_inverse=True)
+        root = nodes[component_labels(edges[:len(left)], edges[len(left):], len(nodes))]
+        root_names = np.empty(len(nodes), dtype=np.uint64)
+        stored_root = root < n_stored
+        root_names[stored_root] = self.cluster[root[stored_root]]
+        root_names[~stored_root] = new.link_hash[root[~stored_root] - n_stored]
+        names = new.link_hash.copy()
+        joined = nodes >= n_stored
+        names[nodes[joined] - n_stored] = root_names[joined]
+
+        cluster[unseen] = names[inverse]
+        return cluster
+
+    def add(self, batch: Fingerprints, cluster: np.ndarray) -> None:
+        """Store a batch's new links with their clusters; refresh when known links were last seen"""
+        entries, found = self.lookup(batch.link_hash)
+        if found.any():
+            self.entries.day[entries[found]] = np.maximum(self.entries.day[entries[found]], batch.day[found])
+
+        unseen = np.flatnonzero(~found)
+        _, first = np.unique(batch.link_hash[unseen], return_index=True)
+        rows = np.sort(unseen[first])
+        new = batch.take(rows)
+        ids = np.arange(len(self), len(self) + len(new))
+        self.entries = Fingerprints.concat([self.entries, new])
+        self.cluster = np.concatenate([self.cluster, cluster[rows]])
+
+        if self._links is not None:
+            order = np.argsort(new.link_hash)
+            hashes, link_order = self._links
+            positions = np.searchsorted(hashes, new.link_hash[order])
+            self._links = (np.insert(hashes, positions, new.link_hash[order]), np.insert(link_order, positions, ids[order]))
+        if self._bands is not None:
+            roots = np.flatnonzero(cluster[rows] == new.link_hash)
+            for band, (keys, band_order) in enumerate(self._bands):
+                order = roots[np.argsort(new.bands[roots, band])]
+                positions = np.searchsorted(keys, new.bands[order, band])
+                self._bands[band] = (np.insert(keys, positions, new.bands[order, band]),
+                                     np.insert(band_order, positions, ids[order]))
+
+    def prune(self) -> None:
+        """Drop listings not seen in the RETENTION_DAYS before the latest day stored"""
+        if not len(self):
+            return
+        keep = self.entries.day >= self.entries.day.max() - np.timedelta64(RETENTION_DAYS, 'D')
+        if not keep.all():
+            self.entries = self.entries.take(np.flatnonzero(keep))
+            self.cluster = self.cluster[keep]
+            self._links = self._bands = None
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        self.prune()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = fingerprint_table(self.entries, self.cluster)
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
@@ -1,19 +1,31 @@
 from dagster import job
 from src.transformations.bronze_layer import bronze_layer_ingestion
-from src.transformations.silver_layer import silver_layer_transformation, save_silver_data
-from src.transformations.gold_layer import gold_layer_aggregation, save_gold_data
+from src.transformations.silver_layer import commit_silver_batch, silver_layer_transformation, save_silver_data
+from src.transformations.timeseries import update_timeseries
+from src.transformations.gold_layer import gold_layer_aggregation, save_gold_data, gold_chart_aggregation, save_gold_chart_data
 
 @job
 def data_processing_pipeline():
-    """Process raw CSV data through Bronze → Silver → Gold layers"""
+    """Process raw CSV data and scraper-published shards through Bronze → Silver → Gold layers"""
     
-    # Bronze: Ingest raw CSV data
-    bronze_df = bronze_layer_ingestion()
+    # Bronze: Ingest raw CSV data and pick up shards the scraper published
+    bronze_df, bronze_shards = bronze_layer_ingestion()
     
     # Silver: Clean and validate data
-    silver_df = silver_layer_transformation(bronze_df)
+    silver_df, cross_post_batch = silver_layer_transformation(bronze_df)
     silver_path = save_silver_data(silver_df)
     
+    # Time series: per-listing price log and daily series rollups
+    timeseries_path = update_timeseries(silver_df, silver_saved=silver_path)
+    
     # Gold: Create aggregated analytics
     gold_df = gold_layer_aggregation(silver_df)
-    gold_path = save_gold_data(gold_df)
+    gold_path = save_gold_data(gold_df, silver_saved=silver_path)
+    
+    # Gold: Chart-ready histogram and make counts
+    price_histogram, make_counts = gold_chart_aggregation(silver_df)
+    chart_path = save_gold_chart_data(price_histogram, make_counts, silver_saved=silver_path)
+    
+    # Commit: update the indexes and release the Bronze shards once every output holds the batch
+    commit_silver_batch(silver_df, cross_post_batch, bronze_shards,
+                        outputs_saved=[timeseries_path, gold_path, chart_path])
@@ -0,0 +1,112 @@
+import os
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DEDUP_INDEX_PATH = "storage/silver/_dedup_index.parquet"
+LISTING_STATUSES = ["new", "seen", "price_changed"]
+
+
+def link_hashes(links: pd.Series) -> np.ndarray:
+    """64-bit hashes of listing links, stable across runs and processes"""
+    return pd.util.hash_array(links.to_numpy(dtype=object))
+
+
+def listing_dates(df: pd.DataFrame) -> np.ndarray:
+    """Day each row was scraped, falling back to today where unknown"""
+    if 'data_date' not in df:
+        return np.full(len(df), np.datetime64(date.today(), 'D'))
+    days = pd.to_datetime(df['data_date'], errors='coerce').to_numpy().astype('datetime64[D]')
+    return np.where(np.isnat(days), np.datetime64(date.today(), 'D'), days)
+
+
+class DedupIndex:
+    """
+    Every listing link Silver has stored, across all days
+
+    Kept on disk as one parquet file of link hashes in sorted order, with the
+    first and last day each listing was seen and its last price. A batch is
+    looked up with a binary search per row, so tagging costs O(batch log n)
+    and never touches the Silver partitions themselves.
+    """
+
+    def __init__(self, path: str, hashes: np.ndarray, first_seen: np.ndarray,
+                 last_seen: np.ndarray, last_price: np.ndarray):
+        self.path = path
+        self.hashes = hashes
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+        self.last_price = last_price
+
+    @classmethod
+    def load(cls, path: str = DEDUP_INDEX_PATH) -> "DedupIndex":
+        if not os.path.exists(path):
+            return cls(path, np.empty(0, np.uint64), np.empty(0, 'datetime64[D]'),
+                       np.empty(0, 'datetime64[D]'), np.empty(0, np.int32))
+        table = pq.read_table(path)
+        # Copies, since batches are applied in place
+        return cls(path, *(np.array(table.column(name).to_numpy()) for name in
+                           ('link_hash', 'first_seen', 'last_seen', 'last_price')))
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def lookup(self, hashes: np.ndarray):
+        """Index position of each hash, and whether it is present at all"""
+        positions = np.searchsorted(self.hashes, hashes)
+        found = np.zeros(len(hashes), dtype=bool)
+        in_range = positions < len(self.hashes)
+        found[in_range] = self.hashes[positions[in_range]] == hashes[in_range]
+        return positions, found
+
+    def tag(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add listing_status (new / seen / price_changed), first_seen and the previous last_seen to a Silver batch"""
+        positions, found = self.lookup(link_hashes(df['link']))
+        known = positions[found]
+
+        status = np.zeros(len(df), dtype=np.int8)
+        status[found] = np.where(self.last_price[known] == df['price_numeric'].to_numpy()[found], 1, 2)
+        first_seen = listing_dates(df)
+        first_seen[found] = self.first_seen[known]
+        last_seen = np.full(len(df), np.datetime64('NaT'), dtype='datetime64[D]')
+        last_seen[found] = self.last_seen[known]
+
+        return df.assign(
+            listing_status=pd.Categorical.from_codes(status, LISTING_STATUSES),
+            first_seen=first_seen,
+            last_seen=last_seen,
+        )
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Record a batch as seen: refresh last_seen/last_price of known links, insert the rest"""
+        hashes, first = np.unique(link_hashes(df['link']), return_index=True)
+        days = listing_dates(df)[first]
+        prices = df['price_numeric'].to_numpy(dtype=np.int32)[first]
+
+        positions, found = self.lookup(hashes)
+        known = positions[found]
+        self.last_seen[known] = np.maximum(self.last_seen[known], days[found])
+        self.last_price[known] = prices[found]
+
+        new = ~found
+        self.hashes = np.insert(self.hashes, positions[new], hashes[new])
+        self.first_seen = np.insert(self.first_seen, positions[new], days[new])
+        self.last_seen = np.insert(self.last_seen, positions[new], days[new])
+        self.last_price = np.insert(self.last_price, positions[new], prices[new])
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.table({
+            'link_hash': pa.array(self.hashes, pa.uint64()),
+            'first_seen': pa.array(self.first_seen, pa.date32()),
+            'last_seen': pa.array(self.last_seen, pa.date32()),
+            'last_price': pa.array(self.last_price, pa.int32()),
+        })
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
@@ -1,31 +1,71 @@
 import pandas as pd
-from dagster import op, In, Out
+from dagster import op, In, Nothing, Out
 import os
 
+from src.transformations.gold_partials import (
+    GOLD_PARTIALS_ROOT, MAKE_COUNTS_ROOT, PRICE_HISTOGRAM_ROOT,
+    build_make_counts, build_partials, build_price_histogram, combine_partials, sum_counts,
+)
+from src.transformations.lake import partition_dir, write_shard
+
+
+# Gold table -> (root, how rows sharing a key merge)
+GOLD_TABLES = {
+    "city_partials": (GOLD_PARTIALS_ROOT, lambda part: combine_partials(part, ['city', 'date'])),
+    "price_histogram": (PRICE_HISTOGRAM_ROOT, lambda part: sum_counts(part, ['city', 'date', 'bin_start'])),
+    "make_counts": (MAKE_COUNTS_ROOT, lambda part: sum_counts(part, ['city', 'date', 'make'])),
+}
+
+
+def merge_into_partitions(df: pd.DataFrame, root: str, combine) -> None:
+    """Fold a batch into its date partitions, rewriting only the dates it touches"""
+    for date_str, part in df.groupby('date', observed=True):
+        existing_path = os.path.join(partition_dir(root, date_str), "data.parquet")
+        if os.path.exists(existing_path):
+            part = pd.concat([pd.read_parquet(existing_path), part], ignore_index=True)
+        write_shard(combine(part), root, date_str, "data.parquet")
+
 @op(ins={"silver_df": In(pd.DataFrame)}, out=Out(pd.DataFrame))
 def gold_layer_aggregation(silver_df: pd.DataFrame) -> pd.DataFrame:
-    """Create aggregated analytics data for Gold layer"""
-    
-    # City-level aggregations
-    city_stats = silver_df.groupby('city').agg({
-        'price_numeric': ['mean', 'median', 'count'],
-        'mileage_numeric': 'mean',
-        'year': 'mean'
-    }).round(2)
+    """
+    Create mergeable per-(city, date) partial aggregates for the Gold layer
+
+    Only the new batch is aggregated; means, counts and medians for any date
+    range come from merging these partials (see gold_partials.city_rollup).
+    """
     
-    city_stats.columns = ['avg_price', 'median_price', 'listing_count', 'avg_mileage', 'avg_year']
-    city_stats = city_stats.reset_index()
+    if silver_df.empty:
+        return pd.DataFrame()
     
-    return city_stats
+    return build_partials(silver_df)
 
-@op(ins={"gold_df": In(pd.DataFrame)}, out=Out(str))
+@op(ins={"gold_df": In(pd.DataFrame), "silver_saved": In(Nothing)}, out=Out(str))
 def save_gold_data(gold_df: pd.DataFrame) -> str:
-    """Save aggregated data to Gold layer"""
+    """Merge the batch's partials into their date partitions, once Silver has committed the batch"""
+    
+    if gold_df.empty:
+        return ""
+    
+    merge_into_partitions(gold_df, *GOLD_TABLES["city_partials"])
+    return GOLD_PARTIALS_ROOT
+
+@op(ins={"silver_df": In(pd.DataFrame)}, out={"price_histogram": Out(pd.DataFrame), "make_counts": Out(pd.DataFrame)})
+def gold_chart_aggregation(silver_df: pd.DataFrame):
+    """Pre-binned price histogram and make counts per (city, date), sized by bins rather than rows"""
+    
+    if silver_df.empty:
+        return pd.DataFrame(), pd.DataFrame()
     
-    date_str = pd.Timestamp.now().strftime('%Y-%m-%d')
-    output_path = f"storage/gold/city_analytics/date={date_str}/data.parquet"
+    return build_price_histogram(silver_df), build_make_counts(silver_df)
+
+@op(ins={"price_histogram": In(pd.DataFrame), "make_counts": In(pd.DataFrame), "silver_saved": In(Nothing)},
+    out=Out(str))
+def save_gold_chart_data(price_histogram: pd.DataFrame, make_counts: pd.DataFrame) -> str:
+    """Add the batch's chart tables into their date partitions, once Silver has committed the batch"""
     
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    gold_df.to_parquet(output_path, index=False)
+    if price_histogram.empty:
+        return ""
     
-    return output_path
+    merge_into_partitions(price_histogram, *GOLD_TABLES["price_histogram"])
+    merge_into_partitions(make_counts, *GOLD_TABLES["make_counts"])
+    return os.path.dirname(PRICE_HISTOGRAM_ROOT)
@@ -0,0 +1,213 @@
+import os
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.transformations.lake import partition_files
+from src.transformations.sketches import QuantileSketch
+
+GOLD_PARTIALS_ROOT = "storage/gold/city_partials"
+PRICE_HISTOGRAM_ROOT = "storage/gold/price_histogram"
+MAKE_COUNTS_ROOT = "storage/gold/make_counts"
+PRICE_BIN_WIDTH = 1000
+# Prices at or above this fall into one overflow bin
+PRICE_HISTOGRAM_MAX = 150_000
+SUM_COLUMNS = ['listing_count', 'price_sum', 'mileage_sum', 'mileage_count', 'year_sum']
+CITY_STATS_COLUMNS = ['city', 'avg_price', 'median_price', 'listing_count', 'avg_mileage', 'avg_year']
+
+
+def fresh_rows(silver_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    A Silver batch's rows to count towards their day, in plain dtypes
+
+    Listings the dedup index already saw earlier that day are left out, so
+    repeated same-day scrapes do not count a listing twice, and so are
+    cross-posts, so a car posted to several cities counts once.
+    """
+    days = pd.to_datetime(silver_df['data_date']).dt.normalize()
+    fresh = np.ones(len(silver_df), dtype=bool)
+    if 'last_seen' in silver_df:
+        last_seen = pd.to_datetime(silver_df['last_seen'])
+        fresh = (last_seen.isna() | (last_seen < days)).to_numpy()
+    if 'cross_post' in silver_df:
+        fresh &= ~silver_df['cross_post'].to_numpy(dtype=bool)
+
+    # Grouping keys stay categorical; a batch spans few days, so each is formatted once
+    day_codes, unique_days = pd.factorize(days)
+    dates = pd.Categorical.from_codes(day_codes, unique_days.strftime('%Y-%m-%d'))
+
+    return pd.DataFrame({
+        'city': silver_df['city'].astype('category').array[fresh],
+        'date': dates[fresh],
+        'make': silver_df['make'].astype('category').array[fresh],
+        'model': silver_df['model'].astype('category').array[fresh],
+        'price': silver_df['price_numeric'].to_numpy(dtype=np.float64)[fresh],
+        'mileage': silver_df['mileage_numeric'].to_numpy(dtype=np.float64)[fresh],
+        'year': silver_df['year'].to_numpy(dtype=np.float64)[fresh],
+    })
+
+
+def build_partials(silver_df: pd.DataFrame, by: Sequence[str] = ('city',)) -> pd.DataFrame:
+    """
+    Mergeable aggregates per (`by`..., date) for a Silver batch
+
+    Each row holds sums and counts plus the bucket keys/counts of a price
+    QuantileSketch.
+    """
+    keys = list(by) + ['date']
+    df = fresh_rows(silver_df)
+    if df.empty:
+        return pd.DataFrame(columns=keys + SUM_COLUMNS + ['price_keys', 'price_counts'])
+    df['price_key'] = QuantileSketch.bucket_keys(df['price'].to_numpy())
+
+    sums = df.groupby(keys, observed=True).agg(
+        listing_count=('price', 'size'),
+        price_sum=('price', 'sum'),
+        mileage_sum=('mileage', 'sum'),
+        mileage_count=('mileage', 'count'),
+        year_sum=('year', 'sum'),
+    )
+    buckets = df.groupby(keys + ['price_key'], observed=True).size().rename('price_counts').reset_index()
+    return sums.join(bucket_lists(buckets.rename(columns={'price_key': 'price_keys'}), keys)).reset_index()
+
+
+def build_price_histogram(silver_df: pd.DataFrame) -> pd.DataFrame:
+    """Listing counts per (city, date, price bin), with fixed bins so days merge by addition"""
+    df = fresh_rows(silver_df)
+    df['bin_start'] = (np.minimum(df['price'] // PRICE_BIN_WIDTH * PRICE_BIN_WIDTH, PRICE_HISTOGRAM_MAX)
+                       .astype(np.int32))
+    return df.groupby(['city', 'date', 'bin_start'], observed=True).size().rename('count').reset_index()
+
+
+def build_make_counts(silver_df: pd.DataFrame) -> pd.DataFrame:
+    """Listing counts per (city, date, make)"""
+    df = fresh_rows(silver_df)
+    return df.groupby(['city', 'date', 'make'], observed=True).size().rename('count').reset_index()
+
+
+def sum_counts(df: pd.DataFrame, by: Sequence[str]) -> pd.DataFrame:
+    return df.groupby(list(by), observed=True)['count'].sum().reset_index()
+
+
+def bucket_lists(buckets: pd.DataFrame, by: Sequence[str]) -> pd.DataFrame:
+    """
+    Per-group price_keys/price_counts arrays from one row per (group, bucket)
+
+    `buckets` must be sorted by group, as groupby output is; each group's
+    rows are then one contiguous slice, cut out as an Arrow list array from
+    the group offsets instead of a per-group Python aggregation.
+    """
+    sizes = buckets.groupby(list(by), observed=True).size()
+    offsets = pa.array(np.concatenate([[0], np.cumsum(sizes.to_numpy())]), pa.int32())
+
+    def lists(values: np.ndarray) -> np.ndarray:
+        return pa.ListArray.from_arrays(offsets, values).to_numpy(zero_copy_only=False)
+
+    return pd.DataFrame({
+        'price_keys': lists(buckets['price_keys'].to_numpy(dtype=np.int32)),
+        'price_counts': lists(buckets['price_counts'].to_numpy(dtype=np.int64)),
+    }, index=sizes.index)
+
+
+def sketch_of(row) -> QuantileSketch:
+    return QuantileSketch(row['price_keys'], row['price_counts'])
+
+
+def combine_partials(partials: pd.DataFrame, by: Sequence[str]) -> pd.DataFrame:
+    """Merge partial rows that share the `by` columns: sums add, sketch bucket counts add"""
+    by = list(by)
+    combined = partials.groupby(by, observed=True)[SUM_COLUMNS].sum()
+
+    # One row per (partial, bucket), flattened in one go rather than exploded row by row
+    keys = partials['price_keys'].to_numpy()
+    lengths = np.fromiter(map(len, keys), dtype=np.int64, count=len(keys))
+    buckets = partials[by].iloc[np.repeat(np.arange(len(partials)), lengths)].reset_index(drop=True)
+    buckets['price_keys'] = np.concatenate([np.empty(0, np.int32), *keys]).astype(np.int32)
+    buckets['price_counts'] = np.concatenate([np.empty(0, np.int64), *partials['price_counts']]).astype(np.int64)
+    merged = buckets.groupby(by + ['price_keys'], observed=True)['price_counts'].sum().reset_index()
+    return combined.join(bucket_lists(merged, by)).reset_index()
+
+
+class RunningAggregate:
+    """
+    An aggregate table folded together one Silver batch at a time
+
+    `build` turns a batch into rows keyed by group and `combine` merges rows
+    sharing a key. Batch results are buffered and folded in once they
+    outgrow the combined table, so each row is re-merged only a logarithmic
+    number of times and memory stays proportional to the number of groups,
+    not to the number of rows streamed through.
+    """
+
+    def __init__(self, build: Callable[[pd.DataFrame], pd.DataFrame],
+                 combine: Callable[[pd.DataFrame], pd.DataFrame]):
+        self.build = build
+        self.combine = combine
+        self.combined = pd.DataFrame()
+        self.pending: List[pd.DataFrame] = []
+        self.pending_rows = 0
+
+    def add(self, silver_df: pd.DataFrame) -> None:
+        part = self.build(silver_df)
+        if part.empty:
+            return
+        self.pending.append(part)
+        self.pending_rows += len(part)
+        if self.pending_rows >= len(self.combined):
+            self.fold()
+
+    def fold(self) -> None:
+        if not self.pending:
+            return
+        frames = [self.combined] + self.pending if not self.combined.empty else self.pending
+        self.combined = self.combine(pd.concat(frames, ignore_index=True))
+        self.pending, self.pending_rows = [], 0
+
+    def result(self) -> pd.DataFrame:
+        self.fold()
+        return self.combined
+
+
+def city_stats(partials: pd.DataFrame) -> pd.DataFrame:
+    """City analytics (the original Gold columns) from partials over any set of dates"""
+    if partials.empty:
+        return pd.DataFrame({column: pd.Series(dtype=object if column == 'city' else np.float64)
+                             for column in CITY_STATS_COLUMNS})
+    by_city = combine_partials(partials, ['city'])
+    stats = pd.DataFrame({
+        'city': by_city['city'],
+        'avg_price': by_city['price_sum'] / by_city['listing_count'],
+        'median_price': [sketch_of(row).quantile(0.5) for _, row in by_city.iterrows()],
+        'listing_count': by_city['listing_count'],
+        'avg_mileage': by_city['mileage_sum'] / by_city['mileage_count'].replace(0, np.nan),
+        'avg_year': by_city['year_sum'] / by_city['listing_count'],
+    })
+    return stats.round(2)
+
+
+def load_partials(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                  root: str = GOLD_PARTIALS_ROOT) -> pd.DataFrame:
+    files = partition_files(root, start_date, end_date)
+    if not files:
+        return pd.DataFrame(columns=['city', 'date'] + SUM_COLUMNS + ['price_keys', 'price_counts'])
+    return pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+
+
+def partition_dates(root: str = GOLD_PARTIALS_ROOT) -> List[str]:
+    return sorted({os.path.basename(os.path.dirname(f))[len("date="):] for f in partition_files(root)})
+
+
+def city_rollup(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                root: str = GOLD_PARTIALS_ROOT) -> pd.DataFrame:
+    """City analytics over [start_date, end_date], merged from daily partials without touching Silver"""
+    return city_stats(load_partials(start_date, end_date, root))
+
+
+def latest_city_stats(root: str = GOLD_PARTIALS_ROOT) -> pd.DataFrame:
+    """City analytics for the most recent day with data"""
+    dates = partition_dates(root)
+    if not dates:
+        return city_stats(pd.DataFrame())
+    return city_rollup(dates[-1], dates[-1], root)
@@ -0,0 +1,206 @@
+import glob
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Set, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def partition_dir(table_root: str, date_str: str) -> str:
+    return os.path.join(table_root, f"date={date_str}")
+
+
+def new_shard_name(prefix: str = "part") -> str:
+    """Unique, time-ordered shard file name"""
+    return f"{prefix}-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+
+
+def write_shard(df: Union[pd.DataFrame, pa.Table], table_root: str, date_str: str, name: Optional[str] = None) -> str:
+    """
+    Write one parquet shard (from a DataFrame or an Arrow table) into a date partition, atomically
+
+    Shards are added next to whatever the partition already holds, so runs
+    never clobber each other. Writing the same `name` again replaces that
+    shard, which keeps re-ingesting a source idempotent.
+    """
+    output_path = os.path.join(partition_dir(table_root, date_str), name or new_shard_name())
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    if isinstance(df, pa.Table):
+        pq.write_table(df, tmp_path)
+    else:
+        df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+class ShardWriter:
+    """
+    Write one parquet shard into a date partition a batch at a time
+
+    Batches are DataFrames or Arrow tables. Placement and the atomic rename
+    on close match write_shard, but only the batch being written is held in
+    memory. Every batch is cast to the first
+    one's schema; categorical columns get int32 dictionary indices and
+    all-null object columns are typed as strings, so batches with different
+    category counts or missing values still agree.
+    """
+
+    def __init__(self, table_root: str, date_str: str, name: Optional[str] = None):
+        self.path = os.path.join(partition_dir(table_root, date_str), name or new_shard_name())
+        self.writer: Optional[pq.ParquetWriter] = None
+        self.rows = 0
+
+    def write(self, df: Union[pd.DataFrame, pa.Table]) -> None:
+        table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            fields = []
+            for field in table.schema:
+                if pa.types.is_dictionary(field.type):
+                    field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                elif pa.types.is_null(field.type):
+                    field = field.with_type(pa.string())
+                fields.append(field)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.writer = pq.ParquetWriter(f"{self.path}.tmp", pa.schema(fields, metadata=table.schema.metadata))
+        self.writer.write_table(table.cast(self.writer.schema))
+        self.rows += len(df)
+
+    def close(self) -> str:
+        """Finish the shard and move it into place; returns its path, or "" if nothing was written"""
+        if self.writer is None:
+            return ""
+        self.writer.close()
+        os.replace(f"{self.path}.tmp", self.path)
+        return self.path
+
+
+COMPACTION_JOURNAL = "_compaction.json"
+
+
+def superseded_files(partition: str) -> Set[str]:
+    """
+    Inputs of a compaction whose output is in place but whose inputs are not yet deleted
+
+    Normally empty; only non-empty if a compaction was interrupted mid-swap.
+    """
+    journal = read_json(os.path.join(partition, COMPACTION_JOURNAL), None)
+    if journal and os.path.exists(os.path.join(partition, journal["output"])):
+        return {os.path.join(partition, name) for name in journal["inputs"]}
+    return set()
+
+
+def partition_files(table_root: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
+    """Parquet files of a table, pruned to partitions within [start_date, end_date]"""
+    files = []
+    superseded = {}
+    for path in sorted(glob.glob(os.path.join(table_root, "date=*", "*.parquet"))):
+        partition = os.path.dirname(path)
+        date_str = os.path.basename(partition)[len("date="):]
+        if (start_date and date_str < start_date) or (end_date and date_str > end_date):
+            continue
+        if partition not in superseded:
+            superseded[partition] = superseded_files(partition)
+        if path not in superseded[partition]:
+            files.append(path)
+    return files
+
+
+def rewrite_without(path: str, column: str, value) -> None:
+    """Atomically drop the rows of one parquet file where `column` equals `value`"""
+    df = pd.read_parquet(path)
+    kept = df[df[column] != value]
+    if kept.empty:
+        os.remove(path)
+        return
+    tmp_path = f"{path}.tmp"
+    kept.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+BATCH_ROOT = "storage/_batch"
+BATCH_MARKER = os.path.join(BATCH_ROOT, "BATCH.json")
+
+
+def files_under(root: str) -> Iterator[str]:
+    for directory, _, names in os.walk(root):
+        for name in names:
+            yield os.path.join(directory, name)
+
+
+def begin_batch(roots: Sequence[str]) -> None:
+    """
+    Open a pipeline run's batch over the lake paths it derives from Bronze
+
+    A batch a failed run left open is rolled back first. The files under
+    `roots` are then hard-linked into a snapshot, one link per file: lake
+    writes replace files rather than change them, so the snapshot keeps
+    what every path held when the batch opened. The marker is written last,
+    so a half-built snapshot is never rolled back to.
+    """
+    roll_back_batch()
+    shutil.rmtree(BATCH_ROOT, ignore_errors=True)
+    for root in roots:
+        for path in files_under(root):
+            link = os.path.join(BATCH_ROOT, "snapshot", path)
+            os.makedirs(os.path.dirname(link), exist_ok=True)
+            os.link(path, link)
+    write_json(BATCH_MARKER, {"roots": list(roots), "opened_at": datetime.now().isoformat(timespec="seconds")})
+
+
+def commit_batch() -> None:
+    """Close the open batch, keeping everything it wrote; removing the marker is the commit point"""
+    if os.path.exists(BATCH_MARKER):
+        os.remove(BATCH_MARKER)
+    shutil.rmtree(BATCH_ROOT, ignore_errors=True)
+
+
+def roll_back_batch() -> None:
+    """
+    Put the paths of a batch left open back as they were when it opened
+
+    Files written since are removed and replaced ones are restored from the
+    snapshot. Restoring links rather than moving them keeps the snapshot
+    whole, so a rollback cut short is simply run again.
+    """
+    batch = read_json(BATCH_MARKER, None)
+    if not batch:
+        return
+    for root in batch["roots"]:
+        for path in list(files_under(root)):
+            if not os.path.exists(os.path.join(BATCH_ROOT, "snapshot", path)):
+                os.remove(path)
+        for directory, _, _ in sorted(os.walk(root), reverse=True):
+            if not os.listdir(directory):
+                os.rmdir(directory)
+        for link in files_under(os.path.join(BATCH_ROOT, "snapshot", root)):
+            path = os.path.relpath(link, os.path.join(BATCH_ROOT, "snapshot"))
+            if os.path.exists(path) and os.path.samefile(link, path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(f"{path}.tmp"):
+                os.remove(f"{path}.tmp")
+            os.link(link, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+    commit_batch()
+
+
+def read_json(path: str, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def write_json(path: str, data) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
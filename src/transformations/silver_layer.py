@@ -1,41 +1,175 @@
 import pandas as pd
 import numpy as np
-from dagster import op, In, Out
+import pyarrow as pa
+import pyarrow.compute as pc
+from dagster import op, In, Nothing, Out
 import os
 import re
+from typing import Iterator, Optional, Tuple
 
-@op(ins={"bronze_df": In(pd.DataFrame)}, out=Out(pd.DataFrame))
-def silver_layer_transformation(bronze_df: pd.DataFrame) -> pd.DataFrame:
-    """Clean and standardize data for Silver layer"""
-    
-    df = bronze_df.copy()
-    
-    # Clean price column
-    df['price_numeric'] = df['price'].str.replace('$', '').str.replace(',', '')
-    df['price_numeric'] = pd.to_numeric(df['price_numeric'], errors='coerce')
-    
-    # Clean mileage column
-    df['mileage_numeric'] = df['mileage'].str.replace('k', '000').str.replace('K', '000').str.replace(',', '')
-    df['mileage_numeric'] = pd.to_numeric(df['mileage_numeric'], errors='coerce')
-    
-    # Remove duplicates
-    df = df.drop_duplicates(subset=['link'])
-    
-    # Filter valid data
-    df = df[df['year'] != 'N/A']
-    df = df[df['make'] != 'N/A']
-    df = df[df['price_numeric'] > 500]
-    
-    return df
+from src.transformations.bronze_layer import release_shards
+from src.transformations.cross_posts import CrossPostIndex, Fingerprints, fingerprint_table, table_fingerprints
+from src.transformations.dedup_index import DedupIndex, listing_dates
+from src.transformations.gold_partials import GOLD_PARTIALS_ROOT
+from src.transformations.lake import begin_batch, commit_batch, write_shard
+from src.transformations.timeseries import TIMESERIES_ROOT
+from src.transformations.vocabulary import Vocabulary
+
+SILVER_ROOT = "storage/silver/car_listings"
+# What a pipeline run derives from Bronze: Silver with its indexes, Gold and the time series
+DERIVED_ROOTS = [os.path.dirname(SILVER_ROOT), os.path.dirname(GOLD_PARTIALS_ROOT), TIMESERIES_ROOT]
+
+# RE2 patterns for pyarrow's extract_regex; the number may carry thousands separators and a decimal part
+PRICE_PATTERN = r'(?P<number>\d[\d,]*(?:\.\d+)?)'
+MILEAGE_PATTERN = r'(?P<number>\d[\d,]*(?:\.\d+)?)\s*(?P<suffix>[kK]?)'
+
+CATEGORICAL_COLUMNS = ['make', 'model', 'city', 'dealer_type']
+MIN_PRICE = 500
+MAX_PRICE = np.iinfo(np.int32).max
+
+
+def extract_number(values: pd.Series, pattern: str) -> np.ndarray:
+    """
+    First number matched by `pattern` in each value, as float64 (NaN where none)
+
+    Runs as Arrow compute kernels over the whole column. A non-empty `suffix`
+    group ("74.5k") multiplies the number by 1000.
+    """
+    strings = pa.array(values, type=pa.string(), from_pandas=True)
+    parts = pc.extract_regex(strings, pattern).flatten()
+    number = pc.cast(pc.replace_substring(parts[0], ",", ""), pa.float64())
+    if len(parts) > 1:
+        number = pc.multiply(number, pc.if_else(pc.equal(parts[1], ""), 1.0, 1000.0))
+    return number.to_numpy(zero_copy_only=False)
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def silver_partitions(df: pd.DataFrame) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Rows grouped by the Silver partition they belong in: the day they were scraped
+
+    The daily, streaming and backfill paths all partition Silver this way,
+    so a listing lands in the same partition whichever path wrote it.
+    """
+    days = listing_dates(df)
+    for day in np.unique(days):
+        yield str(day), df[days == day]
+
+
+def clean_listings(bronze_df: pd.DataFrame, vocabulary: Optional[Vocabulary] = None) -> pd.DataFrame:
+    """
+    Parse, validate and type Bronze listings in one vectorized pass
+
+    Rows are kept if they are the first occurrence of their link and have a
+    year, a make and a price within (MIN_PRICE, MAX_PRICE]; the whole mask is
+    built first and applied once. Surviving rows get compact dtypes: int16
+    year, int32 price, float32 mileage and categorical make/model/city/dealer_type.
+    Make and model are mapped to canonical names by `vocabulary` (the saved
+    one if not given), and any aliases it learns are saved.
+    """
+    price = extract_number(bronze_df['price'], PRICE_PATTERN)
+    mileage = extract_number(bronze_df['mileage'], MILEAGE_PATTERN)
+    year = pd.to_numeric(bronze_df['year'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+    with np.errstate(invalid='ignore'):
+        keep = (
+            ~bronze_df['link'].duplicated().to_numpy()
+            & ~np.isnan(year)
+            & bronze_df['make'].notna().to_numpy()
+            & (bronze_df['make'] != 'N/A').to_numpy()
+            & (price > MIN_PRICE)
+            & (price <= MAX_PRICE)
+        )
+
+    df = bronze_df.loc[keep].copy()
+    df['year'] = year[keep].astype(np.int16)
+    df['price_numeric'] = price[keep].astype(np.int32)
+    df['mileage_numeric'] = mileage[keep].astype(np.float32)
+    vocabulary = vocabulary or Vocabulary.load()
+    df['make'], df['model'] = vocabulary.normalize(df['make'], df['model'])
+    if vocabulary.changed:
+        vocabulary.save()
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype('category')
+
+    return df.reset_index(drop=True)
+
+
+@op(ins={"bronze_df": In(pd.DataFrame)}, out={"silver_df": Out(pd.DataFrame), "cross_post_batch": Out(pa.Table)})
+def silver_layer_transformation(bronze_df: pd.DataFrame):
+    """
+    Clean and standardize data for Silver layer
+
+    Rows are tagged against the dedup index as new, seen (same link and price
+    as already stored) or price_changed, so the full day's batch still flows
+    on to Gold while Silver storage keeps each listing once per price. They
+    are also tagged cross_post where the cross-post index finds the same car
+    listed earlier under another link, so Gold counts it once. The rows'
+    fingerprints and clusters are passed on as cross_post_batch, for
+    commit_silver_batch to add to the index without matching them again.
+
+    The run's batch is opened first (see lake.begin_batch), rolling back
+    whatever a run that failed before its commit wrote, so the rows are
+    tagged against the indexes as that run found them.
+    """
+    begin_batch(DERIVED_ROOTS)
+
+    if bronze_df.empty:
+        return bronze_df.assign(price_numeric=pd.Series(dtype=np.int32), mileage_numeric=pd.Series(dtype=np.float32),
+                                listing_status=pd.Series(dtype='category'), first_seen=pd.Series(dtype='datetime64[s]'),
+                                last_seen=pd.Series(dtype='datetime64[s]'), cross_post=pd.Series(dtype=bool)), \
+            fingerprint_table(Fingerprints.empty(), np.empty(0, np.uint64))
+
+    before_mb = frame_memory_mb(bronze_df)
+    df = clean_listings(bronze_df)
+    print(f"Silver: kept {len(df)} of {len(bronze_df)} rows, {before_mb:.1f} MB -> {frame_memory_mb(df):.1f} MB")
+
+    df = DedupIndex.load().tag(df)
+    counts = df['listing_status'].value_counts()
+    print(f"Silver: {counts['new']} new, {counts['seen']} seen, {counts['price_changed']} price changed")
+
+    batch = Fingerprints.of(df)
+    cluster = CrossPostIndex.load().match(batch)
+    df['cross_post'] = cluster != batch.link_hash
+    print(f"Silver: {df['cross_post'].sum()} cross-posts of listings under other links")
+
+    return df, fingerprint_table(batch, cluster)
 
 @op(ins={"silver_df": In(pd.DataFrame)}, out=Out(str))
 def save_silver_data(silver_df: pd.DataFrame) -> str:
-    """Save cleaned data to Silver layer"""
-    
-    date_str = pd.Timestamp.now().strftime('%Y-%m-%d')
-    output_path = f"storage/silver/car_listings/date={date_str}/data.parquet"
-    
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    silver_df.to_parquet(output_path, index=False)
-    
+    """Append new and re-priced listings to Silver, a new shard in the partition of each day scraped"""
+
+    changed = silver_df[silver_df['listing_status'] != 'seen'] if not silver_df.empty else silver_df
+    output_path = ""
+    for date_str, part in silver_partitions(changed):
+        write_shard(part, SILVER_ROOT, date_str)
+        output_path = SILVER_ROOT
     return output_path
+
+@op(ins={"silver_df": In(pd.DataFrame), "cross_post_batch": In(pa.Table),
+         "bronze_shards": In(list, default_value=[]), "outputs_saved": In(Nothing)})
+def commit_silver_batch(silver_df: pd.DataFrame, cross_post_batch: pa.Table, bronze_shards: list) -> None:
+    """
+    Commit the run's batch once Silver, Gold and the time series all hold it
+
+    The dedup and cross-post indexes are updated first, then the batch is
+    committed, and only then are the Bronze shards released from the
+    pending queue. A run that fails before the commit is rolled back by the
+    next one, which is handed the same shards again and tags them new as
+    before, so every output gets the batch exactly once. A run that fails
+    after the commit but before the release hands on shards whose rows the
+    indexes already hold, so they count as seen.
+    """
+
+    if not silver_df.empty:
+        index = DedupIndex.load()
+        index.update(silver_df)
+        index.save()
+        cross_posts = CrossPostIndex.load()
+        cross_posts.add(*table_fingerprints(cross_post_batch))
+        cross_posts.save()
+    commit_batch()
+    release_shards(bronze_shards)
@@ -0,0 +1,60 @@
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative error guarantees (DDSketch)
+
+    Positive values are counted in logarithmic buckets, where bucket i covers
+    (gamma^(i-1), gamma^i] and gamma = (1 + a) / (1 - a). Any quantile is then
+    estimated within relative error `a` of a value at that rank. Two sketches
+    with the same accuracy merge exactly by adding bucket counts, so per-day
+    sketches roll up into any date range without the underlying rows.
+    """
+
+    def __init__(self, keys: Optional[np.ndarray] = None, counts: Optional[np.ndarray] = None,
+                 relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.keys = np.asarray(keys if keys is not None else [], dtype=np.int32)
+        self.counts = np.asarray(counts if counts is not None else [], dtype=np.int64)
+
+    @staticmethod
+    def bucket_keys(values: np.ndarray, relative_accuracy: float = 0.01) -> np.ndarray:
+        """Bucket of each value; values <= 0 and NaN are not representable and must be dropped first"""
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        return np.ceil(np.log(values) / np.log(gamma)).astype(np.int32)
+
+    @classmethod
+    def from_values(cls, values, relative_accuracy: float = 0.01) -> "QuantileSketch":
+        values = np.asarray(values, dtype=np.float64)
+        values = values[values > 0]
+        keys, counts = np.unique(cls.bucket_keys(values, relative_accuracy), return_counts=True)
+        return cls(keys, counts, relative_accuracy)
+
+    @classmethod
+    def merge_all(cls, sketches: Iterable["QuantileSketch"], relative_accuracy: float = 0.01) -> "QuantileSketch":
+        sketches = list(sketches)
+        if any(s.relative_accuracy != relative_accuracy for s in sketches):
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        if not sketches:
+            return cls(relative_accuracy=relative_accuracy)
+        keys, inverse = np.unique(np.concatenate([s.keys for s in sketches]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([s.counts for s in sketches]), minlength=len(keys))
+        return cls(keys, counts.astype(np.int64), relative_accuracy)
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        return self.merge_all([self, other], self.relative_accuracy)
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return float("nan")
+        rank = q * (self.count - 1)
+        i = int(np.searchsorted(np.cumsum(self.counts), rank, side="right"))
+        return float(2 * self.gamma ** int(self.keys[i]) / (self.gamma + 1))
@@ -0,0 +1,225 @@
+import os
+import shutil
+from typing import Dict, Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+from dagster import Field, In, Out, job, op
+
+from src.transformations.bronze_layer import (
+    BRONZE_ROOT, INGESTION_LOG, add_lineage, changed_raw_files, drop_previous_shards, raw_convert_options,
+    queued_shards, record_ingestion, release_shards, shard_name_for,
+)
+from src.transformations.cross_posts import CROSS_POST_INDEX_PATH, CrossPostIndex, Fingerprints
+from src.transformations.dedup_index import DEDUP_INDEX_PATH, DedupIndex
+from src.transformations.gold_layer import GOLD_TABLES, merge_into_partitions
+from src.transformations.gold_partials import (
+    RunningAggregate, build_make_counts, build_partials, build_price_histogram, combine_partials,
+)
+from src.transformations.lake import ShardWriter, begin_batch, commit_batch, read_json
+from src.transformations.silver_layer import DERIVED_ROOTS, SILVER_ROOT, clean_listings, silver_partitions
+from src.transformations.timeseries import SERIES_KEY, PriceLog, price_changes, write_rollups
+from src.transformations.vocabulary import Vocabulary
+
+STAGING_ROOT = "storage/_staging"
+DEFAULT_BATCH_SIZE = 100_000
+# Generous size of one raw CSV row, used to size reader blocks to about batch_size rows
+RAW_ROW_BYTES = 512
+
+PRICE_CHANGE_SCHEMA = pa.schema([('link_hash', pa.uint64()), ('day', pa.date32()), ('price', pa.int32())])
+
+BATCH_SIZE_CONFIG = {
+    "batch_size": Field(int, default_value=DEFAULT_BATCH_SIZE,
+                        description="Rows per record batch; bounds peak memory regardless of input size"),
+}
+
+
+def stream_raw_csv(path: str, batch_size: int) -> Iterator[pd.DataFrame]:
+    """A raw CSV as frames of about `batch_size` rows, parsed one block at a time"""
+    reader = pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(block_size=min(batch_size * RAW_ROW_BYTES, 1 << 30)),
+        # Titles are quoted and may span lines, which a block boundary must not split
+        parse_options=pv.ParseOptions(newlines_in_values=True),
+        convert_options=raw_convert_options(path),
+    )
+    for batch in reader:
+        df = batch.to_pandas()
+        df.columns = df.columns.str.lower()
+        yield df
+
+
+def running_aggregates() -> Dict[str, RunningAggregate]:
+    """The Gold tables and series rollups, each folded batch by batch"""
+    return {
+        "city_partials": RunningAggregate(build_partials, GOLD_TABLES["city_partials"][1]),
+        "price_histogram": RunningAggregate(build_price_histogram, GOLD_TABLES["price_histogram"][1]),
+        "make_counts": RunningAggregate(build_make_counts, GOLD_TABLES["make_counts"][1]),
+        "series_rollups": RunningAggregate(lambda df: build_partials(df, SERIES_KEY),
+                                           lambda df: combine_partials(df, SERIES_KEY + ['date'])),
+    }
+
+
+@op(out=Out(list), config_schema=BATCH_SIZE_CONFIG)
+def stream_bronze_ingestion(context) -> list:
+    """
+    Stream new raw CSVs into Bronze and return the shard paths written
+
+    Same ingestion log and shard naming as bronze_layer_ingestion, but each
+    file is read and written one record batch at a time, into one shard per
+    date it covers. Shards the scraper published straight into Bronze, and
+    shards a failed Silver run left on the pending queue, are passed on as
+    they are.
+    """
+    batch_size = context.op_config["batch_size"]
+    log = read_json(INGESTION_LOG, {"files": {}})
+    written = []
+
+    for path, stat, seen in changed_raw_files(log):
+        writers: Dict[str, ShardWriter] = {}
+        rows = 0
+        for df in stream_raw_csv(path, batch_size):
+            add_lineage(df, path)
+            for data_date, part in df.groupby('data_date', sort=True):
+                date_str = str(data_date)
+                if date_str not in writers:
+                    writers[date_str] = ShardWriter(BRONZE_ROOT, date_str, shard_name_for(path))
+                writers[date_str].write(part)
+            rows += len(df)
+
+        shards = [writers[date_str].close() for date_str in sorted(writers)]
+        drop_previous_shards(path, seen, shards)
+        record_ingestion(log, path, stat, rows, shards)
+        written.extend(shards)
+        print(f"Bronze: streamed {rows} rows from {path}")
+
+    queued = [shard for shard in queued_shards(log) if shard not in written]
+    written.extend(queued)
+    if queued:
+        print(f"Bronze: {len(queued)} queued shards, published by the scraper or left by a failed run")
+    if not written:
+        print("Bronze: no new raw files or queued shards")
+    return written
+
+
+@op(
+    ins={"bronze_paths": In(list)},
+    out={"silver_path": Out(str), "aggregates_path": Out(str)},
+    config_schema=BATCH_SIZE_CONFIG,
+)
+def stream_silver_transformation(context, bronze_paths: list):
+    """
+    Clean, tag and store Bronze shards batch by batch, folding each into running aggregates
+
+    Each batch is tagged against the dedup and cross-post indexes as updated
+    by the batches before it, so a listing repeated across batches is
+    counted once, as it is within one frame. Past a batch, only the indexes
+    (one entry per listing seen) and the running aggregates (one row per
+    group) are kept in memory; Silver rows and price changes are written out as they
+    go. Everything for Gold and the time series is staged for
+    merge_stream_aggregates, and the updated indexes for commit_stream_batch.
+    As in silver_layer_transformation, the run's batch is opened first.
+    """
+    batch_size = context.op_config["batch_size"]
+    begin_batch(DERIVED_ROOTS)
+    index = DedupIndex.load()
+    cross_posts = CrossPostIndex.load()
+    vocabulary = Vocabulary.load()
+    silver: Dict[str, ShardWriter] = {}
+    aggregates = running_aggregates()
+    # Whatever a failed run staged went with its batch
+    shutil.rmtree(STAGING_ROOT, ignore_errors=True)
+    staging = os.path.join(STAGING_ROOT, context.run_id)
+    os.makedirs(staging, exist_ok=True)
+    changes = pq.ParquetWriter(os.path.join(staging, "price_changes.parquet"), PRICE_CHANGE_SCHEMA)
+    rows = kept = 0
+
+    for path in bronze_paths:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            rows += batch.num_rows
+            df = clean_listings(batch.to_pandas(), vocabulary)
+            if df.empty:
+                continue
+            df = index.tag(df)
+            index.update(df)
+            fingerprints = Fingerprints.of(df)
+            cluster = cross_posts.match(fingerprints)
+            cross_posts.add(fingerprints, cluster)
+            df['cross_post'] = cluster != fingerprints.link_hash
+            changed = df[df['listing_status'] != 'seen']
+            if not changed.empty:
+                for date_str, part in silver_partitions(changed):
+                    if date_str not in silver:
+                        silver[date_str] = ShardWriter(SILVER_ROOT, date_str)
+                    silver[date_str].write(part)
+                link_hash, day, price = price_changes(changed)
+                changes.write_table(pa.table([link_hash, day, price], schema=PRICE_CHANGE_SCHEMA))
+            for aggregate in aggregates.values():
+                aggregate.add(df)
+            kept += len(df)
+
+    changes.close()
+    for writer in silver.values():
+        writer.close()
+    silver_path = SILVER_ROOT if silver else ""
+    if kept:
+        index.save(os.path.join(staging, os.path.basename(DEDUP_INDEX_PATH)))
+        cross_posts.save(os.path.join(staging, os.path.basename(CROSS_POST_INDEX_PATH)))
+    print(f"Silver: kept {kept} of {rows} rows, {sum(writer.rows for writer in silver.values())} new or re-priced")
+
+    for name, aggregate in aggregates.items():
+        result = aggregate.result()
+        if not result.empty:
+            result.to_parquet(os.path.join(staging, f"{name}.parquet"), index=False)
+
+    return silver_path, staging
+
+
+@op(ins={"aggregates_path": In(str)}, out=Out(str))
+def merge_stream_aggregates(aggregates_path: str) -> str:
+    """Fold a streamed run's staged aggregates into Gold and the time series, passing the staging path on"""
+
+    def staged(name: str) -> str:
+        return os.path.join(aggregates_path, f"{name}.parquet")
+
+    for name, (root, combine) in GOLD_TABLES.items():
+        if os.path.exists(staged(name)):
+            merge_into_partitions(pd.read_parquet(staged(name)), root, combine)
+    if os.path.exists(staged("series_rollups")):
+        write_rollups(pd.read_parquet(staged("series_rollups")))
+    changes = pq.read_table(staged("price_changes")) if os.path.exists(staged("price_changes")) else None
+    if changes is not None and changes.num_rows:
+        log = PriceLog.load().append(*(changes.column(name).to_numpy() for name in PriceLog.COLUMNS))
+        print(f"Time series: price log has {len(log)} entries")
+    return aggregates_path
+
+
+@op(ins={"bronze_paths": In(list), "staging": In(str)})
+def commit_stream_batch(bronze_paths: list, staging: str) -> None:
+    """
+    Commit a streamed run once Gold and the time series hold it, as commit_silver_batch does
+
+    The staged indexes are moved into place, the batch is committed, and
+    only then are the Bronze shards released and the staging dropped.
+    """
+    for path in (DEDUP_INDEX_PATH, CROSS_POST_INDEX_PATH):
+        staged = os.path.join(staging, os.path.basename(path))
+        if os.path.exists(staged):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(staged, path)
+    commit_batch()
+    release_shards(bronze_paths)
+
+    shutil.rmtree(staging, ignore_errors=True)
+    if os.path.isdir(STAGING_ROOT) and not os.listdir(STAGING_ROOT):
+        os.rmdir(STAGING_ROOT)
+
+
+@job
+def streaming_pipeline():
+    """Raw CSV → Bronze → Silver → Gold in bounded record batches, passing paths between ops"""
+    bronze_paths = stream_bronze_ingestion()
+    silver_path, aggregates_path = stream_silver_transformation(bronze_paths)
+    commit_stream_batch(bronze_paths, merge_stream_aggregates(aggregates_path))
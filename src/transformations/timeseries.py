@@ -0,0 +1,235 @@
+import glob
+import os
+import shutil
+import uuid
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dagster import op, In, Nothing, Out
+
+from src.transformations.dedup_index import link_hashes, listing_dates
+from src.transformations.gold_partials import build_partials, combine_partials, sketch_of
+from src.transformations.lake import read_json, write_json
+from src.transformations.sketches import QuantileSketch
+
+TIMESERIES_ROOT = "storage/timeseries"
+PRICE_LOG_ROOT = os.path.join(TIMESERIES_ROOT, "price_log")
+ROLLUP_ROOT = os.path.join(TIMESERIES_ROOT, "daily_rollups")
+SERIES_KEY = ['make', 'model', 'year', 'city']
+ROLLUP_ROW_GROUP_SIZE = 8192
+
+
+def latest_per_day(link_hash: np.ndarray, day: np.ndarray, price: np.ndarray):
+    """Entries sorted by hash then day, keeping the last given price of a repeated (link, day)"""
+    # Stable sort keeps later entries after earlier ones with the same (hash, day)
+    order = np.lexsort((day, link_hash))
+    link_hash, day, price = link_hash[order], day[order], price[order]
+    last = np.ones(len(link_hash), dtype=bool)
+    last[:-1] = (link_hash[1:] != link_hash[:-1]) | (day[1:] != day[:-1])
+    return link_hash[last], day[last], price[last]
+
+
+class PriceLog:
+    """
+    Price changes of every listing, for point lookups by link
+
+    Stored as segments of three numpy columns (link hash, day, price), each
+    sorted by hash then day and memory-mapped on load, so looking up one
+    listing is a binary search per segment that touches a few pages,
+    whatever the log's size. An append writes its entries as a new segment,
+    merged with the newest segments no larger than it, so segments grow
+    geometrically: a day's append costs about its own size times the
+    number of segments, and there are O(log entries) segments, not one
+    rewrite of the whole history.
+
+    CURRENT.json lists the live segments, oldest first, and is flipped only
+    once a new segment is complete, so readers always see a complete log.
+    Segments an append merged away are deleted by the next append, so a
+    reader that loaded the previous list can still finish.
+
+    Layout: <root>/CURRENT.json and <root>/<segment>/{link_hash,day,price}.npy
+    """
+
+    COLUMNS = ('link_hash', 'day', 'price')
+
+    def __init__(self, root: str, names: List[str], segments: List[Tuple[np.ndarray, np.ndarray, np.ndarray]]):
+        self.root = root
+        self.names = names
+        self.segments = segments
+
+    @classmethod
+    def load(cls, root: str = PRICE_LOG_ROOT) -> "PriceLog":
+        names = read_json(os.path.join(root, "CURRENT.json"), {"segments": []})["segments"]
+        segments = [tuple(np.load(os.path.join(root, name, f"{column}.npy"), mmap_mode='r') for column in cls.COLUMNS)
+                    for name in names]
+        return cls(root, names, segments)
+
+    def __len__(self) -> int:
+        """Entries stored, counting a (link, day) repeated in several segments once per segment"""
+        return sum(len(link_hash) for link_hash, _, _ in self.segments)
+
+    def lookup(self, link: str):
+        """Days and prices recorded for one listing, oldest first, as arrays"""
+        key = pd.util.hash_array(np.array([link], dtype=object))[0]
+        days, prices = [np.empty(0, 'datetime64[D]')], [np.empty(0, np.int32)]
+        for link_hash, day, price in self.segments:
+            start = np.searchsorted(link_hash, key, side='left')
+            end = np.searchsorted(link_hash, key, side='right')
+            days.append(np.asarray(day[start:end]))
+            prices.append(np.asarray(price[start:end]))
+        days, prices = np.concatenate(days), np.concatenate(prices)
+        # Segments are oldest first, so a day found in several keeps the newest price
+        _, days, prices = latest_per_day(np.zeros(len(days), np.uint64), days, prices)
+        return days, prices
+
+    def history(self, link: str) -> pd.DataFrame:
+        """Every recorded (date, price) of one listing, oldest first"""
+        days, prices = self.lookup(link)
+        return pd.DataFrame({'date': days, 'price': prices})
+
+    def append(self, link_hash: np.ndarray, day: np.ndarray, price: np.ndarray) -> "PriceLog":
+        """Write the entries as a new segment; a repeated (link, day) keeps the newer price"""
+        if not len(link_hash):
+            return self
+        names, segments = list(self.names), list(self.segments)
+        merged = []
+        columns = [np.asarray(link_hash), np.asarray(day, 'datetime64[D]'), np.asarray(price, np.int32)]
+        while segments and len(segments[-1][0]) <= len(columns[0]):
+            merged.append(names.pop())
+            older = segments.pop()
+            columns = [np.concatenate([old, new]) for old, new in zip(older, columns)]
+        columns = latest_per_day(*columns)
+
+        name = uuid.uuid4().hex[:12]
+        os.makedirs(os.path.join(self.root, name))
+        for column, values in zip(self.COLUMNS, columns):
+            np.save(os.path.join(self.root, name, f"{column}.npy"), values)
+
+        current_path = os.path.join(self.root, "CURRENT.json")
+        previous = read_json(current_path, None) or {}
+        write_json(current_path, {"segments": names + [name], "merged": merged})
+        for old in previous.get("merged", []):
+            shutil.rmtree(os.path.join(self.root, old), ignore_errors=True)
+        return PriceLog.load(self.root)
+
+
+def price_changes(silver_df: pd.DataFrame):
+    """Link hashes, days and prices of a Silver batch's new and re-priced listings"""
+    changed = silver_df[silver_df['listing_status'] != 'seen'] if 'listing_status' in silver_df else silver_df
+    return (link_hashes(changed['link']), listing_dates(changed),
+            changed['price_numeric'].to_numpy(dtype=np.int32))
+
+
+def month_path(month: str, root: str = ROLLUP_ROOT) -> str:
+    return os.path.join(root, f"month={month}", "data.parquet")
+
+
+def write_rollups(rollups: pd.DataFrame, root: str = ROLLUP_ROOT) -> None:
+    """
+    Merge daily (make, model, year, city) rollups into their month files
+
+    Each month file is sorted by series then date with small row groups, so a
+    query for one series reads only the row groups whose min/max stats can
+    contain it.
+    """
+    date_codes, dates = pd.factorize(rollups['date'].astype(str))
+    months = pd.Index(dates).str[:7][date_codes]
+    for month, part in rollups.groupby(months):
+        path = month_path(month, root)
+        existing = pd.read_parquet(path) if os.path.exists(path) else None
+        same_dates = pd.Series(False)
+        if existing is not None:
+            # Only rows of the batch's own dates need merging; the rest of the month is kept as is
+            same_dates = existing['date'].isin(part['date'].astype(str).unique())
+            if same_dates.any():
+                part = pd.concat([existing[same_dates], part], ignore_index=True)
+        if same_dates.any() or part.duplicated(SERIES_KEY + ['date']).any():
+            part = combine_partials(part, SERIES_KEY + ['date'])
+        else:
+            part = part.reset_index(drop=True)
+        for column in ['make', 'model', 'city', 'date']:
+            part[column] = part[column].astype(str)
+        part['year'] = part['year'].astype(np.int16)
+        if existing is not None:
+            part = pd.concat([existing[~same_dates], part], ignore_index=True)
+        part = part.sort_values(SERIES_KEY + ['date'], ignore_index=True)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        pq.write_table(pa.Table.from_pandas(part, preserve_index=False), tmp_path,
+                       row_group_size=ROLLUP_ROW_GROUP_SIZE, compression="zstd", write_statistics=True)
+        os.replace(tmp_path, path)
+
+
+def read_series(make: str, model: str, year: int, city: Optional[str] = None,
+                start_date: Optional[str] = None, end_date: Optional[str] = None,
+                root: str = ROLLUP_ROOT) -> pd.DataFrame:
+    """
+    Daily rollup rows of one (make, model, year), optionally in one city
+
+    Only the month files overlapping the range are opened, and within them
+    only the row groups whose statistics can hold the series.
+    """
+    filters = [('make', '=', make), ('model', '=', model), ('year', '=', int(year))]
+    if city:
+        filters.append(('city', '=', city))
+    if start_date:
+        filters.append(('date', '>=', start_date))
+    if end_date:
+        filters.append(('date', '<=', end_date))
+
+    frames = []
+    for path in sorted(glob.glob(os.path.join(root, "month=*", "data.parquet"))):
+        month = os.path.basename(os.path.dirname(path))[len("month="):]
+        if (start_date and month < start_date[:7]) or (end_date and month > end_date[:7]):
+            continue
+        frames.append(pq.read_table(path, filters=filters).to_pandas())
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def price_trend(make: str, model: str, year: int, city: Optional[str] = None,
+                start_date: Optional[str] = None, end_date: Optional[str] = None,
+                root: str = ROLLUP_ROOT) -> pd.DataFrame:
+    """Daily listing count, average and median price of one (make, model, year)"""
+    rows = read_series(make, model, year, city, start_date, end_date, root)
+    if rows.empty:
+        return pd.DataFrame(columns=['date', 'listing_count', 'avg_price', 'median_price'])
+
+    by_date = combine_partials(rows, ['date'])
+    return pd.DataFrame({
+        'date': by_date['date'],
+        'listing_count': by_date['listing_count'],
+        'avg_price': (by_date['price_sum'] / by_date['listing_count']).round(2),
+        'median_price': [sketch_of(row).quantile(0.5) for _, row in by_date.iterrows()],
+    })
+
+
+def range_median(make: str, model: str, year: int, city: Optional[str] = None,
+                 start_date: Optional[str] = None, end_date: Optional[str] = None,
+                 root: str = ROLLUP_ROOT) -> float:
+    """Median price of one (make, model, year) across a whole date range, from merged daily sketches"""
+    rows = read_series(make, model, year, city, start_date, end_date, root)
+    return QuantileSketch.merge_all(sketch_of(row) for _, row in rows.iterrows()).quantile(0.5)
+
+
+@op(ins={"silver_df": In(pd.DataFrame), "silver_saved": In(Nothing)}, out=Out(str))
+def update_timeseries(silver_df: pd.DataFrame) -> str:
+    """
+    Append the batch's price changes to the price log and its daily rollups to the month files
+
+    Runs once Silver has committed the batch, so a failed Silver run leaves
+    nothing here to be counted twice when it is retried.
+    """
+
+    if silver_df.empty:
+        return ""
+
+    log = PriceLog.load()
+    log = log.append(*price_changes(silver_df))
+    write_rollups(build_partials(silver_df, SERIES_KEY))
+    print(f"Time series: price log has {len(log)} entries")
+
+    return TIMESERIES_ROOT
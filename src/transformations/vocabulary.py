@@ -0,0 +1,269 @@
+import difflib
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.transformations.lake import read_json, write_json
+
+VOCABULARY_ALIASES_PATH = "storage/silver/_vocabulary_aliases.json"
+
+# How close (difflib ratio) an unseen string must be to a canonical one to be taken for it
+FUZZY_CUTOFF = 0.85
+# Model words matched against the vocabulary; "Grand Cherokee Limited 4x4" needs at most the first two
+MAX_MODEL_WORDS = 4
+
+# Spellings of a make that are not just its canonical name in another case or punctuation
+MAKE_ALIASES = {
+    "Chevrolet": ["Chevy", "Chev"],
+    "Volkswagen": ["VW", "Volks"],
+    "Mercedes-Benz": ["Mercedes", "Benz", "MB", "Merc"],
+    "Land Rover": ["Landrover", "Range Rover"],
+    "Mini": ["MINI Cooper"],
+    "Ram": ["RAM Trucks", "Dodge Ram"],
+    "Infiniti": ["Infinity"],
+    "Lamborghini": ["Lambo"],
+}
+
+# Models per make, most specific first within a family so "Silverado 1500 LT" finds "Silverado 1500"
+MODELS = {
+    "Acura": ["ILX", "Integra", "MDX", "RDX", "RL", "RSX", "TL", "TLX", "TSX"],
+    "Audi": ["A3", "A4", "A5", "A6", "A7", "A8", "Q3", "Q5", "Q7", "Q8", "R8", "S4", "TT", "e-tron"],
+    "BMW": ["1 Series", "2 Series", "3 Series", "4 Series", "5 Series", "7 Series", "M2", "M3", "M4", "M5",
+            "X1", "X3", "X5", "X6", "X7", "Z4", "i3"],
+    "Buick": ["Enclave", "Encore", "Envision", "LaCrosse", "Lucerne", "Regal"],
+    "Cadillac": ["ATS", "CTS", "DTS", "Escalade", "SRX", "XT4", "XT5", "XT6", "XTS"],
+    "Chevrolet": ["Avalanche", "Blazer", "Bolt", "Camaro", "Colorado", "Corvette", "Cruze", "Equinox", "Express",
+                  "HHR", "Impala", "Malibu", "Silverado 1500", "Silverado 2500", "Silverado 3500", "Silverado",
+                  "Sonic", "Spark", "Suburban", "Tahoe", "Trailblazer", "Traverse", "Trax", "Volt"],
+    "Chrysler": ["200", "300", "Pacifica", "PT Cruiser", "Sebring", "Town & Country"],
+    "Dodge": ["Avenger", "Caliber", "Challenger", "Charger", "Dakota", "Dart", "Durango", "Grand Caravan",
+              "Journey", "Neon", "Viper"],
+    "Ferrari": ["360", "458", "488", "California", "F430", "Portofino", "Roma"],
+    "Fiat": ["124 Spider", "500", "500X"],
+    "Ford": ["Bronco Sport", "Bronco", "E-350", "Edge", "Escape", "Expedition", "Explorer", "F-150", "F-250",
+             "F-350", "Fiesta", "Flex", "Focus", "Fusion", "Maverick", "Mustang", "Ranger", "Taurus", "Transit"],
+    "GMC": ["Acadia", "Canyon", "Envoy", "Savana", "Sierra 1500", "Sierra 2500", "Sierra", "Terrain", "Yukon XL",
+            "Yukon"],
+    "Honda": ["Accord", "CR-V", "Civic", "Element", "Fit", "HR-V", "Insight", "Odyssey", "Passport", "Pilot",
+              "Ridgeline"],
+    "Hyundai": ["Accent", "Elantra", "Genesis", "Kona", "Palisade", "Santa Fe", "Sonata", "Tucson", "Veloster"],
+    "Infiniti": ["FX35", "G35", "G37", "Q50", "Q60", "QX50", "QX60", "QX80"],
+    "Jaguar": ["E-Pace", "F-Pace", "F-Type", "XE", "XF", "XJ"],
+    "Jeep": ["Cherokee", "Compass", "Gladiator", "Grand Cherokee", "Liberty", "Patriot", "Renegade", "Wrangler"],
+    "Kia": ["Forte", "K5", "Niro", "Optima", "Rio", "Sedona", "Sorento", "Soul", "Sportage", "Stinger", "Telluride"],
+    "Lamborghini": ["Aventador", "Gallardo", "Huracan", "Urus"],
+    "Land Rover": ["Defender", "Discovery Sport", "Discovery", "LR4", "Range Rover Evoque", "Range Rover Sport",
+                   "Range Rover Velar", "Range Rover"],
+    "Lexus": ["CT", "ES", "GS", "GX", "IS", "LS", "LX", "NX", "RC", "RX"],
+    "Lincoln": ["Aviator", "Continental", "MKC", "MKX", "MKZ", "Navigator", "Town Car"],
+    "Maserati": ["Ghibli", "GranTurismo", "Levante", "Quattroporte"],
+    "Mazda": ["CX-3", "CX-30", "CX-5", "CX-9", "Mazda3", "Mazda6", "MX-5 Miata", "Miata", "Tribute"],
+    "Mercedes-Benz": ["A-Class", "C-Class", "CLA", "CLS", "E-Class", "G-Class", "GL", "GLA", "GLC", "GLE", "GLS",
+                      "ML", "S-Class", "SL", "SLK", "Sprinter"],
+    "Mini": ["Clubman", "Cooper", "Countryman"],
+    "Mitsubishi": ["Eclipse", "Galant", "Lancer", "Mirage", "Outlander Sport", "Outlander"],
+    "Nissan": ["350Z", "370Z", "Altima", "Armada", "Frontier", "Juke", "Kicks", "Leaf", "Maxima", "Murano",
+               "Pathfinder", "Rogue Sport", "Rogue", "Sentra", "Titan", "Versa", "Xterra"],
+    "Porsche": ["911", "Boxster", "Cayenne", "Cayman", "Macan", "Panamera", "Taycan"],
+    "Ram": ["1500", "2500", "3500", "ProMaster"],
+    "Subaru": ["Ascent", "BRZ", "Crosstrek", "Forester", "Impreza", "Legacy", "Outback", "WRX"],
+    "Suzuki": ["Grand Vitara", "SX4", "Samurai", "Vitara"],
+    "Tesla": ["Model 3", "Model S", "Model X", "Model Y", "Roadster"],
+    "Toyota": ["4Runner", "86", "Avalon", "C-HR", "Camry", "Corolla", "FJ Cruiser", "Highlander", "Land Cruiser",
+               "Prius", "RAV4", "Sequoia", "Sienna", "Supra", "Tacoma", "Tundra", "Venza", "Yaris"],
+    "Volkswagen": ["Atlas", "Beetle", "CC", "Golf GTI", "GTI", "Golf", "Jetta", "Passat", "Tiguan", "Touareg"],
+    "Volvo": ["S60", "S80", "S90", "V60", "XC40", "XC60", "XC70", "XC90"],
+}
+
+# Model spellings that aren't a prefix or near-miss of the canonical name: trims naming the model line
+MODEL_ALIASES = {
+    "BMW": {"3 Series": ["320i", "325i", "328i", "330i", "335i", "340i"],
+            "5 Series": ["525i", "528i", "530i", "535i", "540i", "550i"],
+            "7 Series": ["740i", "745i", "750i"]},
+    "Chevrolet": {"Silverado 1500": ["1500 Silverado"]},
+    "Mazda": {"Mazda3": ["3"], "Mazda6": ["6"], "MX-5 Miata": ["MX-5", "MX5"]},
+    "Mercedes-Benz": {"C-Class": ["C250", "C300", "C350", "C43", "C63"], "E-Class": ["E320", "E350", "E400", "E550"],
+                      "S-Class": ["S500", "S550", "S560"], "GLC": ["GLC 300"], "GLE": ["GLE 350"], "ML": ["ML350"]},
+    "Volkswagen": {"Golf GTI": ["GTI Golf"]},
+}
+
+_WORD_SPLIT_RE = re.compile(r"[\s\-_/.,]+")
+_WORD_RE = re.compile(r"[^\s\-_/.,]+")
+
+
+def words(value: str) -> List[str]:
+    """Lowercased words of a make or model, split on spaces and punctuation"""
+    return [word for word in _WORD_SPLIT_RE.split(value.lower()) if word]
+
+
+def compact(value: str) -> str:
+    """Matching key: lowercase with the separators removed, so "CR-V", "cr v" and "CRV" agree"""
+    return "".join(words(value))
+
+
+# Exact-match hash maps from compact spelling to canonical name
+MAKE_INDEX = {compact(make): make for make in MODELS}
+MAKE_INDEX.update({compact(alias): make for make, aliases in MAKE_ALIASES.items() for alias in aliases})
+MODEL_INDEX: Dict[str, Dict[str, str]] = {
+    make: {compact(model): model for model in models} for make, models in MODELS.items()
+}
+for _make, _aliases in MODEL_ALIASES.items():
+    MODEL_INDEX[_make].update({compact(alias): model for model, aliases in _aliases.items() for alias in aliases})
+
+
+@lru_cache(maxsize=16384)
+def fuzzy_make(key: str) -> Optional[str]:
+    """Canonical make closest to an unseen compact spelling, if any is close enough"""
+    match = difflib.get_close_matches(key, MAKE_INDEX, n=1, cutoff=FUZZY_CUTOFF)
+    return MAKE_INDEX[match[0]] if match else None
+
+
+@lru_cache(maxsize=65536)
+def fuzzy_model(make: str, prefixes: Tuple[str, ...]) -> Optional[str]:
+    """Canonical model of `make` closest to the longest of a model's word prefixes that is close to any"""
+    index = MODEL_INDEX.get(make, {})
+    for prefix in prefixes:
+        # Very short keys ("lt", "ex") are as likely a trim as a typo
+        if len(prefix) < 4:
+            continue
+        match = difflib.get_close_matches(prefix, index, n=1, cutoff=FUZZY_CUTOFF)
+        if match:
+            return index[match[0]]
+    return None
+
+
+@lru_cache(maxsize=65536)
+def glued_model(make: str, word: str) -> Optional[str]:
+    """Canonical model of `make` whose key starts a word it was run into ("CamrySport", "Tahoe149")"""
+    index = MODEL_INDEX.get(make, {})
+    # Longest key first, so "rav4" wins over a shorter model that also fits
+    for key in sorted(index, key=len, reverse=True):
+        if len(key) >= 3 and len(word) > len(key) and word.startswith(key):
+            return index[key]
+    return None
+
+
+def display_word(word: str) -> str:
+    """A fallback model word as it would be written: "ridgeline" -> "Ridgeline", "gx460" -> "GX460" """
+    return word.capitalize() if word.isalpha() else word.upper()
+
+
+def fallback_model(raw: str) -> str:
+    """
+    An unknown model's name: its first word, or first two when the first is
+    a number or initials ("9-3 aero" -> "9-3"), re-cased if all one case
+    """
+    spans = list(_WORD_RE.finditer(raw))[:2]
+    if len(spans) > 1 and not (spans[0].group().isdigit() or len(spans[0].group()) <= 2):
+        spans = spans[:1]
+    name = raw[spans[0].start():spans[-1].end()]
+    if name.islower() or name.isupper():
+        name = _WORD_RE.sub(lambda word: display_word(word.group()), name)
+    return name
+
+
+class Vocabulary:
+    """
+    Maps raw make and model strings to canonical names
+
+    A make is looked up by its compact spelling (lowercase, no separators)
+    in an exact-match map of canonical names and known aliases ("Chevy",
+    "VW"). A model is looked up the same way under its canonical make, by
+    its longest leading run of words that is a known model, so "civic ex-l
+    sedan" and "Civic EX" both find "Civic". A string the maps don't know
+    goes to the learned alias table, then to a model its first word starts
+    with ("CamrySport"), then to a cached fuzzy match against the canonical
+    names (typos such as "Camery"), and failing that keeps its make as
+    written (title-cased if all one case), or its model's first word (see
+    fallback_model). Strings that resolved to a canonical name are added to
+    the learned table, which is saved as JSON, so they are exact lookups
+    next time and can be reviewed or corrected by hand. Fallbacks are not:
+    every junk spelling would otherwise stay in the table for good, and
+    they are cheap to redo.
+
+    Layout: {"makes": {key: make}, "models": {make: {key: model}}}
+    """
+
+    def __init__(self, path: str, learned: dict):
+        self.path = path
+        self.learned_makes: Dict[str, str] = learned.get("makes", {})
+        self.learned_models: Dict[str, Dict[str, str]] = learned.get("models", {})
+        # Set once this run learns an alias
+        self.changed = False
+
+    @classmethod
+    def load(cls, path: str = VOCABULARY_ALIASES_PATH) -> "Vocabulary":
+        return cls(path, read_json(path, {}))
+
+    def save(self) -> None:
+        write_json(self.path, {"makes": dict(sorted(self.learned_makes.items())),
+                               "models": {make: dict(sorted(models.items()))
+                                          for make, models in sorted(self.learned_models.items())}})
+        self.changed = False
+
+    def make(self, raw: str) -> str:
+        key = compact(raw)
+        canonical = MAKE_INDEX.get(key) or self.learned_makes.get(key)
+        if canonical:
+            return canonical
+        canonical = fuzzy_make(key)
+        if canonical:
+            self.learned_makes[key] = canonical
+            self.changed = True
+            return canonical
+        raw = raw.strip()
+        return raw.title() if raw.isupper() or raw.islower() else raw
+
+    def model(self, make: str, raw: str) -> str:
+        model_words = words(raw)
+        if not model_words:
+            return raw
+        prefixes = tuple("".join(model_words[:n]) for n in range(min(len(model_words), MAX_MODEL_WORDS), 0, -1))
+        index = MODEL_INDEX.get(make, {})
+        for prefix in prefixes:
+            if prefix in index:
+                return index[prefix]
+
+        key = " ".join(model_words)
+        learned = self.learned_models.get(make, {})
+        if key in learned:
+            return learned[key]
+        canonical = glued_model(make, model_words[0]) or fuzzy_model(make, prefixes)
+        if not canonical:
+            return fallback_model(raw)
+        self.learned_models.setdefault(make, {})[key] = canonical
+        self.changed = True
+        return canonical
+
+    def normalize(self, makes: pd.Series, models: pd.Series) -> Tuple[pd.Categorical, pd.Categorical]:
+        """
+        Canonical make and model for each row, as categoricals
+
+        Each distinct make, and each distinct (canonical make, model) pair,
+        is resolved once; rows are mapped back through factorized codes, so
+        the per-row work is integer array operations. Nulls stay null.
+        """
+        make_codes, raw_makes = pd.factorize(makes, sort=False)
+        make_values, make_lookup = pd.factorize(pd.Index([self.make(str(raw)) for raw in raw_makes]), sort=True)
+        # -1 (null) stays -1
+        canonical_make_codes = np.where(make_codes >= 0, make_values.take(make_codes, mode="clip"), -1)
+
+        model_codes, raw_models = pd.factorize(models, sort=False)
+        pair_codes = canonical_make_codes.astype(np.int64) * (len(raw_models) + 1) + (model_codes + 1)
+        pair_inverse, pairs = pd.factorize(pair_codes, sort=False)
+        pair_models = []
+        for pair in pairs:
+            make_code, model_code = divmod(int(pair), len(raw_models) + 1)
+            if model_code == 0:
+                pair_models.append(None)
+            elif make_code < 0:
+                pair_models.append(str(raw_models[model_code - 1]))
+            else:
+                pair_models.append(self.model(make_lookup[make_code], str(raw_models[model_code - 1])))
+
+        model_values, model_lookup = pd.factorize(pd.Series(pair_models, dtype=object), sort=True)
+        return (pd.Categorical.from_codes(canonical_make_codes, make_lookup),
+                pd.Categorical.from_codes(model_values[pair_inverse], model_lookup))
@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def lake(tmp_path, monkeypatch):
+    """Run each test in an empty directory, so storage/ paths point at a fresh lake"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def bronze_frame():
+    """Bronze-shaped listings from a list of dicts, each overriding a valid 2018 Honda Civic listing"""
+    return make_bronze_frame
+
+
+def make_bronze_frame(rows: list) -> pd.DataFrame:
+    base = {
+        'title': "2018 Honda Civic EX", 'year': "2018", 'make': "Honda", 'model': "Civic",
+        'price': "$15,000", 'mileage': "74k", 'city': "newyork", 'dealer_type': "Unknown",
+        'data_date': "2024-01-01",
+    }
+    return pd.DataFrame([{**base, 'link': f"https://newyork.craigslist.org/ctd/d/{i}.html", **row}
+                         for i, row in enumerate(rows)])
@@ -0,0 +1,50 @@
+import os
+
+from dagster import build_op_context
+
+from src.transformations.backfill import backfill, backfill_lake
+from src.transformations.bronze_layer import BRONZE_ROOT
+from src.transformations.lake import partition_files, write_shard
+from src.transformations.silver_layer import SILVER_ROOT, commit_silver_batch, save_silver_data, silver_layer_transformation
+
+STATS_KEYS = {"dates", "workers", "city_shards", "cells", "rows", "seconds", "rows_per_second",
+              "clean_seconds", "aggregate_seconds", "merge_seconds"}
+
+
+def run_backfill_lake() -> dict:
+    return backfill_lake(build_op_context(op_config={"workers": 1, "city_shards": 1}))
+
+
+def test_backfill_over_a_day_with_no_valid_rows(bronze_frame):
+    write_shard(bronze_frame([{}, {'price': "$9,000"}]), BRONZE_ROOT, "2024-01-01")
+    write_shard(bronze_frame([{'price': "N/A", 'data_date': "2024-01-02"}]), BRONZE_ROOT, "2024-01-02")
+    stats = backfill(workers=1, city_shards=1)
+    assert stats['rows'] == 2
+
+
+def test_backfill_with_nothing_to_clean_reports_full_stats(bronze_frame):
+    write_shard(bronze_frame([{'price': "N/A"}]), BRONZE_ROOT, "2024-01-01")
+    stats = run_backfill_lake()
+    assert set(stats) == STATS_KEYS
+    assert stats['dates'] == 1 and stats['rows'] == 0
+    assert not os.path.exists("storage/_backfill")
+
+
+def test_backfill_without_bronze_reports_full_stats():
+    stats = run_backfill_lake()
+    assert set(stats) == STATS_KEYS
+    assert stats['dates'] == 0 and stats['rows'] == 0
+
+
+def test_backfill_partitions_silver_like_the_daily_pipeline(bronze_frame):
+    bronze = bronze_frame([{}, {'price': "$9,000", 'data_date': "2024-01-02"}])
+    silver, cross_post_batch = silver_layer_transformation(bronze)
+    save_silver_data(silver)
+    commit_silver_batch(silver, cross_post_batch)
+    daily = sorted(os.path.dirname(path) for path in partition_files(SILVER_ROOT))
+
+    write_shard(bronze.iloc[:1], BRONZE_ROOT, "2024-01-01")
+    write_shard(bronze.iloc[1:], BRONZE_ROOT, "2024-01-02")
+    backfill(workers=1, city_shards=1)
+    assert sorted(os.path.dirname(path) for path in partition_files(SILVER_ROOT)) == daily
+    assert [os.path.basename(partition) for partition in daily] == ["date=2024-01-01", "date=2024-01-02"]
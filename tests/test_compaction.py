@@ -0,0 +1,71 @@
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+import src.transformations.compaction as compaction
+from src.transformations.compaction import compact_partition, compact_table
+from src.transformations.lake import COMPACTION_JOURNAL, partition_files, write_json
+from src.transformations.silver_layer import SILVER_ROOT
+
+PARTITION = os.path.join(SILVER_ROOT, "date=2024-01-01")
+
+
+@pytest.fixture
+def shards():
+    """Three small Silver shards in one old partition"""
+    os.makedirs(PARTITION)
+    for i, city in enumerate(["newyork", "chicago", "miami"]):
+        pd.DataFrame({'city': [city] * 2, 'make': ["Toyota", "Honda"], 'price_numeric': [i, i + 10]}).to_parquet(
+            os.path.join(PARTITION, f"part-{i}.parquet"), index=False)
+    return sorted(glob.glob(os.path.join(PARTITION, "*.parquet")))
+
+
+def silver_rows() -> pd.DataFrame:
+    return pd.concat([pd.read_parquet(path) for path in partition_files(SILVER_ROOT)]).sort_values(
+        'price_numeric', ignore_index=True)
+
+
+def test_compaction_interrupted_after_the_swap_is_rolled_forward(shards, monkeypatch):
+    expected = silver_rows()
+
+    def crash(partition):
+        raise OSError("killed")
+
+    with monkeypatch.context() as patch:
+        # Crash once the output is in place, before the inputs are deleted
+        patch.setattr(compaction, "finish_interrupted", crash)
+        with pytest.raises(OSError):
+            compact_partition(PARTITION, ["city", "make"], 1024, "zstd")
+
+    assert all(os.path.exists(path) for path in shards)
+    assert [os.path.basename(path)[:len("compacted-")] for path in partition_files(SILVER_ROOT)] == ["compacted-"]
+    pd.testing.assert_frame_equal(silver_rows(), expected)
+
+    compact_table(SILVER_ROOT, ["city", "make"])
+
+    assert not any(os.path.exists(path) for path in shards)
+    assert not os.path.exists(os.path.join(PARTITION, COMPACTION_JOURNAL))
+    assert len(glob.glob(os.path.join(PARTITION, "*.parquet"))) == 1
+    pd.testing.assert_frame_equal(silver_rows(), expected)
+
+
+def test_compaction_interrupted_before_the_swap_is_rolled_back(shards, monkeypatch):
+    expected = silver_rows()
+
+    def journal_then_crash(path, data):
+        write_json(path, data)
+        raise OSError("killed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(compaction, "write_json", journal_then_crash)
+        with pytest.raises(OSError):
+            compact_partition(PARTITION, ["city", "make"], 1024, "zstd")
+
+    assert partition_files(SILVER_ROOT) == shards
+    compaction.finish_interrupted(PARTITION)
+
+    assert not os.path.exists(os.path.join(PARTITION, COMPACTION_JOURNAL))
+    assert sorted(glob.glob(os.path.join(PARTITION, "*.parquet"))) == shards
+    pd.testing.assert_frame_equal(silver_rows(), expected)
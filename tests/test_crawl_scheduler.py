@@ -0,0 +1,52 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from dagster import RunRequest, SkipReason, build_schedule_context
+
+from src.pipelines.cars.cars.comprehensive_pipeline import adaptive_car_scraping_schedule
+from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES
+from src.pipelines.cars.cars.crawl_scheduler import CityPlan, CrawlStats, due_cities
+
+TICK = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def new_york_time(monkeypatch):
+    """A host whose local time is five hours behind UTC"""
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.delenv("TZ")
+    time.tzset()
+
+
+def test_city_due_by_elapsed_utc_time_on_a_non_utc_host(new_york_time):
+    stats = CrawlStats()
+    stats.observe("nyc", np.arange(10, dtype=np.uint64), [0.5], at=TICK - timedelta(hours=6))
+    plans = {"nyc": CityPlan(12, 5)}
+
+    assert due_cities(plans, stats, TICK) == {}
+    assert due_cities(plans, stats, TICK + timedelta(hours=6)) == {"nyc": 5}
+
+
+def test_naive_times_are_rejected():
+    stats = CrawlStats()
+
+    with pytest.raises(ValueError, match="timezone-aware"):
+        stats.observe("nyc", np.arange(10, dtype=np.uint64), [0.5], at=datetime(2024, 1, 1, 12))
+    with pytest.raises(ValueError, match="timezone-aware"):
+        due_cities({"nyc": CityPlan(12, 5)}, stats, datetime(2024, 1, 1, 12))
+
+
+def test_schedule_skips_cities_crawled_since_the_last_tick(new_york_time):
+    first = adaptive_car_scraping_schedule(build_schedule_context(scheduled_execution_time=TICK))
+    assert isinstance(first, RunRequest)
+    stats = CrawlStats()
+    for code in TARGET_CITIES:
+        stats.observe(code, np.arange(10, dtype=np.uint64), [0.5], at=TICK)
+    stats.save()
+
+    later = adaptive_car_scraping_schedule(build_schedule_context(scheduled_execution_time=TICK + timedelta(hours=1)))
+    assert isinstance(later, SkipReason)
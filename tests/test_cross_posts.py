@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from src.transformations.cross_posts import (BANDS, MAX_BUCKET, NUM_HASHES, RETENTION_DAYS, CrossPostIndex,
+                                             Fingerprints, batch_candidates)
+from src.transformations.dedup_index import link_hashes
+
+
+def silver_frame(rows: list) -> pd.DataFrame:
+    """Silver-shaped listings, each dict overriding a 2018 Honda Civic; links are numbered by `link`"""
+    base = {'title': "2018 Honda Civic EX", 'year': 2018, 'price_numeric': 15_000, 'mileage_numeric': 74_000.0,
+            'data_date': "2024-01-01"}
+    return pd.DataFrame([{**base, **row, 'link': f"https://newyork.craigslist.org/ctd/d/{row['link']}.html"}
+                         for row in rows])
+
+
+CAMRY = {'title': "2015 Toyota Camry LE", 'year': 2015, 'price_numeric': 9_000, 'mileage_numeric': 120_000.0}
+
+
+def matched(index: CrossPostIndex, df: pd.DataFrame) -> np.ndarray:
+    batch = Fingerprints.of(df)
+    cluster = index.match(batch)
+    index.add(batch, cluster)
+    return cluster
+
+
+def shared_band_fingerprints(links: np.ndarray) -> Fingerprints:
+    """Identical cars under `links` that share only their first band key, so LSH is their one way to meet"""
+    n = len(links)
+    bands = np.arange(1, n * BANDS + 1, dtype=np.uint64).reshape(n, BANDS) + links[:, None] * np.uint64(1000)
+    bands[:, 0] = 7
+    return Fingerprints(links.astype(np.uint64), np.full(n, np.datetime64("2024-01-01"), 'datetime64[D]'),
+                        np.full(n, 2018, np.int16), np.full(n, 15_000, np.int32), np.full(n, 74_000, np.float32),
+                        np.zeros((n, NUM_HASHES), np.uint8), bands)
+
+
+def test_same_car_clustered_within_a_batch_and_across_runs():
+    index = CrossPostIndex.load()
+    first = silver_frame([{'link': 0}, {'link': 1, 'title': "2018 HONDA CIVIC EX - call now"}, {'link': 2, **CAMRY}])
+    hashes = link_hashes(first['link'])
+
+    cluster = matched(index, first)
+
+    assert cluster[0] == cluster[1] == min(hashes[0], hashes[1])
+    assert cluster[2] == hashes[2]
+
+    later = silver_frame([{'link': 3, 'data_date': "2024-01-02"}, {'link': 0, 'data_date': "2024-01-02"},
+                          {'link': 4, 'title': "2018 Honda Civic EX", 'price_numeric': 21_000}])
+    cluster_later = matched(index, later)
+
+    assert cluster_later[0] == cluster_later[1] == cluster[0]
+    assert cluster_later[2] == link_hashes(later['link'])[2]
+    assert len(index) == 5
+
+
+def test_bucket_above_max_bucket_is_skipped():
+    def pairs(n: int) -> int:
+        return sum(len(i) for i, _ in batch_candidates(shared_band_fingerprints(np.arange(1, n + 1)).bands))
+
+    assert pairs(MAX_BUCKET) == MAX_BUCKET * (MAX_BUCKET - 1) // 2
+    assert pairs(MAX_BUCKET + 1) == 0
+
+    for stored, joined in ((MAX_BUCKET, True), (MAX_BUCKET + 1, False)):
+        entries = shared_band_fingerprints(np.arange(1, stored + 1))
+        index = CrossPostIndex("unused.parquet", entries, entries.link_hash.copy())
+        newcomer = shared_band_fingerprints(np.array([10_000]))
+        assert (index.match(newcomer)[0] != 10_000) == joined
+
+
+def test_incremental_inserts_after_add_equal_a_fresh_rebuild():
+    index = CrossPostIndex.load()
+    matched(index, silver_frame([{'link': 0}, {'link': 1, **CAMRY}, {'link': 2, 'price_numeric': 30_000}]))
+    # Build the lookup tables, so the next add has to keep them up to date
+    index.link_table()
+    index.band_tables()
+
+    matched(index, silver_frame([{'link': 3}, {'link': 4, **CAMRY, 'year': 2016}, {'link': 1, **CAMRY},
+                                 {'link': 5, 'title': "2012 Ford F-150 XLT", 'year': 2012}, {'link': 5}]))
+    rebuilt = CrossPostIndex(index.path, index.entries, index.cluster)
+
+    for (keys, order), (fresh_keys, fresh_order) in zip(index.band_tables(), rebuilt.band_tables()):
+        np.testing.assert_array_equal(keys, fresh_keys)
+        np.testing.assert_array_equal(np.sort(order), np.sort(fresh_order))
+    for band, (keys, order) in enumerate(index.band_tables()):
+        np.testing.assert_array_equal(index.entries.bands[order, band], keys)
+    np.testing.assert_array_equal(index.link_table()[0], rebuilt.link_table()[0])
+    np.testing.assert_array_equal(index.link_table()[1], rebuilt.link_table()[1])
+
+
+def test_prune_drops_listings_not_seen_within_retention():
+    index = CrossPostIndex.load()
+    last_day = pd.Timestamp("2024-03-01")
+    matched(index, silver_frame([
+        {'link': 0, 'data_date': str((last_day - pd.Timedelta(days=RETENTION_DAYS + 1)).date())},
+        {'link': 1, 'data_date': str((last_day - pd.Timedelta(days=RETENTION_DAYS + 1)).date()), **CAMRY},
+        {'link': 2, 'data_date': str((last_day - pd.Timedelta(days=RETENTION_DAYS)).date()), 'year': 2019},
+    ]))
+    # Seen again on the last day, so kept
+    matched(index, silver_frame([{'link': 1, 'data_date': str(last_day.date()), **CAMRY}]))
+
+    index.save()
+    loaded = CrossPostIndex.load()
+
+    kept = link_hashes(silver_frame([{'link': 1}, {'link': 2}])['link'])
+    assert sorted(loaded.entries.link_hash) == sorted(kept)
+    assert loaded.lookup(kept)[1].all()
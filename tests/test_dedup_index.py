@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from src.transformations.dedup_index import DEDUP_INDEX_PATH, DedupIndex
+
+
+def batch(day: str, prices: dict) -> pd.DataFrame:
+    return pd.DataFrame({
+        'link': [f"https://newyork.craigslist.org/ctd/d/{i}.html" for i in prices],
+        'price_numeric': list(prices.values()),
+        'data_date': day,
+    })
+
+
+def test_second_batch_tagged_new_seen_and_price_changed():
+    index = DedupIndex.load()
+    first = index.tag(batch("2024-01-01", {1: 15_000, 2: 9_000}))
+    index.update(first)
+
+    second = index.tag(batch("2024-01-03", {3: 7_000, 1: 15_000, 2: 8_500}))
+    index.update(second)
+
+    assert first['listing_status'].tolist() == ["new", "new"]
+    assert second['listing_status'].tolist() == ["new", "seen", "price_changed"]
+    assert second['first_seen'].tolist() == [pd.Timestamp("2024-01-03"), pd.Timestamp("2024-01-01"),
+                                             pd.Timestamp("2024-01-01")]
+    assert second['last_seen'].isna().tolist() == [True, False, False]
+    assert second['last_seen'].iloc[1] == pd.Timestamp("2024-01-01")
+    assert len(index) == 3
+    assert (index.hashes[1:] > index.hashes[:-1]).all()
+
+
+def test_index_saved_and_loaded_tags_like_the_one_in_memory():
+    index = DedupIndex.load()
+    index.update(batch("2024-01-01", {1: 15_000, 2: 9_000, 3: 7_000}))
+    index.update(batch("2024-01-02", {2: 8_500}))
+    index.save()
+
+    loaded = DedupIndex.load(DEDUP_INDEX_PATH)
+    later = batch("2024-01-05", {2: 8_500, 3: 6_000, 4: 12_000})
+
+    for column in ('hashes', 'first_seen', 'last_seen', 'last_price'):
+        np.testing.assert_array_equal(getattr(loaded, column), getattr(index, column))
+    pd.testing.assert_frame_equal(loaded.tag(later), index.tag(later))
+    assert loaded.tag(later)['listing_status'].tolist() == ["seen", "price_changed", "new"]
+    assert loaded.tag(later)['last_seen'].iloc[0] == pd.Timestamp("2024-01-02")
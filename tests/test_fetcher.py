@@ -0,0 +1,87 @@
+import socket
+import time
+
+from benchmarks.local_server import serve_search_pages
+from src.pipelines.cars.cars.comprehensive_scraping import TARGET_CITIES
+from src.pipelines.cars.cars.fetcher import ConcurrentFetcher, HostRateLimiter
+from src.pipelines.cars.cars.http_cache import HTTPCache
+
+CITIES = list(TARGET_CITIES)[:6]
+LATENCY = 0.2
+
+
+def fetch_cities(max_concurrency: int):
+    with serve_search_pages(latency=LATENCY) as server, \
+            ConcurrentFetcher(max_concurrency=max_concurrency, per_host_interval=0) as fetcher:
+        start = time.perf_counter()
+        results = list(fetcher.fetch_all({city: server.url_template.format(city_code=city) for city in CITIES}))
+        return results, time.perf_counter() - start, server.request_count
+
+
+def test_fetch_all_overlaps_requests_up_to_max_concurrency():
+    results, concurrent_seconds, requests = fetch_cities(max_concurrency=len(CITIES))
+
+    assert sorted(result.key for result in results) == sorted(CITIES)
+    assert all(result.status == 200 and result.error is None for result in results)
+    assert all(f"/{result.key}/" in result.url and b"cl-static-search-result" in result.content for result in results)
+    assert requests == len(CITIES)
+    # All six are in flight at once, so the batch takes about one request's latency
+    assert concurrent_seconds < len(CITIES) * LATENCY / 2
+
+    _, capped_seconds, _ = fetch_cities(max_concurrency=2)
+    assert capped_seconds >= len(CITIES) / 2 * LATENCY
+
+
+def test_rate_limiter_spaces_requests_per_host_only():
+    limiter = HostRateLimiter(min_interval=0.1)
+
+    waits = [limiter.wait("newyork"), limiter.wait("newyork"), limiter.wait("chicago"), limiter.wait("newyork")]
+
+    assert waits[0] == 0.0
+    assert waits[1] > 0.05
+    assert waits[2] == 0.0
+    assert waits[3] > 0.05
+
+
+def test_failed_request_is_returned_not_raised():
+    with socket.socket() as closed:
+        closed.bind(("127.0.0.1", 0))
+        port = closed.getsockname()[1]
+    with ConcurrentFetcher(per_host_interval=0, timeout=2) as fetcher:
+        result = fetcher.fetch(f"http://127.0.0.1:{port}/newyork", key="newyork")
+
+    assert result.key == "newyork"
+    assert result.status == 0
+    assert result.content == b""
+    assert result.error.startswith("ConnectionError")
+
+
+def test_stale_cache_entry_revalidated_with_a_304():
+    cache = HTTPCache(ttl=0)
+    with serve_search_pages(latency=0) as server, ConcurrentFetcher(per_host_interval=0, cache=cache) as fetcher:
+        url = server.url_template.format(city_code="newyork")
+        first = fetcher.fetch(url)
+        stored_at = cache.get(url).stored_at
+        second = fetcher.fetch(url)
+
+    assert (first.status, first.not_modified) == (200, False)
+    assert (second.status, second.not_modified, second.error) == (304, True, None)
+    assert second.content == first.content and b"cl-static-search-result" in second.content
+    assert cache.get(url).stored_at > stored_at
+    assert cache.stats.as_dict()["misses"] == 1 and cache.stats.as_dict()["revalidated"] == 1
+    assert server.bytes_sent == len(first.content)
+
+
+def test_304_without_a_cache_entry_is_an_error_not_an_empty_page():
+    with serve_search_pages(latency=0) as server:
+        url = server.url_template.format(city_code="newyork")
+        with ConcurrentFetcher(per_host_interval=0) as fetcher:
+            etag = fetcher.session.get(url).headers["ETag"]
+        # A validator sent along by the caller, with nothing cached to fall back on
+        with ConcurrentFetcher(per_host_interval=0, headers={"If-None-Match": etag}) as fetcher:
+            result = fetcher.fetch(url, key="newyork")
+
+    assert result.status == 304
+    assert result.content == b""
+    assert result.not_modified is False
+    assert result.error == "HTTP 304 with no cached copy"
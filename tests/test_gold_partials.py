@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from src.transformations.gold_layer import gold_layer_aggregation, save_gold_data
+from src.transformations.gold_partials import build_partials, city_rollup, city_stats, combine_partials
+
+
+def silver_batch(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'city': rng.choice(["newyork", "chicago", "miami"], rows),
+        'data_date': rng.choice(["2024-01-01", "2024-01-02", "2024-01-03"], rows),
+        'make': rng.choice(["Honda", "Toyota"], rows),
+        'model': rng.choice(["Civic", "Camry"], rows),
+        'price_numeric': rng.integers(1_000, 60_000, rows),
+        'mileage_numeric': np.where(rng.random(rows) < 0.2, np.nan, rng.uniform(0, 200_000, rows)),
+        'year': rng.integers(2000, 2024, rows),
+    })
+
+
+def direct_city_stats(silver: pd.DataFrame) -> pd.DataFrame:
+    by_city = silver.groupby('city')
+    return pd.DataFrame({
+        'avg_price': by_city['price_numeric'].mean(),
+        'median_price': by_city['price_numeric'].median(),
+        'listing_count': by_city.size(),
+        'avg_mileage': by_city['mileage_numeric'].mean(),
+        'avg_year': by_city['year'].mean(),
+    })
+
+
+def test_partials_merged_across_days_match_stats_computed_from_rows():
+    silver = silver_batch(3000, seed=0)
+
+    partials = build_partials(silver)
+    stats = city_stats(partials).astype({'city': str}).set_index('city').sort_index()
+    expected = direct_city_stats(silver)
+
+    assert len(partials) == 9
+    assert stats.index.tolist() == expected.index.tolist()
+    assert stats['listing_count'].tolist() == expected['listing_count'].tolist()
+    for column in ['avg_price', 'avg_mileage', 'avg_year']:
+        np.testing.assert_allclose(stats[column], expected[column], atol=0.01)
+    # Medians come from the sketch, within its 1% relative accuracy
+    np.testing.assert_allclose(stats['median_price'], expected['median_price'], rtol=0.02)
+
+
+def test_batches_saved_apart_roll_up_like_one_batch():
+    first, second = silver_batch(1000, seed=1), silver_batch(1500, seed=2)
+
+    for batch in (first, second):
+        save_gold_data(gold_layer_aggregation(batch))
+
+    whole = combine_partials(build_partials(pd.concat([first, second], ignore_index=True)), ['city', 'date'])
+    pd.testing.assert_frame_equal(city_rollup(), city_stats(whole))
+    assert city_rollup("2024-01-02", "2024-01-02")['listing_count'].sum() == sum(
+        (batch['data_date'] == "2024-01-02").sum() for batch in (first, second))
+    assert city_rollup("2024-02-01").empty
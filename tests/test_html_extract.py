@@ -0,0 +1,24 @@
+import pytest
+from dagster import DagsterInvalidConfigError, build_op_context
+
+from benchmarks.fixtures import render_search_page
+from src.pipelines.cars.cars.comprehensive_scraping import scrape_car_listings
+from src.pipelines.cars.cars.html_extract import BACKENDS, extract_listings
+
+
+def test_backends_extract_the_same_listings():
+    page = render_search_page("newyork", 20).encode()
+
+    lxml, bs4 = (extract_listings(page, backend) for backend in BACKENDS)
+
+    assert len(lxml) == 20
+    assert lxml == bs4
+
+
+def test_unknown_backend_is_rejected():
+    page = render_search_page("newyork", 2).encode()
+
+    with pytest.raises(ValueError, match="html5lib"):
+        extract_listings(page, "html5lib")
+    with pytest.raises(DagsterInvalidConfigError, match="html5lib"):
+        scrape_car_listings(build_op_context(op_config={"html_backend": "html5lib"}))
@@ -0,0 +1,137 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import src.transformations.silver_layer as silver_layer
+import src.transformations.streaming as streaming
+import src.transformations.timeseries as timeseries
+from definitions import defs
+from src.pipelines.cars.cars.comprehensive_scraping import CarListing, publish_run
+from src.pipelines.cars.cars.listing_buffer import ListingBuffer
+from src.pipelines.cars.cars.run_manifest import RunManifest
+from src.transformations.bronze_layer import BRONZE_ROOT, INGESTION_LOG, publish_listings
+from src.transformations.gold_partials import GOLD_PARTIALS_ROOT, city_rollup
+from src.transformations.lake import partition_files, read_json
+from src.transformations.silver_layer import SILVER_ROOT
+from src.transformations.timeseries import PriceLog
+
+
+@pytest.fixture
+def raw_csv(bronze_frame):
+    """A scraper CSV of three valid listings in the working directory"""
+    bronze_frame([{}, {'price': "$9,000"}, {'price': "$12,500"}]).drop(columns=['data_date']).assign(
+        scrape_date="2024-01-01 10:00:00", location="NYC").to_csv("car_listings_20240101.csv", index=False)
+
+
+def run(job_name: str):
+    return defs.get_job_def(job_name).execute_in_process(raise_on_error=False)
+
+
+def silver_rows() -> int:
+    return sum(len(pd.read_parquet(path)) for path in partition_files(SILVER_ROOT))
+
+
+def break_silver_run(patch: pytest.MonkeyPatch, job_name: str) -> None:
+    """Make the job's Silver op fail before it commits anything"""
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    if job_name == "data_processing_pipeline":
+        patch.setattr(silver_layer, "write_shard", fail)
+    else:
+        patch.setattr(streaming, "clean_listings", fail)
+
+
+@pytest.mark.parametrize("job_name", ["data_processing_pipeline", "streaming_pipeline"])
+def test_run_failing_after_silver_is_rolled_back_and_retried_once(raw_csv, monkeypatch, job_name):
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    with monkeypatch.context() as patch:
+        # The series rollups are written after Silver and the price log
+        patch.setattr(timeseries if job_name == "data_processing_pipeline" else streaming, "write_rollups", fail)
+        assert not run(job_name).success
+    assert silver_rows() == 3
+    assert read_json(INGESTION_LOG, {})["pending"]
+
+    assert run(job_name).success
+    assert silver_rows() == 3
+    assert city_rollup()['listing_count'].sum() == 3
+    assert len(PriceLog.load()) == 3
+    assert read_json(INGESTION_LOG, {})["pending"] == []
+    assert not os.path.exists("storage/_batch") and not os.path.exists("storage/_staging")
+
+
+@pytest.mark.parametrize("job_name", ["data_processing_pipeline", "streaming_pipeline"])
+def test_shards_handed_to_a_failed_silver_run_are_handed_on_again(raw_csv, monkeypatch, job_name):
+    with monkeypatch.context() as patch:
+        break_silver_run(patch, job_name)
+        assert not run(job_name).success
+    assert read_json(INGESTION_LOG, {})["pending"]
+    # Nothing downstream of Silver was written for the failed run, so nothing is counted twice
+    assert not partition_files(GOLD_PARTIALS_ROOT)
+
+    assert run(job_name).success
+    assert silver_rows() == 3
+    assert read_json(INGESTION_LOG, {})["pending"] == []
+
+    # Nothing is handed on twice once Silver has committed it
+    assert run(job_name).success
+    assert silver_rows() == 3
+
+
+@pytest.mark.parametrize("job_name", ["data_processing_pipeline", "streaming_pipeline"])
+def test_edited_raw_file_that_drops_a_date_leaves_no_stale_shard(bronze_frame, job_name):
+    def write_raw(days):
+        listings = bronze_frame([{}] * len(days)).drop(columns=['data_date'])
+        listings.assign(scrape_date=[f"{day} 10:00:00" for day in days], location="NYC").to_csv(
+            "car_listings_20240101.csv", index=False)
+
+    write_raw(["2024-01-01", "2024-01-02", "2024-01-02"])
+    assert run(job_name).success
+    write_raw(["2024-01-01", "2024-01-01"])
+    assert run(job_name).success
+
+    bronze = pd.concat([pd.read_parquet(path) for path in partition_files(BRONZE_ROOT)], ignore_index=True)
+    assert bronze['data_date'].astype(str).tolist() == ["2024-01-01", "2024-01-01"]
+    assert [path.split("/")[-2] for path in read_json(INGESTION_LOG, {})["files"]["car_listings_20240101.csv"]
+            ["shards"]] == ["date=2024-01-01"]
+
+
+def test_published_shards_survive_a_failed_silver_run(bronze_frame, monkeypatch):
+    listings = bronze_frame([{}, {'price': "$9,000"}]).drop(columns=['data_date']).assign(
+        scrape_date="2024-01-01 10:00:00", location="NYC")
+    shards = publish_listings([pa.Table.from_pandas(listings.astype({'year': float}), preserve_index=False)], "run-1")
+
+    with monkeypatch.context() as patch:
+        break_silver_run(patch, "data_processing_pipeline")
+        assert not run("data_processing_pipeline").success
+    assert read_json(INGESTION_LOG, {})["pending"] == shards
+
+    assert run("data_processing_pipeline").success
+    assert silver_rows() == 2
+    assert read_json(INGESTION_LOG, {})["pending"] == []
+
+
+def test_run_published_chunk_by_chunk_into_per_date_shards():
+    manifest = RunManifest.load_or_create("2024-01-01", {"newyork": "New York, NY"})
+    for chunk, day in enumerate(["2024-01-01", "2024-01-02", "2024-01-01"]):
+        buffer = ListingBuffer()
+        buffer.extend(CarListing("2018", "Honda", "Civic", "2018 Honda Civic", "$15,000", "74k", "Unknown", "NYC",
+                                 f"https://newyork.craigslist.org/ctd/d/{chunk}-{i}.html", "newyork", f"{day} 10:00:00")
+                      for i in range(2))
+        manifest.write_chunk("newyork", buffer, chunk + 1, (chunk + 1) * 2, [])
+
+    shards = publish_run(manifest, export_csv=True)
+
+    assert [shard.split("/")[-2] for shard in shards] == ["date=2024-01-01", "date=2024-01-02"]
+    # Each chunk was appended to its date's shard on its own
+    assert [pq.ParquetFile(shard).metadata.num_row_groups for shard in shards] == [2, 1]
+    assert [len(pd.read_parquet(shard)) for shard in shards] == [4, 2]
+    exported = pd.read_csv(manifest.data["output"])
+    assert exported['link'].tolist() == [f"https://newyork.craigslist.org/ctd/d/{chunk}-{i}.html"
+                                         for chunk in range(3) for i in range(2)]
+    log = read_json(INGESTION_LOG, {})
+    assert log["pending"] == shards
+    assert log["files"][manifest.data["output"]]["rows"] == 6
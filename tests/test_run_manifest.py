@@ -0,0 +1,55 @@
+from benchmarks.local_server import serve_search_pages
+from src.pipelines.cars.cars.comprehensive_scraping import scrape_run
+from src.pipelines.cars.cars.fetcher import ConcurrentFetcher, FetchResult
+from src.pipelines.cars.cars.run_manifest import RunManifest
+
+CITIES = {"newyork": "New York, NY", "chicago": "Chicago, IL"}
+
+
+class FailingFetcher(ConcurrentFetcher):
+    """Answers one URL with a 503 instead of fetching it"""
+
+    def __init__(self, failing_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.failing_url = failing_url
+
+    def fetch(self, url, key=None, rate_key=None):
+        if url == self.failing_url:
+            return FetchResult(key or url, url, 503, b"", 0.0, None)
+        return super().fetch(url, key, rate_key)
+
+
+def committed_links(manifest: RunManifest) -> list:
+    return [link for chunk in manifest.committed_chunks() for link in chunk.column("link").to_pylist()]
+
+
+def test_city_failing_partway_resumes_after_its_last_committed_chunk():
+    with serve_search_pages(latency=0, pages_per_city=3) as server:
+        third_page = server.url_template.format(city_code="newyork") + "?s=240"
+        with FailingFetcher(third_page, per_host_interval=0) as fetcher:
+            first = RunManifest.load_or_create("2024-01-01", CITIES)
+            scrape_run(first, fetcher, max_pages=5, url_template=server.url_template, chunk_rows=1)
+
+        newyork = first.cities["newyork"]
+        assert (newyork["status"], newyork["next_page"], newyork["next_offset"], newyork["chunks"]) == \
+               ("failed", 2, 240, 2)
+        assert "HTTP 503" in newyork["failures"][0]["error"]
+        assert first.cities["chicago"]["status"] == "complete"
+
+        requests = server.request_count
+        resumed = RunManifest.load_or_create("2024-01-01", CITIES)
+        assert resumed.pending() == {"newyork": "New York, NY"}
+        with ConcurrentFetcher(per_host_interval=0) as fetcher:
+            scrape_run(resumed, fetcher, max_pages=5, url_template=server.url_template, chunk_rows=1)
+        # Only the failed page and the empty one ending the city
+        assert server.request_count - requests == 2
+
+        with ConcurrentFetcher(per_host_interval=0) as fetcher:
+            clean = RunManifest.load_or_create("2024-01-01", CITIES, root="storage/clean_runs")
+            scrape_run(clean, fetcher, max_pages=5, url_template=server.url_template, chunk_rows=1)
+
+    assert resumed.summary() == {**clean.summary(), "listings": 720}
+    assert resumed.cities["newyork"]["chunks"] == 3
+    links = committed_links(resumed)
+    assert len(set(links)) == len(links)
+    assert sorted(links) == sorted(committed_links(clean))
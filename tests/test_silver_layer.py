@@ -0,0 +1,36 @@
+import pandas as pd
+
+from src.transformations.cross_posts import CrossPostIndex
+from src.transformations.lake import partition_files
+from src.transformations.silver_layer import SILVER_ROOT, commit_silver_batch, save_silver_data, silver_layer_transformation
+
+
+def test_batch_with_no_valid_rows_passes_through_empty(bronze_frame):
+    bronze = bronze_frame([{'price': "N/A"}, {'make': "N/A"}])
+
+    silver, cross_post_batch = silver_layer_transformation(bronze)
+    save_silver_data(silver)
+    commit_silver_batch(silver, cross_post_batch)
+
+    assert silver.empty
+    assert 'cross_post' in silver
+    assert cross_post_batch.num_rows == 0
+    assert not partition_files(SILVER_ROOT)
+
+
+def test_cross_post_flagged_and_indexed_once_committed(bronze_frame):
+    bronze = bronze_frame([{}, {'city': "chicago", 'title': "2018 HONDA CIVIC EX - call now"}, {'price': "$9,000"}])
+
+    silver, cross_post_batch = silver_layer_transformation(bronze)
+    assert silver['cross_post'].tolist() == [False, True, False]
+    assert len(CrossPostIndex.load()) == 0
+
+    save_silver_data(silver)
+    assert len(CrossPostIndex.load()) == 0
+    commit_silver_batch(silver, cross_post_batch)
+    assert len(CrossPostIndex.load()) == 3
+
+    # The same car under a fourth link on a later run is a cross-post of the stored one
+    later = bronze_frame([{'data_date': "2024-01-02"}] * 4).iloc[[3]]
+    silver, _ = silver_layer_transformation(later)
+    assert silver['cross_post'].tolist() == [True]
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from src.transformations.timeseries import PriceLog
+
+LINK = "https://newyork.craigslist.org/ctd/d/1.html"
+LINK_HASH = pd.util.hash_array(np.array([LINK], dtype=object))
+
+
+def append_day(log: PriceLog, day: str, price: int, others: int = 0) -> PriceLog:
+    hashes = np.concatenate([LINK_HASH, np.arange(1, others + 1, dtype=np.uint64)])
+    return log.append(hashes, np.full(len(hashes), np.datetime64(day)), np.full(len(hashes), price, np.int32))
+
+
+def test_history_merges_segments_and_keeps_the_newer_price_of_a_day():
+    log = append_day(PriceLog.load(), "2024-01-02", 15_000, others=10)
+    log = append_day(log, "2024-01-01", 16_000)
+    log = append_day(log, "2024-01-02", 14_500)
+
+    history = PriceLog.load().history(LINK)
+    assert history['date'].astype(str).tolist() == ["2024-01-01", "2024-01-02"]
+    assert history['price'].tolist() == [16_000, 14_500]
+
+
+def test_appends_write_a_logarithmic_number_of_segments():
+    log = PriceLog.load()
+    for day in pd.date_range("2024-01-01", periods=64).strftime("%Y-%m-%d"):
+        log = append_day(log, day, 15_000, others=99)
+    assert len(log.segments) <= 7
+    assert len(log.history(LINK)) == 64
+
+
+def test_segments_merged_away_outlive_the_append_that_replaced_them():
+    log = append_day(PriceLog.load(), "2024-01-01", 15_000)
+    reader = PriceLog.load()
+    # Same size as the first segment, so it is merged into the new one
+    log = append_day(log, "2024-01-02", 14_000)
+    assert len(log.segments) == 1
+    assert reader.history(LINK)['price'].tolist() == [15_000]
+
+    append_day(log, "2024-01-03", 13_000, others=5)
+    assert PriceLog.load().history(LINK)['price'].tolist() == [15_000, 14_000, 13_000]
+
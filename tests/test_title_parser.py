@@ -0,0 +1,31 @@
+import pandas as pd
+
+from benchmarks.bench_title_parser import load_golden
+from src.pipelines.cars.cars.title_parser import ParsedTitle, parse_title, parse_titles
+
+
+def test_golden_corpus_parses_as_recorded():
+    rows = load_golden()
+
+    mismatches = [(title, expected, list(parse_title(title))) for title, *expected in rows
+                  if list(parse_title(title)) != expected]
+    batch = parse_titles([title for title, *_ in rows])
+
+    assert mismatches == []
+    assert batch.values.tolist() == [expected for _, *expected in rows]
+
+
+def test_batch_keeps_series_index_and_parses_each_title_once():
+    titles = pd.Series(["2015 Honda Civic EX-L sedan 74k miles", None, "2012 chevy silverado 1500 LT 4x4 $18,500",
+                        "2015 Honda Civic EX-L sedan 74k miles"], index=[10, 11, 12, 13])
+    parse_title.cache_clear()
+
+    batch = parse_titles(titles)
+
+    assert list(batch.columns) == list(ParsedTitle._fields)
+    assert list(batch.index) == [10, 11, 12, 13]
+    assert batch.loc[10].tolist() == ["2015", "Honda", "Civic EX-L sedan", "74k", "N/A"]
+    assert batch.loc[11].tolist() == list(parse_title(""))
+    assert batch.loc[12].tolist() == ["2012", "Chevy", "silverado 1500 LT", "N/A", "$18,500"]
+    assert batch.loc[13].tolist() == batch.loc[10].tolist()
+    assert parse_title.cache_info().misses == 3
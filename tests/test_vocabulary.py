@@ -0,0 +1,19 @@
+import pandas as pd
+
+from src.transformations.lake import read_json
+from src.transformations.vocabulary import VOCABULARY_ALIASES_PATH, Vocabulary
+
+
+def test_only_aliases_resolved_to_canonical_names_are_learned():
+    vocabulary = Vocabulary.load()
+    makes, models = vocabulary.normalize(pd.Series(["Toyta", "Zzyzx Motors", "Honda", "Honda"]),
+                                         pd.Series(["Camery", "Roadrunner", "CivicSport", "qwerty lx"]))
+    vocabulary.save()
+
+    assert list(makes) == ["Toyota", "Zzyzx Motors", "Honda", "Honda"]
+    assert list(models) == ["Camry", "Roadrunner", "Civic", "Qwerty"]
+    assert read_json(VOCABULARY_ALIASES_PATH, {}) == {
+        "makes": {"toyta": "Toyota"},
+        "models": {"Honda": {"civicsport": "Civic"}, "Toyota": {"camery": "Camry"}},
+    }
+